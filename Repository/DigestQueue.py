@@ -0,0 +1,91 @@
+import os
+from datetime import datetime, timezone
+from Repository.Firebase import Firebase
+from utils.helpers import job_fingerprint
+
+
+class DigestQueue:
+    """
+    Openings waiting for daily and weekly digest subscribers.
+
+    Every instant fan-out also adds its openings to `digest_pending` (one
+    document per opening, keyed by job_fingerprint, so repeats collapse). A
+    digest run for a cadence collects everything added since that cadence's
+    last digest (system_state/digest_<cadence>), sends it as one email per
+    subscriber, and moves the watermark forward. A run is due once the
+    cadence window has passed, less DIGEST_WINDOW_SLACK_MINUTES so a
+    scheduler firing a little early still counts.
+    """
+
+    WINDOWS_MS = {
+        "daily": 24 * 60 * 60 * 1000,
+        "weekly": 7 * 24 * 60 * 60 * 1000,
+    }
+
+    def __init__(self):
+        self.firebase = Firebase()
+        self.collection_name = "digest_pending"
+        self.slack_ms = int(os.getenv("DIGEST_WINDOW_SLACK_MINUTES", "60")) * 60 * 1000
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(datetime.now(timezone.utc).timestamp() * 1000)
+
+    @staticmethod
+    def _state_doc_id(cadence: str) -> str:
+        return f"digest_{cadence}"
+
+    def add(self, openings: list, source: str) -> int:
+        """Queue openings for the next digests. Returns the number queued."""
+        added_at = self._now_ms()
+        documents = {
+            job_fingerprint(job): {"opening": job, "source": source, "addedAt": added_at}
+            for job in openings
+        }
+        if documents:
+            self.firebase.batch_set_documents(self.collection_name, documents)
+        return len(documents)
+
+    def last_sent_at(self, cadence: str) -> int:
+        state = self.firebase.get_document("system_state", self._state_doc_id(cadence)) or {}
+        return state.get("lastSentAt", 0)
+
+    def next_due_at(self, cadence: str) -> int:
+        return self.last_sent_at(cadence) + self.WINDOWS_MS[cadence] - self.slack_ms
+
+    def is_due(self, cadence: str) -> bool:
+        return self._now_ms() >= self.next_due_at(cadence)
+
+    def pending(self, cadence: str) -> tuple[list, int]:
+        """
+        Openings added since the cadence's last digest.
+
+        Returns:
+            (openings oldest first, cutoff) - pass cutoff to mark_sent() so
+            openings added while the digest is being sent go in the next one
+        """
+        since = self.last_sent_at(cadence)
+        cutoff = self._now_ms()
+        docs = self.firebase.query_page(
+            self.collection_name,
+            filters=[("addedAt", ">", since), ("addedAt", "<=", cutoff)],
+            limit=None
+        )
+        docs.sort(key=lambda doc: doc.get("addedAt", 0))
+        return [doc["opening"] for doc in docs], cutoff
+
+    def mark_sent(self, cadence: str, cutoff: int, run_id: str, openings: int):
+        self.firebase.set_document("system_state", self._state_doc_id(cadence), {
+            "lastSentAt": cutoff,
+            "lastRunId": run_id,
+            "openings": openings,
+            "sentAt": self._now_ms(),
+        })
+
+    def clear_old(self, days: int = 8) -> int:
+        """Delete openings older than every digest window. Returns the number deleted."""
+        cutoff = self._now_ms() - days * 24 * 60 * 60 * 1000
+        old = self.firebase.query_page(self.collection_name, filters=[("addedAt", "<", cutoff)], limit=None)
+        for doc in old:
+            self.firebase.delete_document(self.collection_name, doc["id"])
+        return len(old)
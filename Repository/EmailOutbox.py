@@ -0,0 +1,401 @@
+import os
+import json
+import uuid
+import socket
+import hashlib
+from datetime import datetime, timezone
+from Repository.Firebase import Firebase
+
+
+class EmailOutbox:
+    """
+    Durable queue of job alert deliveries.
+
+    Every run writes its batches to the `email_outbox` collection before any
+    email is sent (one task per batch: run ID, batch ID, recipients, openings,
+    payload hash, status). Workers claim one task at a time with a time-limited
+    lease inside a Firestore transaction, renew the lease right before sending,
+    and mark it sent; only the lease owner can mark a task sent, deferred or
+    failed, and a task that is already sent is never claimed again. If the process dies mid-run, the
+    remaining tasks stay pending (or their lease expires) and resume() delivers
+    exactly those, so a restart neither loses nor repeats batches. Only a batch
+    that was in flight at the moment of the crash can be sent twice.
+
+    Status flow: pending -> leased -> sent, or back to pending on failure
+    until EMAIL_OUTBOX_MAX_ATTEMPTS, then failed. Recipients are tracked one
+    by one: those the server refused for good are recorded in
+    failedRecipients, and a retry only goes to those who didn't get the mail. Recipients that don't fit
+    today's sending quota are deferred (status deferred, notBefore = next UTC
+    midnight) and become claimable again once the budget resets.
+
+    Batches carry a delivery shard (hash of the recipients' email). Each shard
+    of a run has a record in `email_outbox_shards` that a worker (thread,
+    process or instance) leases with claim_shard(), delivers, and closes with
+    complete_shard(); shard_summary() rolls the per-shard results up into one
+    run summary.
+    """
+
+    CLAIMABLE_STATUSES = ["pending", "leased", "deferred"]
+    CLAIM_PAGE_SIZE = 50
+
+    def __init__(self):
+        self.firebase = Firebase()
+        self.collection_name = "email_outbox"
+        self.shards_collection_name = "email_outbox_shards"
+        self.lease_seconds = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "120"))
+        self.max_attempts = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "3"))
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(datetime.now(timezone.utc).timestamp() * 1000)
+
+    @staticmethod
+    def _claimable_now(task: dict, now: int) -> bool:
+        if task.get("status") == "leased":
+            return task.get("leaseExpiresAt", 0) <= now
+        if task.get("status") == "deferred":
+            return task.get("notBefore", 0) <= now
+        return True
+
+    @staticmethod
+    def _hash(payload) -> str:
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def new_run_id(source: str) -> str:
+        return f"{source}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    def enqueue(self, run_id: str, source: str, batches: list) -> list:
+        """
+        Persist one pending task per batch.
+
+        Args:
+            run_id: ID shared by every batch of this run
+            source: "cron_job_alert" or "job_alert_manual"
+            batches: [{"recipients": [(email, unsubscribe_token)], "openings": [...], "shard": int}]
+
+        Returns:
+            Task IDs in batch order
+        """
+        created_at = self._now_ms()
+        documents = {}
+        shard_batches = {}
+        for number, batch in enumerate(batches, start=1):
+            batch_id = f"{number:05d}"
+            recipients = [{"email": email, "unsubscribeToken": token} for email, token in batch["recipients"]]
+            openings_hash = self._hash(batch["openings"])
+            shard = batch.get("shard", 0)
+            shard_batches[shard] = shard_batches.get(shard, 0) + 1
+            documents[f"{run_id}-{batch_id}"] = {
+                "runId": run_id,
+                "batchId": batch_id,
+                "shard": shard,
+                "source": source,
+                "recipients": recipients,
+                "openings": batch["openings"],
+                "openingsHash": openings_hash,
+                "payloadHash": self._hash({"recipients": recipients, "openingsHash": openings_hash}),
+                "status": "pending",
+                "attempts": 0,
+                "leaseOwner": None,
+                "leaseExpiresAt": 0,
+                "createdAt": created_at,
+            }
+
+        self.firebase.batch_set_documents(self.collection_name, documents)
+        self.firebase.batch_set_documents(self.shards_collection_name, {
+            self._shard_doc_id(run_id, shard): {
+                "runId": run_id,
+                "shard": shard,
+                "batches": count,
+                "status": "pending",
+                "leaseOwner": None,
+                "leaseExpiresAt": 0,
+                "summary": None,
+                "createdAt": created_at,
+            }
+            for shard, count in shard_batches.items()
+        })
+        print(f"   📮 Outbox: queued {len(documents)} batch(es) in {len(shard_batches)} shard(s) for run {run_id}")
+        return list(documents.keys())
+
+    def claim(
+        self,
+        run_id: str | None = None,
+        after: str | None = None,
+        shard: int | None = None,
+        statuses: list | None = None
+    ) -> dict | None:
+        """
+        Lease the next claimable task (pending, deferred past notBefore, or
+        leased with an expired lease), in task ID order.
+
+        Tasks are leased one at a time so a lease never runs out while the
+        task waits behind others; candidates are read a page at a time.
+
+        Args:
+            run_id: Only claim tasks of this run (None = any run, used by resume)
+            after: Task ID to continue after (the previously claimed task), so a
+                delivery pass reads every candidate once
+            shard: Only claim tasks of this delivery shard
+            statuses: Subset of CLAIMABLE_STATUSES to consider (default: all)
+
+        Returns:
+            The leased task, or None if nothing is claimable after `after`
+        """
+        filters = [("status", "in", statuses or self.CLAIMABLE_STATUSES)]
+        if run_id:
+            filters.append(("runId", "==", run_id))
+        if shard is not None:
+            filters.append(("shard", "==", shard))
+
+        def take(current):
+            if current is None or current.get("status") not in self.CLAIMABLE_STATUSES:
+                return None
+            now = self._now_ms()
+            if not self._claimable_now(current, now):
+                return None
+            return {
+                "status": "leased",
+                "leaseOwner": self.worker_id,
+                "leaseExpiresAt": now + self.lease_seconds * 1000,
+                "attempts": current.get("attempts", 0) + 1,
+            }
+
+        while True:
+            page = self.firebase.query_page(
+                self.collection_name,
+                filters=filters,
+                order_by="__name__",
+                descending=False,
+                limit=self.CLAIM_PAGE_SIZE,
+                start_after=after
+            )
+            for candidate in page:
+                after = candidate["id"]
+                if not self._claimable_now(candidate, self._now_ms()):
+                    continue
+                updates = self.firebase.transactional_update(self.collection_name, candidate["id"], take)
+                if updates is not None:
+                    return {**candidate, **updates}
+            if len(page) < self.CLAIM_PAGE_SIZE:
+                return None
+
+    def _owns(self, task: dict | None) -> bool:
+        return bool(task) and task.get("status") == "leased" and task.get("leaseOwner") == self.worker_id
+
+    def renew(self, task_id: str) -> bool:
+        """
+        Extend this worker's lease on a task. Called right before sending:
+        False means the lease expired and another worker may have taken the
+        task over, so it must not be sent.
+        """
+        def extend(current):
+            if not self._owns(current):
+                return None
+            return {"leaseExpiresAt": self._now_ms() + self.lease_seconds * 1000}
+
+        return self.firebase.transactional_update(self.collection_name, task_id, extend) is not None
+
+    @staticmethod
+    def _failures(current: dict, failures: list | None) -> list:
+        """Append this attempt's refused recipients ({"email", "error"}) to the task's record."""
+        return current.get("failedRecipients", []) + list(failures or [])
+
+    def mark_sent(self, task_id: str, delivered: int, failures: list | None = None) -> bool:
+        """
+        Mark a task sent. Returns False if this worker no longer holds its
+        lease (e.g. it was already sent or taken over).
+
+        Args:
+            delivered: Recipients sent in this attempt
+            failures: [{"email", "error"}] recipients the server refused for good
+        """
+        def finish(current):
+            if not self._owns(current):
+                return None
+            return {
+                "status": "sent",
+                "delivered": current.get("delivered", 0) + delivered,
+                "failedRecipients": self._failures(current, failures),
+                "leaseOwner": None,
+                "leaseExpiresAt": 0,
+                "sentAt": self._now_ms(),
+            }
+
+        return self.firebase.transactional_update(self.collection_name, task_id, finish) is not None
+
+    def defer(self, task_id: str, recipients: list, not_before: int, delivered: int = 0, failures: list | None = None) -> bool:
+        """
+        Keep the task for later with only the recipients that weren't sent.
+        Returns False if this worker no longer holds the task's lease.
+
+        Args:
+            recipients: [(email, unsubscribe_token)] still to deliver
+            not_before: Epoch ms when the task becomes claimable again
+            delivered: Recipients already sent from this task in this attempt
+            failures: [{"email", "error"}] recipients the server refused for good
+        """
+        def postpone(current):
+            if not self._owns(current):
+                return None
+            return {
+                "status": "deferred",
+                "recipients": [{"email": email, "unsubscribeToken": token} for email, token in recipients],
+                "notBefore": not_before,
+                "delivered": current.get("delivered", 0) + delivered,
+                "failedRecipients": self._failures(current, failures),
+                # Waiting for quota is not a failed attempt
+                "attempts": max(0, current.get("attempts", 0) - 1),
+                "leaseOwner": None,
+                "leaseExpiresAt": 0,
+            }
+
+        return self.firebase.transactional_update(self.collection_name, task_id, postpone) is not None
+
+    def mark_failed(
+        self,
+        task_id: str,
+        error: str,
+        recipients: list | None = None,
+        delivered: int = 0,
+        failures: list | None = None
+    ) -> str | None:
+        """
+        Release a failed task for retry, or fail it for good after max attempts.
+        Returns the new status, or None if this worker no longer holds the lease.
+
+        Args:
+            recipients: [(email, unsubscribe_token)] still to deliver, when part of the
+                batch already went out (the retry then skips those who got the mail)
+            delivered: Recipients already sent from this task in this attempt
+            failures: [{"email", "error"}] recipients the server refused for good
+        """
+        def release(current):
+            if not self._owns(current):
+                return None
+            exhausted = current.get("attempts", 0) >= self.max_attempts
+            updates = {
+                "status": "failed" if exhausted else "pending",
+                "lastError": error,
+                "delivered": current.get("delivered", 0) + delivered,
+                "failedRecipients": self._failures(current, failures),
+                "leaseOwner": None,
+                "leaseExpiresAt": 0,
+            }
+            if recipients is not None:
+                updates["recipients"] = [{"email": email, "unsubscribeToken": token} for email, token in recipients]
+            return updates
+
+        updates = self.firebase.transactional_update(self.collection_name, task_id, release)
+        return updates["status"] if updates else None
+
+    # ================== SHARDS ==================
+
+    @staticmethod
+    def _shard_doc_id(run_id: str, shard: int) -> str:
+        return f"{run_id}-s{shard:03d}"
+
+    def claim_shard(self, run_id: str | None = None) -> dict | None:
+        """
+        Lease one undelivered shard (pending, or leased with an expired lease).
+
+        Args:
+            run_id: Only claim shards of this run (None = any run)
+
+        Returns:
+            The shard record, or None if no shard is claimable right now
+        """
+        filters = [("status", "in", self.CLAIMABLE_STATUSES)]
+        if run_id:
+            filters.append(("runId", "==", run_id))
+        candidates = self.firebase.query_page(self.shards_collection_name, filters=filters, limit=None)
+        candidates.sort(key=lambda t: (t.get("createdAt", 0), t["id"]))
+
+        def take(current):
+            now = self._now_ms()
+            if current is None or current.get("status") not in self.CLAIMABLE_STATUSES:
+                return None
+            if current.get("status") == "leased" and current.get("leaseExpiresAt", 0) > now:
+                return None
+            return {
+                "status": "leased",
+                "leaseOwner": self.worker_id,
+                "leaseExpiresAt": now + self.lease_seconds * 1000,
+            }
+
+        for candidate in candidates:
+            if candidate.get("status") == "leased" and candidate.get("leaseExpiresAt", 0) > self._now_ms():
+                continue
+            updates = self.firebase.transactional_update(self.shards_collection_name, candidate["id"], take)
+            if updates is not None:
+                return {**candidate, **updates}
+        return None
+
+    def renew_shard(self, run_id: str, shard: int) -> bool:
+        """Extend this worker's shard lease (called between batches)."""
+        def extend(current):
+            if current is None or current.get("status") != "leased" or current.get("leaseOwner") != self.worker_id:
+                return None
+            return {"leaseExpiresAt": self._now_ms() + self.lease_seconds * 1000}
+
+        return self.firebase.transactional_update(self.shards_collection_name, self._shard_doc_id(run_id, shard), extend) is not None
+
+    def complete_shard(self, run_id: str, shard: int, summary: dict):
+        """Close a shard with this pass's delivery counters; its pending batches stay for resume."""
+        def finish(current):
+            if current is None or current.get("status") == "done":
+                return None
+            return {
+                "status": "done",
+                "summary": summary,
+                "leaseOwner": None,
+                "leaseExpiresAt": 0,
+                "finishedAt": self._now_ms(),
+            }
+
+        self.firebase.transactional_update(self.shards_collection_name, self._shard_doc_id(run_id, shard), finish)
+
+    def shard_summary(self, run_id: str) -> dict:
+        """
+        Roll up every shard of a run.
+
+        Returns:
+            {"shards", "shards_done", "emails_sent", "batches_sent", "batches_failed", "batches_pending",
+             "batches_deferred", "emails_deferred", "emails_refused"}
+        """
+        shards = self.firebase.query_page(self.shards_collection_name, filters=[("runId", "==", run_id)], limit=None)
+        totals = {
+            "emails_sent": 0, "batches_sent": 0, "batches_failed": 0, "batches_pending": 0,
+            "batches_deferred": 0, "emails_deferred": 0, "emails_refused": 0
+        }
+        done = 0
+        for shard in shards:
+            if shard.get("status") != "done":
+                # Not delivered yet: all its batches are still pending
+                totals["batches_pending"] += shard.get("batches", 0)
+                continue
+            done += 1
+            for key in totals:
+                totals[key] += (shard.get("summary") or {}).get(key, 0)
+        return {"shards": len(shards), "shards_done": done, **totals}
+
+    def clear_old_tasks(self, days: int = 7) -> int:
+        """Delete sent/failed tasks older than `days`. Returns the number deleted."""
+        cutoff = self._now_ms() - days * 24 * 60 * 60 * 1000
+        old = self.firebase.query_page(
+            self.collection_name,
+            filters=[("status", "in", ["sent", "failed"])],
+            limit=None
+        )
+        deleted = 0
+        for task in old:
+            if task.get("createdAt", 0) < cutoff:
+                self.firebase.delete_document(self.collection_name, task["id"])
+                deleted += 1
+
+        for shard in self.firebase.query_page(self.shards_collection_name, filters=[("status", "==", "done")], limit=None):
+            if shard.get("createdAt", 0) < cutoff:
+                self.firebase.delete_document(self.shards_collection_name, shard["id"])
+        return deleted
@@ -0,0 +1,91 @@
+import os
+from datetime import datetime, timezone, timedelta
+from Repository.Firebase import Firebase
+
+
+class EmailQuotaExceededError(Exception):
+    """Raised when an email can't be sent because today's sending budget is used up."""
+
+
+class EmailQuota:
+    """
+    Daily sending budget shared by every process, stored in system_state.
+
+    Gmail allows about 500 recipients per day per account (GMAIL_DAILY_QUOTA).
+    Senders reserve recipients before sending; the counter resets when the UTC
+    day rolls over. Job alerts may not use the last GMAIL_VERIFICATION_RESERVE
+    recipients of the day, so verification and other transactional emails
+    still go out after a large fan-out has drained the budget.
+    """
+
+    PRIORITY_TRANSACTIONAL = "transactional"
+    PRIORITY_ALERT = "alert"
+
+    def __init__(self, doc_id: str = "email_quota", daily_limit: int | None = None):
+        self.firebase = Firebase()
+        self.collection_name = "system_state"
+        self.doc_id = doc_id
+        self.daily_limit = daily_limit if daily_limit is not None else int(os.getenv("GMAIL_DAILY_QUOTA", "500"))
+        self.transactional_reserve = int(os.getenv("GMAIL_VERIFICATION_RESERVE", "50"))
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).date().isoformat()
+
+    @staticmethod
+    def next_reset_ms() -> int:
+        """Epoch ms of the next UTC midnight, when the budget is refilled."""
+        tomorrow = datetime.now(timezone.utc).date() + timedelta(days=1)
+        midnight = datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=timezone.utc)
+        return int(midnight.timestamp() * 1000)
+
+    def _limit_for(self, priority: str) -> int:
+        if priority == self.PRIORITY_ALERT:
+            return max(0, self.daily_limit - self.transactional_reserve)
+        return self.daily_limit
+
+    def _used_today(self, state: dict | None) -> int:
+        if not state or state.get("date") != self._today():
+            return 0
+        return state.get("used", 0)
+
+    def remaining(self, priority: str = PRIORITY_ALERT) -> int:
+        state = self.firebase.get_document(self.collection_name, self.doc_id)
+        return max(0, self._limit_for(priority) - self._used_today(state))
+
+    def reserve(self, count: int, priority: str = PRIORITY_ALERT) -> int:
+        """
+        Reserve up to `count` recipients from today's budget.
+
+        Returns:
+            How many were granted (0..count); the caller defers the rest
+        """
+        granted = {"count": 0}
+
+        def take(current):
+            used = self._used_today(current)
+            grant = max(0, min(count, self._limit_for(priority) - used))
+            granted["count"] = grant
+            return {"date": self._today(), "used": used + grant, "limit": self.daily_limit}
+
+        self.firebase.transactional_update(self.collection_name, self.doc_id, take)
+        return granted["count"]
+
+    def refund(self, count: int):
+        """Give back recipients that were reserved but not sent (same UTC day only)."""
+        if count <= 0:
+            return
+
+        def give_back(current):
+            if not current or current.get("date") != self._today():
+                return None
+            return {"used": max(0, current.get("used", 0) - count)}
+
+        self.firebase.transactional_update(self.collection_name, self.doc_id, give_back)
+
+    def exhaust(self):
+        """Mark today's budget as used up (e.g. Gmail reported the account's sending limit)."""
+        self.firebase.transactional_update(
+            self.collection_name, self.doc_id,
+            lambda current: {"date": self._today(), "used": self.daily_limit, "limit": self.daily_limit}
+        )
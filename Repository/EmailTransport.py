@@ -0,0 +1,282 @@
+import os
+import time
+import base64
+import ssl
+import smtplib
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from utils.metrics import CACHE_REQUESTS
+
+import requests
+
+
+class EmailTransport:
+    """
+    How rendered messages leave the process.
+
+    GmailService renders and encodes messages and hands them to a transport
+    session opened per sender account:
+
+        with transport.session(account) as server:
+            refused = server.sendmail(from_address, to_addresses, message)
+
+    Sessions speak smtplib's interface and raise smtplib's exceptions
+    (SMTPAuthenticationError, SMTPDataError, SMTPRecipientsRefused...), so
+    sender failover and quota handling work the same for every transport.
+
+    EMAIL_TRANSPORT selects the implementation:
+        smtp  pooled SMTP connections (default, smtp.gmail.com:587)
+        http  HTTP-API style provider (EMAIL_HTTP_API_URL)
+        sink  nothing is sent; messages are kept in memory or written to EMAIL_SINK_DIR
+    """
+
+    name = "base"
+
+    @contextmanager
+    def session(self, account):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SMTPTransport(EmailTransport):
+    """
+    SMTP with a small pool of logged-in connections per sender account.
+
+    A connection goes back to the pool after a clean send and is reused for
+    the next batch of the same account (checked with NOOP, dropped after
+    EMAIL_SMTP_IDLE_SECONDS idle), saving the TLS handshake and login per
+    batch.
+
+    STARTTLS (with certificate verification) and login are required, so a
+    server that doesn't offer STARTTLS is never sent the app password.
+    EMAIL_SMTP_STARTTLS=false turns that off for a local server only
+    (smtp_sink.py on localhost); AUTH is then used only if offered.
+    """
+
+    name = "smtp"
+    LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+    def __init__(self, host: str | None = None, port: int | None = None):
+        self.host = host or os.getenv("EMAIL_SMTP_HOST", "smtp.gmail.com")
+        self.port = port or int(os.getenv("EMAIL_SMTP_PORT", "587"))
+        self.pool_size = int(os.getenv("EMAIL_SMTP_POOL_SIZE", "2"))
+        self.idle_seconds = int(os.getenv("EMAIL_SMTP_IDLE_SECONDS", "60"))
+        self.timeout = int(os.getenv("EMAIL_SMTP_TIMEOUT_SECONDS", "60"))
+        self.starttls = os.getenv("EMAIL_SMTP_STARTTLS", "true").lower() != "false"
+        if not self.starttls and self.host not in self.LOCAL_HOSTS:
+            raise ValueError(f"EMAIL_SMTP_STARTTLS=false is only allowed for a local server, not {self.host}")
+        # {address: [(smtp, last_used_monotonic)]}
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, account) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.starttls:
+                # Raises SMTPNotSupportedError if the server doesn't offer it (e.g. stripped in transit)
+                server.starttls(context=ssl.create_default_context())
+                server.ehlo()
+                server.login(account.address, account.app_password)
+            elif server.has_extn("auth"):
+                server.login(account.address, account.app_password)
+        except Exception:
+            self._discard(server)
+            raise
+        return server
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self, account) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                idle = self._idle.get(account.address)
+                if not idle:
+                    break
+                server, last_used = idle.pop()
+            if time.monotonic() - last_used > self.idle_seconds:
+                self._discard(server)
+                continue
+            try:
+                if server.noop()[0] == 250:
+                    CACHE_REQUESTS.inc(cache="smtp_connection", result="hit")
+                    return server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._discard(server)
+        CACHE_REQUESTS.inc(cache="smtp_connection", result="miss")
+        return self._connect(account)
+
+    def _checkin(self, account, server: smtplib.SMTP):
+        with self._lock:
+            idle = self._idle.setdefault(account.address, [])
+            if len(idle) < self.pool_size:
+                idle.append((server, time.monotonic()))
+                return
+        self._discard(server)
+
+    @contextmanager
+    def session(self, account):
+        server = self._checkout(account)
+        try:
+            yield server
+        except Exception:
+            # The connection's state is unknown after a failed send; don't reuse it
+            self._discard(server)
+            raise
+        self._checkin(account, server)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for server, _ in connections:
+                self._discard(server)
+
+
+class _HTTPSession:
+    def __init__(self, transport: "HTTPTransport", account):
+        self.transport = transport
+        self.account = account
+
+    def sendmail(self, from_address: str, to_addresses, message) -> dict:
+        if isinstance(to_addresses, str):
+            to_addresses = [to_addresses]
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+
+        response = self.transport.http.post(
+            self.transport.url,
+            headers={"Authorization": f"Bearer {self.transport.api_key or self.account.app_password}"},
+            json={
+                "from": from_address,
+                "to": list(to_addresses),
+                "raw": base64.urlsafe_b64encode(message).decode("ascii"),
+            },
+            timeout=self.transport.timeout,
+        )
+
+        if response.status_code in (401, 403):
+            raise smtplib.SMTPAuthenticationError(response.status_code, response.text.encode("utf-8"))
+        if response.status_code == 429 or response.status_code >= 500:
+            # Provider throttling or outage: transient, the whole batch is retried later.
+            # Never reported per recipient, so nobody is suppressed for it.
+            raise smtplib.SMTPResponseException(
+                421, f"4.3.0 Provider unavailable (HTTP {response.status_code})".encode("ascii")
+            )
+        if response.status_code >= 400:
+            # The provider rejected the request itself: a failure of this message
+            raise smtplib.SMTPDataError(554, f"Provider rejected the message (HTTP {response.status_code})".encode("ascii"))
+
+        rejected = (response.json() or {}).get("rejected", []) if response.content else []
+        refused = {address: (550, b"rejected by provider") for address in rejected}
+        if refused and len(refused) == len(to_addresses):
+            raise smtplib.SMTPRecipientsRefused(refused)
+        return refused
+
+
+class HTTPTransport(EmailTransport):
+    """
+    HTTP-API style provider: one POST per message to EMAIL_HTTP_API_URL.
+
+    Body: {"from", "to": [...], "raw": base64url MIME message}; bearer token
+    EMAIL_HTTP_API_KEY (or the sender account's password). 401/403 map to an
+    authentication error, 429 and 5xx to a transient 421 (the batch is
+    retried), other 4xx to a failure of the message, and only a JSON
+    {"rejected": [...]} reply to refused recipients.
+    """
+
+    name = "http"
+
+    def __init__(self, url: str | None = None, api_key: str | None = None):
+        self.url = url or os.getenv("EMAIL_HTTP_API_URL")
+        if not self.url:
+            raise ValueError("EMAIL_HTTP_API_URL not found in environment variables")
+        self.api_key = api_key or os.getenv("EMAIL_HTTP_API_KEY")
+        self.timeout = int(os.getenv("EMAIL_SMTP_TIMEOUT_SECONDS", "60"))
+        # Keep-alive connection pool shared by all sessions
+        self.http = requests.Session()
+
+    @contextmanager
+    def session(self, account):
+        yield _HTTPSession(self, account)
+
+    def close(self):
+        self.http.close()
+
+
+class _SinkSession:
+    def __init__(self, sink: "SinkTransport"):
+        self.sink = sink
+
+    def sendmail(self, from_address: str, to_addresses, message) -> dict:
+        if isinstance(to_addresses, str):
+            to_addresses = [to_addresses]
+        self.sink.store(from_address, list(to_addresses), message)
+        return {}
+
+
+class SinkTransport(EmailTransport):
+    """
+    Accepts every message without sending it, for tests and offline benchmarks.
+
+    Messages are written to EMAIL_SINK_DIR as .eml files when it is set, and
+    otherwise the last EMAIL_SINK_MAX_MESSAGES are kept in memory. smtp_sink.py
+    serves the same store over SMTP.
+    """
+
+    name = "sink"
+
+    def __init__(self, directory: str | None = None):
+        directory = directory or os.getenv("EMAIL_SINK_DIR")
+        self.directory = Path(directory) if directory else None
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.messages = deque(maxlen=int(os.getenv("EMAIL_SINK_MAX_MESSAGES", "1000")))
+        self.message_count = 0
+        self.recipient_count = 0
+        self._lock = threading.Lock()
+
+    def store(self, from_address: str, to_addresses: list, message):
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        with self._lock:
+            self.message_count += 1
+            self.recipient_count += len(to_addresses)
+            number = self.message_count
+        if self.directory:
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+            (self.directory / f"{stamp}-{os.getpid()}-{number:07d}.eml").write_bytes(message)
+        else:
+            self.messages.append({"from": from_address, "to": to_addresses, "message": message})
+
+    @contextmanager
+    def session(self, account):
+        yield _SinkSession(self)
+
+
+TRANSPORTS = {
+    "smtp": SMTPTransport,
+    "http": HTTPTransport,
+    "sink": SinkTransport,
+}
+
+
+def get_transport(name: str | None = None) -> EmailTransport:
+    """Build the transport named by EMAIL_TRANSPORT (default smtp)."""
+    name = (name or os.getenv("EMAIL_TRANSPORT", "smtp")).lower()
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown EMAIL_TRANSPORT '{name}' (expected one of: {', '.join(TRANSPORTS)})")
+    return TRANSPORTS[name]()
@@ -26,6 +26,10 @@ class ErrorLogs:
         "FileNotFoundError": "ERROR",
         "PermissionError": "CRITICAL",
         "HTTPException": "WARNING",
+        "GeminiUnavailableError": "ERROR",
+        "GeminiRequestError": "WARNING",
+        "LeaseLostError": "WARNING",
+        "EmailQuotaExceededError": "WARNING",
     }
     
     # Service affected mappings
@@ -39,17 +43,29 @@ class ErrorLogs:
         "cron_job_alert": "Cron Job Alert",
         "video_processing": "YouTube Processing",
         "gemini_extraction": "Gemini AI Extraction",
+        "list_jobs": "Job Archive API",
+        "cron_resume_outbox": "Email Outbox Resume",
+        "get_run_status": "Run Status API",
+        "cron_deliver_shards": "Sharded Email Delivery",
+        "admin_suppressions": "Suppression List Admin",
+        "cron_digest": "Digest Scheduler",
+        "digest_daily": "Daily Digest Delivery",
+        "digest_weekly": "Weekly Digest Delivery",
     }
     
     # Suggested actions
     ACTION_MAP = {
-        "SMTPDataError": "Check Gmail account daily sending limit. Increase quota or use multiple sender accounts.",
-        "SMTPAuthenticationError": "Verify Gmail credentials and app password. Update GMAIL_PASSWORD in environment.",
+        "SMTPDataError": "Check Gmail account daily sending limit. Add sender accounts to GMAIL_SENDERS; accounts over their limit are skipped until the next UTC day.",
+        "EmailQuotaExceededError": "Daily sending budget (GMAIL_DAILY_QUOTA) is used up. Job alerts are deferred automatically; raise GMAIL_VERIFICATION_RESERVE if verification emails are being blocked.",
+        "SMTPAuthenticationError": "Verify Gmail credentials and app password. Update GMAIL_APP_PASSWORD (or the account's appPassword in GMAIL_SENDERS) in environment.",
         "ConnectionError": "Check internet connection and firewall. Verify email server is accessible.",
         "TimeoutError": "Gmail server is slow. Increase timeout settings or retry after some time.",
         "JSONDecodeError": "Gemini API returned invalid JSON. Check API response format and retry video processing.",
         "PermissionError": "Firebase authentication failed. Verify service account credentials.",
         "HTTPException": "Invalid request parameters. Check email format and token validity.",
+        "GeminiUnavailableError": "Gemini quota or availability issue. Check GEMINI_RPM/GEMINI_TPM against your quota; the video is retried on the next run.",
+        "GeminiRequestError": "Gemini rejected the request for good (invalid argument or blocked by safety filters). The video is marked processed; check the prompt or video content.",
+        "LeaseLostError": "A cron run outlived its lease and a newer run took over. Raise RUN_LEASE_TTL_SECONDS if runs regularly stall this long.",
     }
     
     def __init__(self):
@@ -109,7 +125,7 @@ class ErrorLogs:
     
     def _is_resolvable(self, error_type: str) -> bool:
         """Check if error is auto-resolvable with retry"""
-        resolvable_errors = ["TimeoutError", "ConnectionError", "SMTPServerDisconnected"]
+        resolvable_errors = ["TimeoutError", "ConnectionError", "SMTPServerDisconnected", "GeminiUnavailableError"]
         return error_type in resolvable_errors
     
     def log_error(
@@ -3,10 +3,25 @@ from firebase_admin import firestore, credentials
 from dotenv import load_dotenv
 import os
 import json
+import functools
 from pathlib import Path
+from utils.timing import span
+from utils.metrics import FIRESTORE_CALL_SECONDS
 
 load_dotenv()
 
+
+def _instrumented(fn):
+    """Time a Firestore call as a run span (utils.timing) and in firestore_call_duration_seconds."""
+    method = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with span(f"firestore:{method}"), FIRESTORE_CALL_SECONDS.time(method=method):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
 class Firebase:
     def __init__(self):
         firebase_creds = os.getenv("FIREBASE_SERVICE_ACCOUNT_JSON")
@@ -26,25 +41,30 @@ class Firebase:
             firebase_admin.initialize_app(cred)
         self.db = firestore.client()
     
+    @_instrumented
     def add_document(self, folder_name, data):
         doc_ref = self.db.collection(folder_name).document()
         doc_ref.set(data)
         return doc_ref.id
     
+    @_instrumented
     def set_document(self, folder_name, doc_id, data):
         self.db.collection(folder_name).document(doc_id).set(data)
         return doc_id
     
+    @_instrumented
     def update_document(self, folder_name, doc_id, data):
         self.db.collection(folder_name).document(doc_id).update(data)
         return True
     
+    @_instrumented
     def get_document(self, folder_name, doc_id):
         doc = self.db.collection(folder_name).document(doc_id).get()
         if doc.exists:
             return {"id": doc_id, **doc.to_dict()}
         return None
     
+    @_instrumented
     def get_all_documents(self, folder_name):
         docs = self.db.collection(folder_name).stream()
         result = []
@@ -52,10 +72,12 @@ class Firebase:
             result.append({"id": doc.id, **doc.to_dict()})
         return result
     
+    @_instrumented
     def delete_document(self, folder_name, doc_id):
         self.db.collection(folder_name).document(doc_id).delete()
         return True
     
+    @_instrumented
     def query_by_field(self, folder_name, field_name, value):
         docs = self.db.collection(folder_name).where(field_name, "==", value).stream()
         result = []
@@ -63,6 +85,81 @@ class Firebase:
             result.append({"id": doc.id, **doc.to_dict()})
         return result
     
+    @_instrumented
+    def batch_set_documents(self, folder_name, documents, merge=False):
+        """Write {doc_id: data} in batched commits (Firestore allows 500 writes per batch)."""
+        items = list(documents.items())
+        for start in range(0, len(items), 500):
+            batch = self.db.batch()
+            for doc_id, data in items[start:start + 500]:
+                batch.set(self.db.collection(folder_name).document(doc_id), data, merge=merge)
+            batch.commit()
+        return len(items)
+    
+    @_instrumented
+    def query_page(self, folder_name, filters=None, order_by=None, descending=True, limit=20, start_after=None):
+        """
+        Fetch one page of a filtered, ordered query.
+        filters: list of (field, op, value) e.g. [("workModeKey", "==", "remote")]
+        start_after: value of the order_by field of the last doc on the previous page
+        limit: page size, or None for every matching doc
+        """
+        query = self.db.collection(folder_name)
+        for field_name, op, value in filters or []:
+            query = query.where(field_name, op, value)
+        if order_by:
+            direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+            query = query.order_by(order_by, direction=direction)
+            if start_after is not None:
+                query = query.start_after({order_by: start_after})
+        if limit:
+            query = query.limit(limit)
+        result = []
+        for doc in query.stream():
+            result.append({"id": doc.id, **doc.to_dict()})
+        return result
+    
+    @_instrumented
+    def transactional_update(self, folder_name, doc_id, update_fn):
+        """
+        Atomic read-modify-write of one doc.
+        update_fn(current) gets the doc (with "id") or None and returns the fields
+        to merge, or None to leave the doc untouched. Returns what was written.
+        """
+        doc_ref = self.db.collection(folder_name).document(doc_id)
+
+        @firestore.transactional
+        def run(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            current = {"id": doc_id, **snapshot.to_dict()} if snapshot.exists else None
+            updates = update_fn(current)
+            if updates is not None:
+                transaction.set(doc_ref, updates, merge=True)
+            return updates
+
+        return run(self.db.transaction())
+    
+    @_instrumented
+    def set_document_if(self, folder_name, doc_id, data, guard_folder, guard_doc_id, guard_fn):
+        """
+        Set a doc only if guard_fn(guard doc or None) is true, checked in the same transaction.
+        Returns True if the doc was written.
+        """
+        doc_ref = self.db.collection(folder_name).document(doc_id)
+        guard_ref = self.db.collection(guard_folder).document(guard_doc_id)
+
+        @firestore.transactional
+        def run(transaction):
+            snapshot = guard_ref.get(transaction=transaction)
+            guard = {"id": guard_doc_id, **snapshot.to_dict()} if snapshot.exists else None
+            if not guard_fn(guard):
+                return False
+            transaction.set(doc_ref, data)
+            return True
+
+        return run(self.db.transaction())
+    
+    @_instrumented
     def exists(self, folder_name, field_name, value):
         docs = self.db.collection(folder_name).where(field_name, "==", value).stream()
         for doc in docs:
@@ -81,5 +178,9 @@ Docstring for Repository.Firebase
 | `getAllDocuments()` | Fetch all docs in a collection           | List all hostel rooms                 |
 | `deleteDocument()`  | Delete doc by ID                         | Remove a book record                  |
 | `queryByField()`    | Fetch docs where a field matches a value | Get all buses assigned to route "R12" |
+| `batchSetDocuments()` | Bulk add/overwrite docs, 500 per commit | Write back new job fingerprints       |
+| `queryPage()`       | Filtered, ordered, cursor-paginated page | List archived jobs for /jobs          |
+| `transactionalUpdate()` | Atomic read-check-write of one doc   | Claim an email outbox task lease      |
+| `setDocumentIf()`   | Write a doc only if a guard doc allows it | Fenced cron_stats write under a lease |
 
 """
\ No newline at end of file
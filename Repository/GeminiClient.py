@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import random
+import threading
+from dotenv import load_dotenv
+from pathlib import Path
+import google.generativeai as genai
+
+from utils.transcript import estimate_tokens
+from utils.metrics import GEMINI_REQUEST_SECONDS, GEMINI_TOKENS
+
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+
+# Exception class names (google.api_core / httpx / builtins) worth retrying
+RETRYABLE_ERRORS = {
+    "ResourceExhausted",      # 429
+    "TooManyRequests",
+    "ServiceUnavailable",     # 503
+    "InternalServerError",    # 500
+    "DeadlineExceeded",       # 504
+    "GatewayTimeout",
+    "Aborted",
+    "ConnectionError",
+    "TimeoutError",
+    "ReadTimeout",
+    "ConnectTimeout",
+}
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# USD per 1M tokens (input, output). Override with GEMINI_PRICING_JSON='{"model": [in, out]}'
+MODEL_PRICING_PER_1M = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+}
+
+
+class GeminiUnavailableError(Exception):
+    """Raised when a Gemini call still fails after retries or the run deadline passed."""
+
+
+class GeminiRequestError(Exception):
+    """
+    Raised when Gemini rejects a request for good (e.g. 400 InvalidArgument,
+    or a response blocked by safety filters): retrying the same prompt later
+    would fail the same way.
+    """
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `capacity` units per minute."""
+
+    def __init__(self, capacity_per_minute: int):
+        self.capacity = max(1, capacity_per_minute)
+        self.tokens = float(self.capacity)
+        self.refill_per_second = self.capacity / 60.0
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def acquire(self, amount: int = 1, deadline: float | None = None) -> float:
+        """
+        Block until `amount` units are available.
+
+        Returns the seconds spent waiting. Raises GeminiUnavailableError if the
+        wait would run past `deadline` (a time.monotonic() value).
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                wait = (amount - self.tokens) / self.refill_per_second
+
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise GeminiUnavailableError("Gemini rate limit wait exceeds run deadline")
+            time.sleep(wait)
+            waited += wait
+
+
+class GeminiClient:
+    """
+    Rate-limited, retrying wrapper around genai.GenerativeModel.
+
+    - Requests and tokens per minute are budgeted with token buckets (GEMINI_RPM / GEMINI_TPM)
+    - Retryable errors (429, 5xx, timeouts) back off exponentially with full jitter
+    - start_run() sets a per-run deadline (GEMINI_RUN_DEADLINE_SECONDS) after which calls fail fast
+    - metrics() reports latency, retry and token counters for the run summary
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        request_bucket: TokenBucket | None = None,
+        token_bucket: TokenBucket | None = None
+    ):
+        """
+        Args:
+            model_name: Gemini model to call
+            request_bucket / token_bucket: Share limiters between clients that
+                draw from the same quota (e.g. two tiers on one model)
+        """
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+        pricing = dict(MODEL_PRICING_PER_1M)
+        pricing.update({k: tuple(v) for k, v in json.loads(os.getenv("GEMINI_PRICING_JSON", "{}")).items()})
+        self.input_price_per_1m, self.output_price_per_1m = pricing.get(model_name, (0.0, 0.0))
+
+        self.max_retries = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+        self.backoff_base = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "1.0"))
+        self.backoff_max = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "30"))
+        self.run_deadline_seconds = float(os.getenv("GEMINI_RUN_DEADLINE_SECONDS", "240"))
+
+        self.request_bucket = request_bucket or TokenBucket(int(os.getenv("GEMINI_RPM", "10")))
+        self.token_bucket = token_bucket or TokenBucket(int(os.getenv("GEMINI_TPM", "250000")))
+
+        self.deadline = None
+        self.lock = threading.Lock()
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.latencies = []
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.rate_limit_wait_seconds = 0.0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+
+    def start_run(self, deadline_seconds: float | None = None):
+        """Reset metrics and set the deadline for all calls in this run."""
+        with self.lock:
+            self._reset_metrics()
+            seconds = deadline_seconds if deadline_seconds is not None else self.run_deadline_seconds
+            self.deadline = time.monotonic() + seconds if seconds > 0 else None
+
+    def _is_retryable(self, error: Exception) -> bool:
+        if type(error).__name__ in RETRYABLE_ERRORS:
+            return True
+        code = getattr(error, "code", None)
+        return isinstance(code, int) and code in RETRYABLE_STATUS_CODES
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform(0, min(cap, base * 2^attempt))
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _record_usage(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+        output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+        with self.lock:
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+        GEMINI_TOKENS.observe(prompt_tokens, model=self.model_name, kind="prompt")
+        GEMINI_TOKENS.observe(output_tokens, model=self.model_name, kind="output")
+
+    def generate(self, prompt: str) -> str:
+        """
+        Send a prompt and return the response text.
+
+        Raises:
+            GeminiUnavailableError: transient errors (429, 5xx, timeouts) persisted past
+                the retries, or the run deadline was reached
+            GeminiRequestError: non-retryable error (invalid request, blocked response)
+        """
+        estimated_tokens = estimate_tokens(prompt)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                break
+
+            waited = self.request_bucket.acquire(1, self.deadline)
+            waited += self.token_bucket.acquire(estimated_tokens, self.deadline)
+
+            started = time.monotonic()
+            try:
+                response = self.model.generate_content(prompt)
+                text = response.text
+            except Exception as e:
+                last_error = e
+                with self.lock:
+                    self.requests += 1
+                    self.rate_limit_wait_seconds += waited
+                    self.latencies.append(time.monotonic() - started)
+                GEMINI_REQUEST_SECONDS.observe(time.monotonic() - started, model=self.model_name, outcome="error")
+
+                if not self._is_retryable(e) or attempt == self.max_retries:
+                    break
+
+                delay = self._backoff(attempt)
+                if self.deadline is not None and time.monotonic() + delay >= self.deadline:
+                    break
+
+                print(f"   🔁 Gemini {type(e).__name__}, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                with self.lock:
+                    self.retries += 1
+                time.sleep(delay)
+                continue
+
+            with self.lock:
+                self.requests += 1
+                self.rate_limit_wait_seconds += waited
+                self.latencies.append(time.monotonic() - started)
+            GEMINI_REQUEST_SECONDS.observe(time.monotonic() - started, model=self.model_name, outcome="ok")
+            self._record_usage(response)
+            return text
+
+        with self.lock:
+            self.failures += 1
+
+        if last_error is None:
+            raise GeminiUnavailableError("Gemini run deadline reached before the request could be sent")
+        if not self._is_retryable(last_error):
+            raise GeminiRequestError(f"{type(last_error).__name__}: {str(last_error)}") from last_error
+        raise GeminiUnavailableError(f"{type(last_error).__name__}: {str(last_error)}") from last_error
+
+    def metrics(self) -> dict:
+        with self.lock:
+            latencies = sorted(self.latencies)
+            count = len(latencies)
+            return {
+                "model": self.model_name,
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+                "rateLimitWaitSeconds": round(self.rate_limit_wait_seconds, 3),
+                "latencyAvgSeconds": round(sum(latencies) / count, 3) if count else 0,
+                "latencyP50Seconds": round(latencies[count // 2], 3) if count else 0,
+                "latencyP95Seconds": round(latencies[min(count - 1, int(count * 0.95))], 3) if count else 0,
+                "latencyMaxSeconds": round(latencies[-1], 3) if count else 0,
+                "promptTokens": self.prompt_tokens,
+                "outputTokens": self.output_tokens,
+                "latencyTotalSeconds": round(sum(latencies), 3),
+                "estimatedCostUsd": round(
+                    (self.prompt_tokens * self.input_price_per_1m + self.output_tokens * self.output_price_per_1m) / 1_000_000,
+                    6
+                ),
+            }
@@ -1,4 +1,5 @@
 import os
+import time
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -11,18 +12,25 @@ load_dotenv(Path(__file__).parent.parent / ".env")
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8001")
 
 from Repository.Firebase import Firebase
+from Repository.EmailQuota import EmailQuota, EmailQuotaExceededError
+from Repository.SenderPool import SenderPool
+from Repository.EmailTransport import get_transport
+from utils.mail_content import minify_html, html_to_text, PreEncodedMessage
+from utils.timing import span, timed
+from utils.metrics import SMTP_SEND_SECONDS, EMAILS_SENT, EMAILS_FAILED
 FirebaseObj = Firebase()
 
 
 class GmailService:
     def __init__(self):
-        self.gmail_address = os.getenv("GMAIL_ADDRESS")
-        self.gmail_app_password = os.getenv("GMAIL_APP_PASSWORD")
-
-        if not self.gmail_address:
-            raise ValueError("GMAIL_ADDRESS not found in environment variables")
-        if not self.gmail_app_password:
-            raise ValueError("GMAIL_APP_PASSWORD not found in environment variables")
+        # Sender accounts (GMAIL_SENDERS, or GMAIL_ADDRESS / GMAIL_APP_PASSWORD) with their quotas
+        self.pool = SenderPool()
+        self.gmail_address = self.pool.primary.address
+        # smtp (pooled connections), http or sink, chosen by EMAIL_TRANSPORT
+        self.transport = get_transport()
+        # Temporarily refused recipients (4xx) are retried this many times, with exponential backoff
+        self.recipient_retries = int(os.getenv("EMAIL_RECIPIENT_RETRIES", "2"))
+        self.recipient_retry_backoff = float(os.getenv("EMAIL_RECIPIENT_RETRY_BACKOFF_SECONDS", "2"))
 
         self.from_name = "Job Alerts"
 
@@ -31,6 +39,43 @@ class GmailService:
         with open(path, "r", encoding="utf-8") as f:
             return f.read()
 
+    def _render_job_cards(self, openings: list) -> str:
+        job_cards_html = ""
+
+        for job in openings:
+            skills = ", ".join(job.get("requiredSkills", [])) or "Not specified"
+            duration_html = f"<span>⏳ {job.get('duration')}</span>" if job.get("duration") else ""
+
+            card = f"""
+            <div class="job-card">
+              <div class="job-title">{job.get("role", "N/A")}</div>
+              <div class="company">{job.get("company", "N/A")}</div>
+
+              <div class="meta">
+                <span>📌 {job.get("employmentType", "N/A")}</span>
+                <span>🏠 {job.get("workMode", "N/A")}</span>
+                <span>📍 {job.get("location", "N/A")}</span>
+                {duration_html}
+              </div>
+
+              <div class="skills">
+                <strong>Skills:</strong> {skills}
+              </div>
+
+              <div class="summary">
+                {job.get("summary", "No description available")}
+              </div>
+
+              <a class="apply-btn" href="{job.get("applyLink", "#")}" target="_blank">
+                Apply Now →
+              </a>
+            </div>
+            """
+
+            job_cards_html += card
+
+        return job_cards_html
+
     def _increment_total_emails_sent(self, count: int, email_type: str = "individual"):
         """Increment total emails sent counter in Firebase.
         
@@ -40,7 +85,9 @@ class GmailService:
         
         Individual emails (verification, subscription, etc.) and batch emails 
         are tracked separately to monitor daily email quota (Gmail 500/day limit).
+        The in-process emails_sent_total counter (/metrics) is incremented too.
         """
+        EMAILS_SENT.inc(count, type=email_type)
         try:
             from datetime import datetime, timezone
             
@@ -94,6 +141,7 @@ class GmailService:
             count: Number of emails that failed to add to counter
             email_type: Type of email - "individual" or "batch"
         """
+        EMAILS_FAILED.inc(count, type=email_type)
         try:
             from datetime import datetime, timezone
             
@@ -140,83 +188,220 @@ class GmailService:
         except Exception as e:
             print(f"Failed to increment email failure counter: {str(e)}")
 
-    def _send(self, to_email: str, subject: str, html_content: str):
-        try:
+    @staticmethod
+    def _auth_error(e: Exception) -> ValueError:
+        return ValueError(
+            "Gmail SMTP Authentication Error. Possible causes:\n"
+            "1. Invalid Gmail address or app password\n"
+            "2. App password not generated correctly (use https://myaccount.google.com/apppasswords)\n"
+            "3. 2-Step Verification not enabled on Google account\n"
+            f"Details: {str(e)}"
+        )
+
+    @staticmethod
+    def _is_limit_error(e: Exception) -> bool:
+        """Gmail's answer when an account is over its sending limit (550 5.4.5 / 421 4.7.0 ... limit)."""
+        if not isinstance(e, (smtplib.SMTPDataError, smtplib.SMTPSenderRefused)):
+            return False
+        detail = e.smtp_error.decode("utf-8", "ignore") if isinstance(e.smtp_error, bytes) else str(e.smtp_error)
+        return "5.4.5" in detail or "limit" in detail.lower() or "quota" in detail.lower()
+
+    @staticmethod
+    def _address(recipient) -> str:
+        """Recipients are emails or (email, unsubscribe_token) pairs."""
+        return recipient[0] if isinstance(recipient, tuple) else recipient
+
+    @staticmethod
+    def _smtp_detail(code: int, error) -> str:
+        text = error.decode("utf-8", "ignore") if isinstance(error, bytes) else str(error)
+        return f"{code} {text}"
+
+    def _send_tracked(self, server, from_address: str, groups: list, result: dict):
+        """
+        Send [(recipients, message)] over one session, tracking every recipient.
+
+        sendmail's refused dict is honored: permanent refusals (5xx) go to
+        result["failed"] with the server's reply in result["errors"]; temporary
+        ones (4xx) are retried, for the refused recipients only, up to
+        EMAIL_RECIPIENT_RETRIES times with exponential backoff. A message
+        refused as a whole with a temporary code (e.g. 452 too many
+        recipients) is split in half and each half sent on its own.
+
+        Errors at the DATA stage (SMTPDataError, e.g. 554 content rejected)
+        are about the message, not the recipients: they propagate and fail
+        the batch, and never reach the suppression list.
+        """
+        attempt = 0
+        while groups:
+            retry = []
+            for recipients, message in groups:
+                addresses = [self._address(r) for r in recipients]
+                try:
+                    with span("smtp:sendmail"), SMTP_SEND_SECONDS.time(transport=self.transport.name):
+                        refused = server.sendmail(from_address, addresses, message)
+                except smtplib.SMTPRecipientsRefused as e:
+                    refused = e.recipients
+                    if len(recipients) > 1 and any(400 <= code < 500 for code, _ in refused.values()):
+                        half = len(recipients) // 2
+                        self._send_tracked(server, from_address, [(recipients[:half], message), (recipients[half:], message)], result)
+                        continue
+
+                temporary = []
+                for recipient, address in zip(recipients, addresses):
+                    if address not in refused:
+                        result["sent"].append(recipient)
+                        continue
+                    code, error = refused[address]
+                    if 400 <= code < 500 and attempt < self.recipient_retries:
+                        temporary.append(recipient)
+                    else:
+                        print(f"   ⚠️  Recipient {address} refused: {self._smtp_detail(code, error)}")
+                        result["failed"].append(recipient)
+                        result["errors"][address] = self._smtp_detail(code, error)
+                if temporary:
+                    retry.append((temporary, message))
+
+            if retry:
+                with span("smtp:retry_backoff"):
+                    time.sleep(self.recipient_retry_backoff * (2 ** attempt))
+            groups = retry
+            attempt += 1
+
+    def _deliver(self, recipients: list, priority: str, send_chunk) -> dict:
+        """
+        Send to `recipients` through the sender pool.
+
+        Accounts are picked by weighted round-robin and each one takes as many
+        recipients as its quota allows. An account that fails authentication
+        or reports its sending limit leaves the rotation and whatever it had
+        not sent fails over to the next account.
+
+        If delivery stops on an error, the error carries what was done so far
+        as `partial_delivery` (same shape as the return value), so callers
+        can retry only the recipients that didn't get the mail.
+
+        Args:
+            recipients: Emails, or (email, unsubscribe_token) pairs
+            priority: EmailQuota priority the recipients are reserved under
+            send_chunk: send_chunk(server, account, chunk, result) sends a chunk over a
+                transport session, appending to result["sent"] / result["failed"]
+
+        Returns:
+            {"sent": [...], "failed": [refused by the server], "errors": {email: server reply},
+             "unsent": [no account had quota left]}
+        """
+        pending = list(recipients)
+        result = {"sent": [], "failed": [], "errors": {}}
+        auth_error = None
+
+        while pending:
+            with span("smtp:reserve_quota"):
+                account, granted = self.pool.acquire(len(pending), priority)
+            if account is None:
+                break
+            chunk, pending = pending[:granted], pending[granted:]
+            sent_before, failed_before = len(result["sent"]), len(result["failed"])
+            try:
+                with span("smtp:session"), self.transport.session(account) as server:
+                    send_chunk(server, account, chunk, result)
+                self.pool.mark_ok(account)
+                # Refused recipients don't count against the quota
+                account.quota.refund(len(chunk) - (len(result["sent"]) - sent_before))
+            except Exception as e:
+                handled = set(result["sent"][sent_before:] + result["failed"][failed_before:])
+                unsent = [r for r in chunk if r not in handled]
+                if self._is_limit_error(e):
+                    # Gmail says the account is done for today; its quota is already marked used up
+                    self.pool.mark_exhausted(account, e)
+                else:
+                    account.quota.refund(len(chunk) - (len(result["sent"]) - sent_before))
+                    if not isinstance(e, smtplib.SMTPAuthenticationError):
+                        e.partial_delivery = {**result, "unsent": unsent + pending}
+                        raise
+                    auth_error = e
+                    self.pool.mark_auth_failed(account, e)
+                # Hand what this account didn't send to the next one
+                pending = unsent + pending
+
+        if pending and auth_error and not self.pool.healthy():
+            error = self._auth_error(auth_error)
+            error.partial_delivery = {**result, "unsent": pending}
+            raise error
+        return {**result, "unsent": pending}
+
+    def _send(self, to_email: str, subject: str, html_content: str, priority: str = EmailQuota.PRIORITY_TRANSACTIONAL):
+        html_content = minify_html(html_content)
+        text_content = html_to_text(html_content)
+
+        def send_chunk(server, account, chunk, result):
             message = MIMEMultipart("alternative")
-            message["From"] = f"{self.from_name} <{self.gmail_address}>"
+            message["From"] = f"{self.from_name} <{account.address}>"
             message["To"] = to_email
             message["Subject"] = subject
             message["Reply-To"] = self.gmail_address
 
-            html_part = MIMEText(html_content, "html")
-            message.attach(html_part)
+            # Plain-text alternative first, so clients pick the HTML part
+            message.attach(MIMEText(text_content, "plain", "utf-8"))
+            message.attach(MIMEText(html_content, "html", "utf-8"))
 
-            with smtplib.SMTP("smtp.gmail.com", 587) as server:
-                server.starttls()
-                server.login(self.gmail_address, self.gmail_app_password)
-                server.sendmail(self.gmail_address, to_email, message.as_string())
+            self._send_tracked(server, account.address, [([to_email], message.as_string())], result)
 
-            # Increment individual emails sent counter
-            self._increment_total_emails_sent(1, email_type="individual")
-            print("E-Mail has been sent")
-            return 200
-
-        except smtplib.SMTPAuthenticationError as e:
-            # Track individual email failure
-            self._increment_total_emails_failed(1, email_type="individual")
-            raise ValueError(
-                "Gmail SMTP Authentication Error. Possible causes:\n"
-                "1. Invalid Gmail address or app password\n"
-                "2. App password not generated correctly (use https://myaccount.google.com/apppasswords)\n"
-                "3. 2-Step Verification not enabled on Google account\n"
-                f"Details: {str(e)}"
-            )
+        try:
+            # Transactional emails (verification etc.) may use the budget reserved for them
+            result = self._deliver([to_email], priority, send_chunk)
         except Exception as e:
             # Track individual email failure
             self._increment_total_emails_failed(1, email_type="individual")
             print(f"Failed to send email: {str(e)}")
             raise
 
-    def _send_batch_bcc(self, bcc_emails: list, subject: str, html_content: str):
-        """Send a single email to multiple recipients via BCC for higher throughput."""
-        try:
-            if not bcc_emails:
-                raise ValueError("BCC recipient list cannot be empty")
+        if result["unsent"]:
+            self._increment_total_emails_failed(1, email_type="individual")
+            raise EmailQuotaExceededError(f"Daily email quota reached, not sending to {to_email}")
+        if result["failed"]:
+            self._increment_total_emails_failed(1, email_type="individual")
+            raise smtplib.SMTPRecipientsRefused({to_email: (550, result["errors"][to_email].encode("utf-8"))})
 
-            message = MIMEMultipart("alternative")
-            message["From"] = f"{self.from_name} <{self.gmail_address}>"
-            message["Subject"] = subject
-            message["Reply-To"] = self.gmail_address
+        # Increment individual emails sent counter
+        self._increment_total_emails_sent(1, email_type="individual")
+        print("E-Mail has been sent")
+        return 200
+
+    def _send_batch_bcc(self, bcc_emails: list, prepared: PreEncodedMessage) -> dict:
+        """
+        Send one email to multiple recipients via BCC for higher throughput.
 
-            html_part = MIMEText(html_content, "html")
-            message.attach(html_part)
-
-            with smtplib.SMTP("smtp.gmail.com", 587) as server:
-                server.starttls()
-                server.login(self.gmail_address, self.gmail_app_password)
-                server.sendmail(self.gmail_address, bcc_emails, message.as_string())
-
-            # Increment batch emails sent counter
-            self._increment_total_emails_sent(len(bcc_emails), email_type="batch")
-            print(f"E-Mail has been sent to {len(bcc_emails)} recipients via BCC")
-            return 200
-
-        except smtplib.SMTPAuthenticationError as e:
-            # Track batch email failure (all recipients in this batch failed)
-            self._increment_total_emails_failed(len(bcc_emails), email_type="batch")
-            raise ValueError(
-                "Gmail SMTP Authentication Error. Possible causes:\n"
-                "1. Invalid Gmail address or app password\n"
-                "2. App password not generated correctly (use https://myaccount.google.com/apppasswords)\n"
-                "3. 2-Step Verification not enabled on Google account\n"
-                f"Details: {str(e)}"
-            )
+        The body is already encoded (prepare_job_alert); each sender account
+        only stamps its own From header on it.
+
+        Returns:
+            {"sent": int, "failed": [refused emails], "errors": {email: server reply},
+             "unsent": [emails no sender account had quota for]}
+        """
+        if not bcc_emails:
+            raise ValueError("BCC recipient list cannot be empty")
+
+        def send_chunk(server, account, chunk, result):
+            self._send_tracked(server, account.address, [(chunk, prepared.render(account.address))], result)
+
+        try:
+            result = self._deliver(bcc_emails, EmailQuota.PRIORITY_ALERT, send_chunk)
         except Exception as e:
-            # Track batch email failure (all recipients in this batch failed)
-            self._increment_total_emails_failed(len(bcc_emails), email_type="batch")
+            # Only recipients that didn't get the mail count as failed
+            sent = len(getattr(e, "partial_delivery", {}).get("sent", []))
+            if sent:
+                self._increment_total_emails_sent(sent, email_type="batch")
+            self._increment_total_emails_failed(len(bcc_emails) - sent, email_type="batch")
             print(f"Failed to send batch email: {str(e)}")
             raise
 
+        # Increment batch emails sent counter
+        self._increment_total_emails_sent(len(result["sent"]), email_type="batch")
+        if result["failed"]:
+            self._increment_total_emails_failed(len(result["failed"]), email_type="batch")
+        print(f"E-Mail has been sent to {len(result['sent'])} recipients via BCC")
+        return {"sent": len(result["sent"]), "failed": result["failed"], "errors": result["errors"], "unsent": result["unsent"]}
+
     def send_verification_email(self, email: str, verify_link: str):
         template = self._load_template("verify_subscription.html")
         # print(verify_link)
@@ -249,39 +434,7 @@ class GmailService:
     def send_job_alert_email(self, email: str, openings: list, unsubscribe_token: str):
         template = self._load_template("job_alert.html")
 
-        job_cards_html = ""
-
-        for job in openings:
-            skills = ", ".join(job.get("requiredSkills", [])) or "Not specified"
-            duration_html = f"<span>⏳ {job.get('duration')}</span>" if job.get("duration") else ""
-
-            card = f"""
-            <div class="job-card">
-              <div class="job-title">{job.get("role", "N/A")}</div>
-              <div class="company">{job.get("company", "N/A")}</div>
-
-              <div class="meta">
-                <span>📌 {job.get("employmentType", "N/A")}</span>
-                <span>🏠 {job.get("workMode", "N/A")}</span>
-                <span>📍 {job.get("location", "N/A")}</span>
-                {duration_html}
-              </div>
-
-              <div class="skills">
-                <strong>Skills:</strong> {skills}
-              </div>
-
-              <div class="summary">
-                {job.get("summary", "No description available")}
-              </div>
-
-              <a class="apply-btn" href="{job.get("applyLink", "#")}" target="_blank">
-                Apply Now →
-              </a>
-            </div>
-            """
-
-            job_cards_html += card
+        job_cards_html = self._render_job_cards(openings)
 
         unsubscribe_link = f"{BASE_URL}/unsubscribe/{unsubscribe_token}"
 
@@ -296,61 +449,114 @@ class GmailService:
         return self._send(
             to_email=email,
             subject=f"🚨 New Job Openings ({len(openings)})",
-            html_content=html
+            html_content=html,
+            priority=EmailQuota.PRIORITY_ALERT
         )
 
-    def send_job_alert_email_batch(self, bcc_emails: list, openings: list):
-        """Send job alert emails to multiple recipients via BCC for higher throughput."""
-        template = self._load_template("job_alert.html")
-
-        job_cards_html = ""
-
-        for job in openings:
-            skills = ", ".join(job.get("requiredSkills", [])) or "Not specified"
-            duration_html = f"<span>⏳ {job.get('duration')}</span>" if job.get("duration") else ""
-
-            card = f"""
-            <div class="job-card">
-              <div class="job-title">{job.get("role", "N/A")}</div>
-              <div class="company">{job.get("company", "N/A")}</div>
-
-              <div class="meta">
-                <span>📌 {job.get("employmentType", "N/A")}</span>
-                <span>🏠 {job.get("workMode", "N/A")}</span>
-                <span>📍 {job.get("location", "N/A")}</span>
-                {duration_html}
-              </div>
-
-              <div class="skills">
-                <strong>Skills:</strong> {skills}
-              </div>
+    @staticmethod
+    def _job_alert_subject(openings: list, cadence: str | None = None) -> str:
+        if cadence:
+            return f"📬 Your {cadence} job digest ({len(openings)} openings)"
+        return f"🚨 New Job Openings ({len(openings)})"
+
+    def send_job_alert_email_batch(
+        self,
+        bcc_emails: list,
+        openings: list,
+        cadence: str | None = None,
+        prepared: PreEncodedMessage | None = None
+    ):
+        """
+        Send job alert emails to multiple recipients via BCC for higher throughput.
 
-              <div class="summary">
-                {job.get("summary", "No description available")}
-              </div>
+        BCC recipients won't have personalized unsubscribe links. Pass `prepared`
+        to reuse a message already encoded for these openings.
+        """
+        return self._send_batch_bcc(
+            bcc_emails=bcc_emails,
+            prepared=prepared or self.prepare_job_alert(openings, cadence)
+        )
 
-              <a class="apply-btn" href="{job.get("applyLink", "#")}" target="_blank">
-                Apply Now →
-              </a>
-            </div>
-            """
+    @timed("email:prepare")
+    def prepare_job_alert(self, openings: list, cadence: str | None = None) -> PreEncodedMessage:
+        """
+        Render, minify and encode the job alert (HTML + plain text) once so it
+        can be stamped per batch or personalized per recipient.
 
-            job_cards_html += card
+        Args:
+            cadence: "daily" / "weekly" for a digest (changes the subject), None for an instant alert
+        """
+        template = self._load_template("job_alert.html")
 
         html = (
             template
-            .replace("{{ JOB_CARDS }}", job_cards_html)
-            .replace("{{ unsubscribeLink }}", "#")  # BCC recipients won't have personalized unsubscribe links
+            .replace("{{ JOB_CARDS }}", self._render_job_cards(openings))
             .replace("{{ year }}", str(datetime.now().year))
             .replace("{{ jobCount }}", str(len(openings)))
         )
 
-        return self._send_batch_bcc(
-            bcc_emails=bcc_emails,
-            subject=f"🚨 New Job Openings ({len(openings)})",
-            html_content=html
+        return PreEncodedMessage(
+            from_name=self.from_name,
+            reply_to=self.gmail_address,
+            subject=self._job_alert_subject(openings, cadence),
+            html=html
         )
 
+    def send_job_alert_email_personalized(self, recipients: list, prepared: PreEncodedMessage) -> dict:
+        """
+        Send a prepared job alert to each recipient individually, with their own unsubscribe link.
+
+        Each sender account sends its share over one SMTP connection; only the
+        From/To/List-Unsubscribe headers and footer differ between messages.
+
+        Args:
+            recipients: [(email, unsubscribe_token)]
+            prepared: Result of prepare_job_alert()
+
+        Returns:
+            {"sent": int, "failed": [emails refused by the server], "errors": {email: server reply},
+             "unsent": [emails no sender account had quota for]}
+        """
+        if not recipients:
+            raise ValueError("Recipient list cannot be empty")
+
+        def send_chunk(server, account, chunk, result):
+            self._send_tracked(server, account.address, [
+                ([(email, unsubscribe_token)], prepared.render(account.address, email, f"{BASE_URL}/unsubscribe/{unsubscribe_token}"))
+                for email, unsubscribe_token in chunk
+            ], result)
+
+        try:
+            result = self._deliver(recipients, EmailQuota.PRIORITY_ALERT, send_chunk)
+        except Exception as e:
+            # Only recipients that didn't get the mail count as failed
+            sent = len(getattr(e, "partial_delivery", {}).get("sent", []))
+            if sent:
+                self._increment_total_emails_sent(sent, email_type="batch")
+            self._increment_total_emails_failed(len(recipients) - sent, email_type="batch")
+            if hasattr(e, "partial_delivery"):
+                # Report emails like the return value does
+                e.partial_delivery = {
+                    key: [email for email, _ in value] if key != "errors" else value
+                    for key, value in e.partial_delivery.items()
+                }
+            print(f"Failed to send personalized emails: {str(e)}")
+            raise
+
+        sent = len(result["sent"])
+        failed = [email for email, _ in result["failed"]]
+        if sent:
+            self._increment_total_emails_sent(sent, email_type="batch")
+        if failed:
+            self._increment_total_emails_failed(len(failed), email_type="batch")
+        print(f"E-Mail has been sent to {sent} recipients individually")
+        return {
+            "sent": sent,
+            "failed": failed,
+            "errors": result["errors"],
+            "unsent": [email for email, _ in result["unsent"]]
+        }
+
     def send_unsubscribe_email(self, email: str):
         template = self._load_template("unsubscribe.html")
 
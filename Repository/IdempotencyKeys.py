@@ -0,0 +1,90 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+from Repository.Firebase import Firebase
+
+
+class IdempotencyKeys:
+    """
+    Recent Idempotency-Key values of POST requests and the responses they got.
+
+    A request with a key first claims it (claim); once the work is queued the
+    response is stored with it (store). A retry with the same key gets the
+    stored response back instead of starting another fan-out. Keys expire
+    after IDEMPOTENCY_KEY_TTL_HOURS and are then free to be used again.
+
+    Docs are keyed by a hash of (scope, key), so any client-chosen string is a
+    valid key and the same key can be used for different endpoints.
+    """
+
+    STATE_IN_PROGRESS = "in_progress"
+    STATE_COMPLETED = "completed"
+
+    def __init__(self):
+        self.firebase = Firebase()
+        self.collection_name = "idempotency_keys"
+        self.ttl_ms = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24")) * 60 * 60 * 1000
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(datetime.now(timezone.utc).timestamp() * 1000)
+
+    @staticmethod
+    def _doc_id(scope: str, key: str) -> str:
+        return hashlib.sha256(f"{scope}:{key}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def request_hash(payload) -> str:
+        """Stable hash of a JSON-serializable request body."""
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def claim(self, scope: str, key: str, request_hash: str) -> dict | None:
+        """
+        Claim a key for a new request.
+
+        Returns:
+            None if the key was free (or expired) and is now claimed, otherwise
+            the live record: {"state", "requestHash", "response", "statusCode", ...}
+        """
+        existing = {}
+
+        def take(current):
+            now = self._now_ms()
+            if current and current.get("expiresAt", 0) > now:
+                existing.update(current)
+                return None
+            # merge=True writes: reset every field a previous (expired) use may have left
+            return {
+                "scope": scope,
+                "state": self.STATE_IN_PROGRESS,
+                "requestHash": request_hash,
+                "response": None,
+                "statusCode": None,
+                "createdAt": now,
+                "expiresAt": now + self.ttl_ms,
+            }
+
+        claimed = self.firebase.transactional_update(self.collection_name, self._doc_id(scope, key), take)
+        return None if claimed is not None else existing
+
+    def store(self, scope: str, key: str, response: dict, status_code: int):
+        """Keep the response of a claimed key so retries get the same answer."""
+        self.firebase.update_document(self.collection_name, self._doc_id(scope, key), {
+            "state": self.STATE_COMPLETED,
+            "response": response,
+            "statusCode": status_code,
+        })
+
+    def release(self, scope: str, key: str):
+        """Free a claimed key whose request failed before doing anything, so it can be retried."""
+        self.firebase.delete_document(self.collection_name, self._doc_id(scope, key))
+
+    def clear_expired(self) -> int:
+        """Delete expired keys. Returns the number deleted."""
+        expired = self.firebase.query_page(
+            self.collection_name, filters=[("expiresAt", "<", self._now_ms())], limit=None
+        )
+        for doc in expired:
+            self.firebase.delete_document(self.collection_name, doc["id"])
+        return len(expired)
@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from Repository.Firebase import Firebase
+from utils.helpers import job_fingerprint
+from utils.inverted_index import InvertedIndex, INDEXED_FIELDS
+from utils.metrics import CACHE_REQUESTS
+
+
+class JobArchive:
+    """
+    Archive of every opening that was extracted or posted, backing the public /jobs API.
+
+    Jobs are stored in the `jobs` collection keyed by job_fingerprint(), so
+    re-saving the same opening is idempotent.
+
+    Searches run against an in-memory InvertedIndex (skill, location, workMode,
+    employmentType), so /jobs costs no Firestore reads per request. The index
+    is built at app startup from a compact local snapshot (JOB_INDEX_SNAPSHOT_PATH)
+    plus only the jobs newer than the snapshot, is updated incrementally when
+    jobs are saved, and catches up on other instances' writes every
+    JOBS_CACHE_TTL_SECONDS in a background thread, so requests never wait on
+    Firestore. Listing responses are additionally cached per query.
+    """
+
+    PUBLIC_FIELDS = (
+        "role", "company", "employmentType", "workMode", "location",
+        "duration", "requiredSkills", "summary", "applyLink", "createdAt"
+    )
+    MAX_PAGE_SIZE = 100
+    MAX_CACHE_ENTRIES = 1000
+
+    def __init__(self):
+        self.firebase = Firebase()
+        self.collection_name = "jobs"
+        self.cache_ttl_seconds = int(os.getenv("JOBS_CACHE_TTL_SECONDS", "300"))
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.cache_version = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self.index = InvertedIndex()
+        self.index_lock = threading.Lock()
+        self.index_synced_at = None
+        self.refreshing = False
+        self.snapshot_path = Path(os.getenv(
+            "JOB_INDEX_SNAPSHOT_PATH",
+            str(Path(__file__).parent.parent / ".cache" / "job_index_snapshot.json")
+        ))
+
+    @staticmethod
+    def _key(value) -> str:
+        return " ".join((value or "").lower().split())
+
+    def _to_document(self, job: dict, source: str, created_at: int) -> tuple[str, dict]:
+        doc_id = job_fingerprint(job)
+        skills = [s for s in job.get("requiredSkills") or [] if s]
+        return doc_id, {
+            "role": job.get("role"),
+            "company": job.get("company"),
+            "employmentType": job.get("employmentType"),
+            "workMode": job.get("workMode"),
+            "location": job.get("location"),
+            "duration": job.get("duration"),
+            "requiredSkills": skills,
+            "summary": job.get("summary"),
+            "applyLink": job.get("applyLink"),
+            "source": source,
+            "createdAt": created_at,
+            # Unique, time-ordered sort key doubles as the pagination cursor
+            "sortKey": f"{created_at:013d}-{doc_id}",
+            "employmentTypeKey": self._key(job.get("employmentType")),
+            "workModeKey": self._key(job.get("workMode")),
+            "locationKey": self._key(job.get("location")),
+            "skillKeys": sorted({self._key(s) for s in skills}),
+        }
+
+    def save_jobs(self, openings: list, source: str) -> int:
+        """
+        Store openings in the archive and invalidate cached listings.
+
+        Args:
+            openings: Job openings (dicts shaped like JobOpening)
+            source: "cron_job_alert" or "post_job"
+
+        Returns:
+            Number of jobs written
+        """
+        if not openings:
+            return 0
+
+        created_at = int(datetime.now(timezone.utc).timestamp() * 1000)
+        documents = dict(self._to_document(job, source, created_at) for job in openings)
+        self.firebase.batch_set_documents(self.collection_name, documents)
+
+        with self.index_lock:
+            if self.index_synced_at is not None:
+                for doc_id, doc in documents.items():
+                    self.index.add(doc_id, self._index_record(doc_id, doc))
+                self._write_snapshot()
+
+        self.invalidate_cache()
+        print(f"   🗄️  Archived {len(documents)} job(s)")
+        return len(documents)
+
+    def invalidate_cache(self):
+        with self.cache_lock:
+            self.cache_version += 1
+            self.cache.clear()
+
+    @staticmethod
+    def encode_cursor(sort_key: str) -> str:
+        return base64.urlsafe_b64encode(sort_key.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> str:
+        try:
+            return base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    # ================== INDEX ==================
+
+    def _index_record(self, doc_id: str, doc: dict) -> dict:
+        """Compact record kept in memory and in the snapshot."""
+        record = {"id": doc_id, "sortKey": doc["sortKey"]}
+        record.update({f: doc.get(f) for f in self.PUBLIC_FIELDS})
+        return record
+
+    def _read_snapshot(self) -> list:
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+        fields = snapshot.get("fields", [])
+        return [dict(zip(fields, row)) for row in snapshot.get("rows", [])]
+
+    def _write_snapshot(self):
+        """Persist the index as column names + value rows (no repeated keys)."""
+        try:
+            fields = ["id", "sortKey", *self.PUBLIC_FIELDS]
+            rows = [[job.get(f) for f in fields] for job in self.index.docs.values()]
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.snapshot_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fields": fields, "rows": rows}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            print(f"   ⚠️  Failed to write job index snapshot: {str(e)}")
+
+    def _newer_docs(self, newest: str | None) -> list:
+        """Jobs written after sortKey `newest` (all jobs if None). Called without index_lock held."""
+        return self.firebase.query_page(
+            self.collection_name,
+            filters=[("sortKey", ">", newest)] if newest else None,
+            order_by="sortKey",
+            descending=False,
+            limit=None
+        )
+
+    def _add_docs(self, index: InvertedIndex, docs: list):
+        for doc in docs:
+            index.add(doc["id"], self._index_record(doc["id"], doc))
+
+    def load_index(self) -> int:
+        """
+        Build the index from the local snapshot, then fetch only newer jobs.
+        The new index is built aside and swapped in, so readers never see it half-built.
+        """
+        index = InvertedIndex()
+        for row in self._read_snapshot():
+            index.add(row["id"], row)
+        from_snapshot = len(index)
+        docs = self._newer_docs(index.sort_keys[-1] if index.sort_keys else None)
+        self._add_docs(index, docs)
+
+        with self.index_lock:
+            self.index = index
+            self.index_synced_at = time.monotonic()
+            if docs:
+                self._write_snapshot()
+        print(f"   🗂️  Job index loaded: {from_snapshot} from snapshot, {len(docs)} from Firestore")
+        return len(index)
+
+    def _refresh_index(self):
+        """Index jobs other instances wrote since the newest one we know about."""
+        try:
+            with self.index_lock:
+                newest = self.index.sort_keys[-1] if self.index.sort_keys else None
+            # Firestore read outside the lock so /jobs requests aren't held up by it
+            docs = self._newer_docs(newest)
+            with self.index_lock:
+                self._add_docs(self.index, docs)
+                self.index_synced_at = time.monotonic()
+                if docs:
+                    self._write_snapshot()
+            if docs:
+                self.invalidate_cache()
+        except Exception as e:
+            print(f"   ⚠️  Job index catch-up failed: {str(e)}")
+        finally:
+            self.refreshing = False
+
+    def _ensure_index(self):
+        """
+        Load the index if startup didn't (blocking), otherwise start a
+        background catch-up once it is older than JOBS_CACHE_TTL_SECONDS and
+        keep serving the current index meanwhile.
+        """
+        if self.index_synced_at is None:
+            self.load_index()
+            return
+        if time.monotonic() - self.index_synced_at < self.cache_ttl_seconds:
+            return
+        with self.cache_lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self._refresh_index, name="job-index-refresh", daemon=True).start()
+
+    def _fetch_page(self, filters: dict, skill_mode: str, cursor: str | None, limit: int) -> dict:
+        self._ensure_index()
+        before = self.decode_cursor(cursor) if cursor else None
+        # save_jobs() and the background catch-up change the index under the same lock
+        with self.index_lock:
+            # Fetch one extra row to know whether another page exists
+            jobs = self.index.query(filters, skill_mode=skill_mode, before=before, limit=limit + 1)
+        page = jobs[:limit]
+        next_cursor = self.encode_cursor(page[-1]["sortKey"]) if len(jobs) > limit else None
+
+        return {
+            "jobs": [{"id": job["id"], **{f: job.get(f) for f in self.PUBLIC_FIELDS}} for job in page],
+            "nextCursor": next_cursor,
+        }
+
+    def list_jobs(
+        self,
+        filters: dict,
+        skill_mode: str = "any",
+        cursor: str | None = None,
+        limit: int = 20
+    ) -> tuple[dict, str]:
+        """
+        Return one page of archived jobs, newest first, plus its ETag.
+
+        Args:
+            filters: {field: [values]} for skill, location, workMode, employmentType.
+                Values of one field are ORed, fields are ANDed.
+            skill_mode: "all" to require every listed skill instead of any
+            cursor: nextCursor from the previous page
+            limit: Page size (capped at MAX_PAGE_SIZE)
+
+        Returns:
+            (body, etag)
+        """
+        limit = max(1, min(limit, self.MAX_PAGE_SIZE))
+        normalized = {
+            field: sorted({self._key(v) for v in filters.get(field) or [] if self._key(v)})
+            for field in INDEXED_FIELDS
+        }
+        cache_key = json.dumps(
+            {"filters": normalized, "skillMode": skill_mode, "cursor": cursor, "limit": limit},
+            sort_keys=True
+        )
+
+        with self.cache_lock:
+            entry = self.cache.get(cache_key)
+            if entry and time.monotonic() - entry[0] < self.cache_ttl_seconds:
+                self.cache.move_to_end(cache_key)
+                self.cache_hits += 1
+                CACHE_REQUESTS.inc(cache="jobs_page", result="hit")
+                return entry[1], entry[2]
+            self.cache_misses += 1
+            CACHE_REQUESTS.inc(cache="jobs_page", result="miss")
+            version = self.cache_version
+
+        body = self._fetch_page(normalized, skill_mode, cursor, limit)
+        etag = '"' + hashlib.sha1(json.dumps(body, sort_keys=True, default=str).encode("utf-8")).hexdigest() + '"'
+
+        with self.cache_lock:
+            # Don't cache a page fetched before jobs were saved mid-request
+            if version != self.cache_version:
+                return body, etag
+            self.cache[cache_key] = (time.monotonic(), body, etag)
+            self.cache.move_to_end(cache_key)
+            while len(self.cache) > self.MAX_CACHE_ENTRIES:
+                self.cache.popitem(last=False)
+
+        return body, etag
@@ -0,0 +1,162 @@
+import os
+from datetime import datetime, timezone, timedelta
+from Repository.Firebase import Firebase
+from utils.helpers import job_fingerprint, canonicalize_url
+from utils.minhash import (
+    job_shingles, minhash_signature, similarity, LSHIndex,
+    DEFAULT_SIMILARITY_THRESHOLD, DEFAULT_SIMILARITY_WINDOW_DAYS
+)
+
+
+class JobFingerprints:
+    """
+    Persistent cross-run index of openings that have already been mailed.
+
+    Each opening is keyed by job_fingerprint() (company, role, canonical apply link).
+    The full set of keys is loaded into memory once per run, lookups are O(1),
+    and new fingerprints are written back in bulk after fan-out.
+
+    Each fingerprint also stores a MinHash signature so near-duplicates
+    ("SDE Intern" vs "Software Development Engineer Intern") can be found
+    through an LSH index instead of comparing against the whole archive.
+    Only fingerprints recorded within JOB_SIMILARITY_WINDOW_DAYS count as
+    near-duplicate matches; exact matches are checked against all of them.
+    """
+
+    def __init__(self):
+        self.firebase = Firebase()
+        self.collection_name = "job_fingerprints"
+        self.similarity_threshold = float(os.getenv("JOB_SIMILARITY_THRESHOLD", str(DEFAULT_SIMILARITY_THRESHOLD)))
+        self.similarity_window = timedelta(days=int(os.getenv("JOB_SIMILARITY_WINDOW_DAYS", str(DEFAULT_SIMILARITY_WINDOW_DAYS))))
+        self.seen = None
+        self.lsh = None
+
+    def load(self) -> int:
+        """Load all known fingerprints and signatures into memory. Returns the index size."""
+        self.seen = set()
+        self.lsh = LSHIndex()
+        cutoff = self._window_start()
+        for doc in self.firebase.get_all_documents(self.collection_name):
+            self.seen.add(doc["id"])
+            if not self._in_window(doc, cutoff):
+                continue
+            # Rebuild shingles from the fields so fingerprints stored by an older
+            # shingling scheme compare like new ones; reuse the signature if unchanged
+            shingles = job_shingles(doc)
+            if not shingles:
+                continue
+            signature = doc.get("minhash")
+            if not signature or sorted(shingles) != doc.get("shingles"):
+                signature = minhash_signature(shingles)
+            self.lsh.add(doc["id"], shingles, signature, doc)
+        return len(self.seen)
+
+    def _window_start(self) -> datetime:
+        return datetime.now(timezone.utc) - self.similarity_window
+
+    @staticmethod
+    def _in_window(doc: dict, cutoff: datetime) -> bool:
+        created_at = doc.get("createdAt")
+        return isinstance(created_at, datetime) and created_at >= cutoff
+
+    def _ensure_loaded(self):
+        if self.seen is None:
+            self.load()
+
+    def _find_near_duplicate(self, shingles: set, signature: list, lsh: LSHIndex) -> tuple[dict | None, float]:
+        """Best LSH candidate, recorded within the window, whose similarity() meets the threshold."""
+        best, best_score = None, 0.0
+        cutoff = self._window_start()
+        for _, candidate_shingles, meta in lsh.candidates(signature):
+            # The in-memory index outlives a run: fingerprints can age out after load()
+            if not self._in_window(meta, cutoff):
+                continue
+            score = similarity(shingles, candidate_shingles)
+            if score >= self.similarity_threshold and score > best_score:
+                best, best_score = meta, score
+        return best, best_score
+
+    def filter_new(self, openings: list) -> tuple[list, list, list]:
+        """
+        Split openings into (new, duplicates, merges) against the persistent index.
+
+        Exact fingerprint matches and near-duplicates (MinHash/LSH candidates with
+        similarity() >= JOB_SIMILARITY_THRESHOLD, recorded within
+        JOB_SIMILARITY_WINDOW_DAYS) are both dropped, as are
+        repeats within `openings` itself. `merges` describes every near-duplicate
+        decision for the run report.
+        """
+        self._ensure_loaded()
+        new, duplicates, merges = [], [], []
+        batch_keys = set()
+        batch_lsh = LSHIndex()
+
+        for job in openings:
+            key = job_fingerprint(job)
+            if key in self.seen or key in batch_keys:
+                duplicates.append(job)
+                continue
+
+            shingles = job_shingles(job)
+            signature = minhash_signature(shingles)
+            match, score = self._find_near_duplicate(shingles, signature, self.lsh)
+            if match is None:
+                match, score = self._find_near_duplicate(shingles, signature, batch_lsh)
+
+            if match is not None:
+                duplicates.append(job)
+                merges.append({
+                    "role": job.get("role"),
+                    "company": job.get("company"),
+                    "mergedIntoRole": match.get("role"),
+                    "mergedIntoCompany": match.get("company"),
+                    "similarity": round(score, 3),
+                })
+                continue
+
+            batch_keys.add(key)
+            batch_lsh.add(key, shingles, signature, {
+                "role": job.get("role"),
+                "company": job.get("company"),
+                "createdAt": datetime.now(timezone.utc),
+            })
+            new.append(job)
+
+        return new, duplicates, merges
+
+    def record(self, openings: list, source: str) -> int:
+        """
+        Persist fingerprints for openings that have been delivered.
+
+        Args:
+            openings: Openings that were fanned out
+            source: Where they came from, e.g. "cron_job_alert" or "post_job"
+
+        Returns:
+            Number of new fingerprints written
+        """
+        self._ensure_loaded()
+        now = datetime.now(timezone.utc)
+        documents = {}
+        for job in openings:
+            key = job_fingerprint(job)
+            if key in self.seen or key in documents:
+                continue
+            shingles = job_shingles(job)
+            documents[key] = {
+                "company": job.get("company"),
+                "role": job.get("role"),
+                "employmentType": job.get("employmentType"),
+                "applyLink": canonicalize_url(job.get("applyLink") or ""),
+                "shingles": sorted(shingles),
+                "minhash": minhash_signature(shingles),
+                "source": source,
+                "createdAt": now,
+            }
+
+        if documents:
+            self.firebase.batch_set_documents(self.collection_name, documents)
+            self.seen.update(documents.keys())
+            for key, doc in documents.items():
+                self.lsh.add(key, set(doc["shingles"]), doc["minhash"], doc)
+        return len(documents)
@@ -0,0 +1,98 @@
+import uuid
+from datetime import datetime, timezone
+from Repository.Firebase import Firebase
+
+
+class JobRuns:
+    """
+    Status records for background job alert runs (cron and manual posts).
+
+    The endpoints create a run, return 202 with its ID and do the work in the
+    background; each stage writes its progress here so GET /api/runs/{id}
+    can report it while the run is still going.
+
+    Status flow: queued -> running -> succeeded | failed
+
+    Finished runs also keep their per-stage timings (utils.timing span tree).
+    """
+
+    def __init__(self):
+        self.firebase = Firebase()
+        self.collection_name = "job_runs"
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(datetime.now(timezone.utc).timestamp() * 1000)
+
+    @staticmethod
+    def new_run_id(kind: str) -> str:
+        return f"{kind}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    def create(self, kind: str, details: dict | None = None, run_id: str | None = None) -> str:
+        """
+        Register a queued run.
+
+        Args:
+            kind: "cron_job_alert" or "job_alert_manual"
+            details: Extra request info to keep with the run (e.g. jobs posted)
+            run_id: Pre-generated ID (e.g. one already used to take a lease)
+
+        Returns:
+            Run ID
+        """
+        run_id = run_id or self.new_run_id(kind)
+        self.firebase.set_document(self.collection_name, run_id, {
+            "runId": run_id,
+            "kind": kind,
+            "status": "queued",
+            "stage": "queued",
+            "progress": {},
+            "details": details or {},
+            "result": None,
+            "error": None,
+            "createdAt": self._now_ms(),
+            "startedAt": None,
+            "finishedAt": None,
+        })
+        return run_id
+
+    def start(self, run_id: str):
+        self.firebase.update_document(self.collection_name, run_id, {
+            "status": "running",
+            "stage": "starting",
+            "startedAt": self._now_ms(),
+        })
+
+    def progress(self, run_id: str | None, stage: str, **counts):
+        """
+        Record the current stage and merge progress counters (e.g. videosProcessed=2).
+        Progress writes never fail the run itself.
+        """
+        if not run_id:
+            return
+        update = {"stage": stage, "updatedAt": self._now_ms()}
+        update.update({f"progress.{key}": value for key, value in counts.items()})
+        try:
+            self.firebase.update_document(self.collection_name, run_id, update)
+        except Exception as e:
+            print(f"   ⚠️  Failed to record run progress for {run_id}: {str(e)}")
+
+    def complete(self, run_id: str, result: dict, timings: dict | None = None):
+        self.firebase.update_document(self.collection_name, run_id, {
+            "status": "succeeded",
+            "stage": "done",
+            "result": result,
+            "timings": timings,
+            "finishedAt": self._now_ms(),
+        })
+
+    def fail(self, run_id: str, error: str, timings: dict | None = None):
+        self.firebase.update_document(self.collection_name, run_id, {
+            "status": "failed",
+            "error": error,
+            "timings": timings,
+            "finishedAt": self._now_ms(),
+        })
+
+    def get(self, run_id: str) -> dict | None:
+        return self.firebase.get_document(self.collection_name, run_id)
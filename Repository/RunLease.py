@@ -0,0 +1,128 @@
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from Repository.Firebase import Firebase
+
+
+class LeaseLostError(Exception):
+    """Raised when a run no longer holds its lease (expired and taken over by a newer run)."""
+
+
+class RunLease:
+    """
+    Firestore-backed mutual exclusion for runs that must not overlap.
+
+    The lease lives in system_state/<name>_lease and holds the current holder,
+    an expiry (RUN_LEASE_TTL_SECONDS) and a fencing token that increases by one
+    on every acquisition. While a run works, a heartbeat thread renews the
+    lease; if the process dies, the lease simply expires and the next trigger
+    takes over with a higher token.
+
+    A run that stalls past its TTL may still wake up later, so every write
+    that must only happen once (sending, the cron_stats watermark) is checked
+    against the token: ensure_held() before the fact, fenced_set_document()
+    atomically with the write.
+    """
+
+    def __init__(self, name: str):
+        self.firebase = Firebase()
+        self.collection_name = "system_state"
+        self.doc_id = f"{name}_lease"
+        self.ttl_seconds = int(os.getenv("RUN_LEASE_TTL_SECONDS", "300"))
+        self.heartbeat_seconds = max(1, self.ttl_seconds // 3)
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(datetime.now(timezone.utc).timestamp() * 1000)
+
+    def acquire(self, holder: str) -> tuple[int | None, dict | None]:
+        """
+        Try to take the lease.
+
+        Returns:
+            (fencing_token, None) on success, or (None, current_lease) if another
+            holder's lease is still live.
+        """
+        blocked = {}
+
+        def take(current):
+            now = self._now_ms()
+            if current and current.get("holder") and current.get("expiresAt", 0) > now:
+                blocked.update(current)
+                return None
+            return {
+                "holder": holder,
+                "fencingToken": (current or {}).get("fencingToken", 0) + 1,
+                "acquiredAt": now,
+                "heartbeatAt": now,
+                "expiresAt": now + self.ttl_seconds * 1000,
+            }
+
+        updates = self.firebase.transactional_update(self.collection_name, self.doc_id, take)
+        if updates is None:
+            return None, blocked
+        return updates["fencingToken"], None
+
+    def _holds(self, lease: dict | None, token: int) -> bool:
+        return bool(lease) and lease.get("fencingToken") == token and lease.get("holder") is not None
+
+    def renew(self, token: int) -> bool:
+        """Extend the lease. Returns False if it was lost to a newer holder."""
+        def extend(current):
+            if not self._holds(current, token):
+                return None
+            now = self._now_ms()
+            return {"heartbeatAt": now, "expiresAt": now + self.ttl_seconds * 1000}
+
+        return self.firebase.transactional_update(self.collection_name, self.doc_id, extend) is not None
+
+    def release(self, token: int) -> bool:
+        def clear(current):
+            if not self._holds(current, token):
+                return None
+            return {"holder": None, "expiresAt": 0, "releasedAt": self._now_ms()}
+
+        return self.firebase.transactional_update(self.collection_name, self.doc_id, clear) is not None
+
+    def ensure_held(self, token: int):
+        """Raise LeaseLostError unless `token` is still the current lease."""
+        lease = self.firebase.get_document(self.collection_name, self.doc_id)
+        if not self._holds(lease, token):
+            raise LeaseLostError(f"Lease {self.doc_id} with fencing token {token} is no longer held")
+
+    def fenced_set_document(self, token: int, folder_name: str, doc_id: str, data: dict):
+        """Write a doc only while `token` holds the lease (checked in the same transaction)."""
+        written = self.firebase.set_document_if(
+            folder_name, doc_id, data,
+            self.collection_name, self.doc_id,
+            lambda lease: self._holds(lease, token)
+        )
+        if not written:
+            raise LeaseLostError(f"Lease {self.doc_id} with fencing token {token} is no longer held")
+
+    @contextmanager
+    def hold(self, token: int):
+        """Renew the lease every RUN_LEASE_TTL_SECONDS / 3 while the block runs, then release it."""
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(self.heartbeat_seconds):
+                try:
+                    if not self.renew(token):
+                        print(f"   ⚠️  Lease {self.doc_id} lost (fencing token {token})")
+                        return
+                except Exception as e:
+                    print(f"   ⚠️  Lease heartbeat failed: {str(e)}")
+
+        thread = threading.Thread(target=heartbeat, name=f"{self.doc_id}-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join(timeout=5)
+            try:
+                self.release(token)
+            except Exception as e:
+                print(f"   ⚠️  Failed to release lease {self.doc_id}: {str(e)}")
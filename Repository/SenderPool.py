@@ -0,0 +1,163 @@
+import os
+import re
+import json
+import time
+import threading
+from datetime import datetime, timezone
+from Repository.EmailQuota import EmailQuota
+
+
+class SenderAccount:
+    """One Gmail sender: credentials, round-robin weight, its own daily quota and health state."""
+
+    def __init__(self, address: str, app_password: str, weight: int = 1, daily_limit: int | None = None, quota_doc_id: str | None = None):
+        self.address = address
+        self.app_password = app_password
+        self.weight = max(1, int(weight))
+        slug = re.sub(r"[^a-z0-9]+", "_", address.lower()).strip("_")
+        self.quota = EmailQuota(doc_id=quota_doc_id or f"email_quota_{slug}", daily_limit=daily_limit)
+        self.current_weight = 0
+        # Health: out of rotation until this time.monotonic() after an auth error
+        self.unhealthy_until = 0.0
+        # {priority: UTC date} the account ran out of quota for that priority
+        self.exhausted_on = {}
+        self.consecutive_failures = 0
+        self.last_error = None
+
+
+class SenderPool:
+    """
+    Several Gmail sender accounts used as one delivery channel.
+
+    Configured with GMAIL_SENDERS, a JSON list of
+    {"address", "appPassword", "weight", "dailyQuota"}; without it the pool is
+    the single GMAIL_ADDRESS / GMAIL_APP_PASSWORD account (keeping the original
+    system_state/email_quota counter).
+
+    Each account has its own EmailQuota counter (system_state/email_quota_<address>).
+    Batches are assigned by smooth weighted round-robin over healthy accounts,
+    so an account with weight 2 gets twice the share of one with weight 1. An
+    account leaves the rotation when its quota for the day is used up, or for
+    GMAIL_SENDER_COOLDOWN_SECONDS after an authentication error; its share
+    fails over to the next account. Daily capacity is the sum of all accounts.
+    """
+
+    def __init__(self, accounts: list | None = None):
+        self.accounts = accounts if accounts is not None else self._accounts_from_env()
+        if not self.accounts:
+            raise ValueError("No Gmail sender accounts configured (set GMAIL_SENDERS or GMAIL_ADDRESS)")
+        self.cooldown_seconds = int(os.getenv("GMAIL_SENDER_COOLDOWN_SECONDS", "900"))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _accounts_from_env() -> list:
+        senders = os.getenv("GMAIL_SENDERS")
+        if senders:
+            return [
+                SenderAccount(
+                    address=sender["address"],
+                    app_password=sender["appPassword"],
+                    weight=sender.get("weight", 1),
+                    daily_limit=sender.get("dailyQuota")
+                )
+                for sender in json.loads(senders)
+            ]
+
+        address = os.getenv("GMAIL_ADDRESS")
+        app_password = os.getenv("GMAIL_APP_PASSWORD")
+        if not address:
+            raise ValueError("GMAIL_ADDRESS not found in environment variables")
+        if not app_password:
+            raise ValueError("GMAIL_APP_PASSWORD not found in environment variables")
+        return [SenderAccount(address, app_password, quota_doc_id="email_quota")]
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).date().isoformat()
+
+    @property
+    def primary(self) -> SenderAccount:
+        """First configured account; used as the Reply-To address."""
+        return self.accounts[0]
+
+    @property
+    def daily_limit(self) -> int:
+        return sum(account.quota.daily_limit for account in self.accounts)
+
+    def _is_healthy(self, account: SenderAccount) -> bool:
+        return account.unhealthy_until <= time.monotonic()
+
+    def _is_available(self, account: SenderAccount, priority: str) -> bool:
+        return self._is_healthy(account) and account.exhausted_on.get(priority) != self._today()
+
+    def healthy(self) -> bool:
+        """True if at least one account is not cooling down after an auth error."""
+        return any(self._is_healthy(account) for account in self.accounts)
+
+    def _next_account(self, priority: str) -> SenderAccount | None:
+        with self._lock:
+            candidates = [account for account in self.accounts if self._is_available(account, priority)]
+            if not candidates:
+                return None
+            total = sum(account.weight for account in candidates)
+            for account in candidates:
+                account.current_weight += account.weight
+            chosen = max(candidates, key=lambda account: account.current_weight)
+            chosen.current_weight -= total
+            return chosen
+
+    def acquire(self, count: int, priority: str = EmailQuota.PRIORITY_ALERT) -> tuple[SenderAccount | None, int]:
+        """
+        Pick the next account and reserve up to `count` recipients from its quota.
+
+        Returns:
+            (account, granted) with granted >= 1, or (None, 0) if no healthy
+            account has quota left today
+        """
+        while True:
+            account = self._next_account(priority)
+            if account is None:
+                return None, 0
+            granted = account.quota.reserve(count, priority)
+            if granted < count:
+                # Used up for today (for this priority); the rest goes to the next account
+                account.exhausted_on[priority] = self._today()
+            if granted:
+                return account, granted
+
+    def mark_ok(self, account: SenderAccount):
+        account.consecutive_failures = 0
+
+    def mark_auth_failed(self, account: SenderAccount, error: Exception):
+        """Take the account out of rotation for GMAIL_SENDER_COOLDOWN_SECONDS."""
+        account.unhealthy_until = time.monotonic() + self.cooldown_seconds
+        account.consecutive_failures += 1
+        account.last_error = str(error)
+        print(f"   ⚠️  Sender {account.address} failed to authenticate, out of rotation for {self.cooldown_seconds}s")
+
+    def mark_exhausted(self, account: SenderAccount, error: Exception):
+        """Gmail reported the account's sending limit: treat its quota as used up for today."""
+        account.exhausted_on = {
+            EmailQuota.PRIORITY_ALERT: self._today(),
+            EmailQuota.PRIORITY_TRANSACTIONAL: self._today()
+        }
+        account.last_error = str(error)
+        account.quota.exhaust()
+        print(f"   ⚠️  Sender {account.address} hit its Gmail sending limit, out of rotation until tomorrow")
+
+    def remaining(self, priority: str = EmailQuota.PRIORITY_ALERT) -> int:
+        """Recipients the healthy accounts can still take today."""
+        return sum(account.quota.remaining(priority) for account in self.accounts if self._is_healthy(account))
+
+    def status(self) -> list:
+        return [
+            {
+                "address": account.address,
+                "weight": account.weight,
+                "healthy": self._is_healthy(account),
+                "exhausted_today": self._today() in account.exhausted_on.values(),
+                "consecutive_failures": account.consecutive_failures,
+                "last_error": account.last_error,
+            }
+            for account in self.accounts
+        ]
@@ -0,0 +1,134 @@
+import os
+from datetime import datetime, timezone
+from Repository.Firebase import Firebase
+from utils.bounces import bounce_kind, read_bounce_mailbox
+
+
+class Suppressions:
+    """
+    Addresses job alerts are no longer sent to.
+
+    Fed by recipients the SMTP server refused during delivery and, when
+    BOUNCE_MAILBOX_PATH is set, by bounce notifications in a local mailbox.
+    Hard bounces (5xx) and manual blocks stay until an admin lifts them; soft
+    bounces (4xx) expire after SOFT_BOUNCE_SUPPRESSION_DAYS. The active set is
+    loaded into memory once per fan-out and checked in O(1) per subscriber.
+
+    Documents live in `email_suppressions`, keyed by lowercased email.
+    """
+
+    KIND_HARD = "hard"
+    KIND_SOFT = "soft"
+    KIND_MANUAL = "manual"
+
+    def __init__(self):
+        self.firebase = Firebase()
+        self.collection_name = "email_suppressions"
+        self.soft_bounce_days = int(os.getenv("SOFT_BOUNCE_SUPPRESSION_DAYS", "3"))
+        self.bounce_mailbox_path = os.getenv("BOUNCE_MAILBOX_PATH")
+        self.suppressed = None
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(datetime.now(timezone.utc).timestamp() * 1000)
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return (email or "").strip().lower()
+
+    def load(self) -> set:
+        """Load the active suppressions into memory, dropping expired soft bounces. Returns the set."""
+        now = self._now_ms()
+        suppressed = set()
+        for doc in self.firebase.get_all_documents(self.collection_name):
+            expires_at = doc.get("expiresAt")
+            if expires_at and expires_at <= now:
+                self.firebase.delete_document(self.collection_name, doc["id"])
+                continue
+            suppressed.add(doc["id"])
+        self.suppressed = suppressed
+        return suppressed
+
+    def is_suppressed(self, email: str) -> bool:
+        if self.suppressed is None:
+            self.load()
+        return self._key(email) in self.suppressed
+
+    def filter_subscribers(self, subscribers: list) -> tuple[list, list]:
+        """Split subscriber documents into (deliverable, suppressed) against the loaded set."""
+        if self.suppressed is None:
+            self.load()
+        deliverable, suppressed = [], []
+        for sub in subscribers:
+            (suppressed if self._key(sub.get("email")) in self.suppressed else deliverable).append(sub)
+        return deliverable, suppressed
+
+    def record(self, email: str, kind: str, reason: str, source: str):
+        """
+        Suppress an address (upsert). A soft bounce never downgrades a hard
+        bounce or manual block; it only pushes its own expiry forward.
+        """
+        key = self._key(email)
+        if not key:
+            return
+        now = self._now_ms()
+
+        def upsert(current):
+            current = current or {}
+            effective = kind
+            if kind == self.KIND_SOFT and current.get("kind") in (self.KIND_HARD, self.KIND_MANUAL):
+                effective = current["kind"]
+            return {
+                "email": key,
+                "kind": effective,
+                "reason": reason if effective == kind else current.get("reason"),
+                "source": source if effective == kind else current.get("source"),
+                "count": current.get("count", 0) + 1,
+                "firstSeenAt": current.get("firstSeenAt", now),
+                "lastSeenAt": now,
+                "expiresAt": now + self.soft_bounce_days * 24 * 60 * 60 * 1000 if effective == self.KIND_SOFT else None,
+            }
+
+        updates = self.firebase.transactional_update(self.collection_name, key, upsert)
+        if self.suppressed is not None and updates:
+            self.suppressed.add(key)
+
+    def record_refusals(self, failures: list, source: str = "smtp_refused") -> int:
+        """
+        Suppress recipients the server refused during delivery.
+
+        Args:
+            failures: [{"email", "error"}] with the SMTP reply (e.g. "550 5.1.1 no such user")
+
+        Returns:
+            Number of addresses recorded
+        """
+        recorded = 0
+        for failure in failures:
+            kind = bounce_kind(failure.get("error") or "")
+            if kind:
+                self.record(failure["email"], kind, failure.get("error"), source)
+                recorded += 1
+        return recorded
+
+    def import_bounces(self) -> int:
+        """Record the bounces waiting in BOUNCE_MAILBOX_PATH (consumed once read). Returns the number recorded."""
+        if not self.bounce_mailbox_path:
+            return 0
+        bounces = read_bounce_mailbox(self.bounce_mailbox_path)
+        for bounce in bounces:
+            self.record(bounce["email"], bounce["kind"], bounce["diagnostic"] or bounce["status"], "bounce_mailbox")
+        return len(bounces)
+
+    def lift(self, email: str) -> bool:
+        """Admin override: allow an address again. Returns False if it wasn't suppressed."""
+        key = self._key(email)
+        if not self.firebase.get_document(self.collection_name, key):
+            return False
+        self.firebase.delete_document(self.collection_name, key)
+        if self.suppressed is not None:
+            self.suppressed.discard(key)
+        return True
+
+    def list_all(self) -> list:
+        return self.firebase.get_all_documents(self.collection_name)
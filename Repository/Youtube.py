@@ -5,10 +5,55 @@ from dotenv import load_dotenv
 from googleapiclient.discovery import build
 from youtube_transcript_api import YouTubeTranscriptApi
 import google.generativeai as genai
+from utils.transcript import preprocess_transcript, estimate_tokens
+from utils.classifier import classify_job_video, DEFAULT_THRESHOLD
+from Repository.GeminiClient import GeminiClient, GeminiUnavailableError, GeminiRequestError
+from utils.timing import span
+from utils.metrics import YOUTUBE_QUOTA_UNITS
 
 
 load_dotenv(Path(__file__).parent.parent / ".env")
 
+# YouTube Data API quota units per call (default daily quota: 10,000)
+YOUTUBE_QUOTA_COST = {"search.list": 100, "videos.list": 1}
+
+STRICT_JSON_RULES = """IMPORTANT:
+- Respond with STRICT VALID JSON only.
+- No markdown.
+- No explanations.
+- No trailing commas.
+"""
+
+EXTRACTION_TASKS = """1. Determine whether this video contains one or more genuine job or internship openings.
+2. If multiple openings are mentioned, extract EACH opening separately.
+3. Ignore promotions, sponsorships, personal mentoring, WhatsApp channels, referrals, discounts, and unrelated links.
+4. Prefer official application links.
+5. Normalize and correct company names if misspelled.
+6. If workMode is "Remote", set location to "WFH".
+"""
+
+OPENING_SCHEMA = """    {
+      "company": string | null,
+      "role": string | null,
+      "employmentType": "Internship" | "Full-time" | "Contract" | null,
+      "workMode": "On-site" | "Remote" | "Hybrid" | null,
+      "duration": string | null,
+      "location": string | null,
+      "requiredSkills": [string],
+      "applyLink": string | null,
+      "summary": string
+    }"""
+
+
+def _is_valid_extraction(result) -> bool:
+    """Check a single video's extraction result has the expected shape."""
+    return (
+        isinstance(result, dict)
+        and isinstance(result.get("isJobVideo"), bool)
+        and isinstance(result.get("openings"), list)
+        and all(isinstance(opening, dict) for opening in result["openings"])
+    )
+
 
 class Youtube:
     """YouTube service for fetching videos and extracting job openings."""
@@ -16,7 +61,14 @@ class Youtube:
     def __init__(self):
         self.api_key = os.getenv("GCP_API_KEY")
         self.gemini_api_key = os.getenv("GEMINI_API_KEY")
-        self.gemini_model = "gemini-2.5-flash"
+        self.gemini_model = os.getenv("GEMINI_EXTRACT_MODEL", "gemini-2.5-flash")
+        self.gemini_classify_model = os.getenv("GEMINI_CLASSIFY_MODEL", "gemini-2.5-flash-lite")
+        self.tiered_extraction = os.getenv("GEMINI_TIERED_EXTRACTION", "true").lower() == "true"
+        self.transcript_token_budget = int(os.getenv("TRANSCRIPT_TOKEN_BUDGET", "2000"))
+        self.classifier_threshold = float(os.getenv("JOB_CLASSIFIER_THRESHOLD", str(DEFAULT_THRESHOLD)))
+        self.batch_extraction = os.getenv("GEMINI_BATCH_EXTRACTION", "true").lower() == "true"
+        self.batch_token_budget = int(os.getenv("GEMINI_BATCH_TOKEN_BUDGET", "8000"))
+        self.batch_max_videos = int(os.getenv("GEMINI_BATCH_MAX_VIDEOS", "5"))
 
         if not self.api_key:
             raise ValueError("GCP_API_KEY not found")
@@ -25,7 +77,28 @@ class Youtube:
 
         self.youtube = build("youtube", "v3", developerKey=self.api_key)
         genai.configure(api_key=self.gemini_api_key)
-        self.gemini = genai.GenerativeModel(self.gemini_model)
+        self.gemini = GeminiClient(self.gemini_model)
+        if self.gemini_classify_model == self.gemini_model:
+            # Same model means same quota: share the limiters
+            self.gemini_classifier = GeminiClient(
+                self.gemini_classify_model,
+                request_bucket=self.gemini.request_bucket,
+                token_bucket=self.gemini.token_bucket
+            )
+        else:
+            self.gemini_classifier = GeminiClient(self.gemini_classify_model)
+
+    def start_run(self):
+        """Reset per-run Gemini metrics and deadlines for both tiers."""
+        self.gemini_classifier.start_run()
+        self.gemini.start_run()
+
+    def gemini_metrics(self) -> dict:
+        """Per-tier latency, retry, token and cost metrics for the run summary."""
+        return {
+            "classify": self.gemini_classifier.metrics(),
+            "extract": self.gemini.metrics(),
+        }
 
     def get_recent_videos(
         self,
@@ -46,7 +119,9 @@ class Youtube:
             params["publishedAfter"] = published_after
 
         request = self.youtube.search().list(**params)
-        response = request.execute()
+        with span("youtube:search"):
+            response = request.execute()
+        YOUTUBE_QUOTA_UNITS.inc(YOUTUBE_QUOTA_COST["search.list"], method="search.list")
 
         videos = []
         for item in response.get("items", []):
@@ -60,19 +135,25 @@ class Youtube:
 
         return videos
 
-    def get_transcript(self, video_id: str) -> str:
+    def get_transcript_segments(self, video_id: str) -> list:
         try:
-            transcript = YouTubeTranscriptApi.get_transcript(video_id)
-            return " ".join(item["text"] for item in transcript)
+            with span("youtube:transcript"):
+                transcript = YouTubeTranscriptApi.get_transcript(video_id)
+            return [item["text"] for item in transcript]
         except Exception:
-            return ""
+            return []
+
+    def get_transcript(self, video_id: str) -> str:
+        return " ".join(self.get_transcript_segments(video_id))
 
     def get_title_description(self, video_id: str) -> dict:
         request = self.youtube.videos().list(
             part="snippet",
             id=video_id
         )
-        response = request.execute()
+        with span("youtube:videos"):
+            response = request.execute()
+        YOUTUBE_QUOTA_UNITS.inc(YOUTUBE_QUOTA_COST["videos.list"], method="videos.list")
 
         if not response.get("items"):
             return {"title": "", "description": ""}
@@ -86,12 +167,7 @@ class Youtube:
     def extract_jobs_with_gemini(self, title: str, description: str, transcript: str) -> dict:
         print(f"Extracting video {title}")
         prompt = f"""
-IMPORTANT:
-- Respond with STRICT VALID JSON only.
-- No markdown.
-- No explanations.
-- No trailing commas.
-
+{STRICT_JSON_RULES}
 You are an AI assistant that extracts job and internship openings from YouTube videos.
 
 Video Title:
@@ -104,44 +180,270 @@ Video Transcript:
 {transcript}
 
 Your Tasks:
-1. Determine whether this video contains one or more genuine job or internship openings.
-2. If multiple openings are mentioned, extract EACH opening separately.
-3. Ignore promotions, sponsorships, personal mentoring, WhatsApp channels, referrals, discounts, and unrelated links.
-4. Prefer official application links.
-5. Normalize and correct company names if misspelled.
-6. If workMode is "Remote", set location to "WFH".
-
+{EXTRACTION_TASKS}
 Return STRICT JSON ONLY:
 
 {{
   "isJobVideo": boolean,
   "openings": [
-    {{
-      "company": string | null,
-      "role": string | null,
-      "employmentType": "Internship" | "Full-time" | "Contract" | null,
-      "workMode": "On-site" | "Remote" | "Hybrid" | null,
-      "duration": string | null,
-      "location": string | null,
-      "requiredSkills": [string],
-      "applyLink": string | null,
-      "summary": string
-    }}
+{OPENING_SCHEMA}
   ]
 }}
 """
+        # GeminiUnavailableError (retries exhausted / deadline) propagates so the
+        # caller can keep the video unprocessed instead of dropping its jobs;
+        # GeminiRequestError (permanent) propagates so it can be logged
+        with span("gemini:extract"):
+            response_text = self.gemini.generate(prompt)
         try:
-            response = self.gemini.generate_content(prompt)
-            result = json.loads(response.text)
+            result = json.loads(response_text)
             print(f"✅ Successfully extracted: isJobVideo={result.get('isJobVideo')}, openings={len(result.get('openings', []))}")
             return result
         except json.JSONDecodeError as e:
             print(f"❌ JSON Parse Error from Gemini: {str(e)}")
-            print(f"   Gemini response was: {response.text[:200]}")
+            print(f"   Gemini response was: {response_text[:200]}")
             return {"isJobVideo": False, "openings": []}
+
+    def extract_jobs_batch_with_gemini(self, items: list) -> dict | None:
+        """
+        Extract openings for several prepared videos in a single Gemini request.
+
+        Returns {videoId: {"isJobVideo", "openings"}} or None if the response
+        fails validation or the request was rejected (caller falls back to
+        single-video calls).
+
+        Raises:
+            GeminiUnavailableError: Gemini can't be reached; single-video calls
+                would fail the same way, so there is no fallback
+        """
+        print(f"Extracting batch of {len(items)} videos: {[item['videoId'] for item in items]}")
+        video_blocks = "\n".join(
+            f"""
+=== VIDEO {item["videoId"]} ===
+Video Title:
+{item["title"]}
+
+Video Description:
+{item["description"]}
+
+Video Transcript:
+{item["transcript"]}
+"""
+            for item in items
+        )
+        prompt = f"""
+{STRICT_JSON_RULES}
+You are an AI assistant that extracts job and internship openings from YouTube videos.
+You are given {len(items)} videos. Treat each video independently and never mix openings between videos.
+{video_blocks}
+Your Tasks (for EACH video):
+{EXTRACTION_TASKS}
+Return STRICT JSON ONLY, with exactly one entry per video ID listed above:
+
+{{
+  "videos": {{
+    "<videoId>": {{
+      "isJobVideo": boolean,
+      "openings": [
+{OPENING_SCHEMA}
+      ]
+    }}
+  }}
+}}
+"""
+        try:
+            with span("gemini:extract_batch"):
+                videos = json.loads(self.gemini.generate(prompt)).get("videos")
+        except GeminiUnavailableError:
+            raise
         except Exception as e:
-            print(f"❌ Gemini Error: {type(e).__name__}: {str(e)}")
-            return {"isJobVideo": False, "openings": []}
+            print(f"❌ Batch Gemini Error: {type(e).__name__}: {str(e)}")
+            return None
+
+        if not isinstance(videos, dict):
+            print("❌ Batch response missing 'videos' object")
+            return None
+
+        results = {}
+        for item in items:
+            result = videos.get(item["videoId"])
+            if not _is_valid_extraction(result):
+                print(f"❌ Batch response invalid for video {item['videoId']}")
+                return None
+            results[item["videoId"]] = result
+
+        print(f"✅ Batch extracted: {sum(len(r['openings']) for r in results.values())} openings from {len(items)} videos")
+        return results
+
+    def prepare_video_for_extraction(self, video_id: str) -> dict:
+        """
+        Fetch metadata and run the local pre-classifier.
+
+        Videos scoring below JOB_CLASSIFIER_THRESHOLD come back with skip=True.
+        The transcript is only downloaded later (load_transcript) for videos
+        that survive classification.
+        """
+        meta = self.get_title_description(video_id)
+        item = {
+            "videoId": video_id,
+            "title": meta["title"],
+            "description": meta["description"],
+            "transcript": "",
+            "classification": classify_job_video(meta["title"], meta["description"], self.classifier_threshold),
+            "transcriptStats": None,
+            "skip": False,
+        }
+
+        if not item["classification"]["isLikelyJob"]:
+            print(f"   🚫 Pre-classifier skipped {video_id} (score={item['classification']['score']} < {self.classifier_threshold})")
+            item["skip"] = True
+
+        return item
+
+    def load_transcript(self, item: dict) -> dict:
+        """Download and trim the transcript for a prepared video (in place)."""
+        video_id = item["videoId"]
+        segments = self.get_transcript_segments(video_id)
+
+        if not segments:
+            print(f"   ⚠️  Transcript not available for {video_id}, trying with title/description only")
+
+        stats = preprocess_transcript(segments, self.transcript_token_budget, item["title"])
+        if stats["tokensSaved"]:
+            print(f"   ✂️  Transcript trimmed: {stats['originalTokens']} -> {stats['tokens']} tokens (saved {stats['tokensSaved']})")
+
+        item["transcript"] = stats["text"]
+        item["transcriptStats"] = {
+            "originalTokens": stats["originalTokens"],
+            "tokens": stats["tokens"],
+            "tokensSaved": stats["tokensSaved"],
+        }
+        return item
+
+    def classify_videos_with_gemini(self, items: list) -> dict:
+        """
+        Tier 1: ask the lightweight model only whether each video is a job post,
+        from title and description (no transcript).
+
+        Returns {videoId: bool}. Fails open: any error or missing key counts as
+        a positive so the full extraction still gets a chance.
+        """
+        video_blocks = "\n".join(
+            f"""
+=== VIDEO {item["videoId"]} ===
+Title: {item["title"]}
+Description: {item["description"]}
+"""
+            for item in items
+        )
+        prompt = f"""
+{STRICT_JSON_RULES}
+For each YouTube video below, answer whether it announces one or more genuine job or
+internship openings. Mentoring, courses, referrals-for-sale, tips and roadmaps are NOT openings.
+{video_blocks}
+Return STRICT JSON ONLY, with exactly one entry per video ID listed above:
+
+{{
+  "<videoId>": boolean
+}}
+"""
+        try:
+            with span("gemini:classify"):
+                verdicts = json.loads(self.gemini_classifier.generate(prompt))
+        except Exception as e:
+            print(f"⚠️  Classify tier failed ({type(e).__name__}: {str(e)}), sending all videos to extraction")
+            return {item["videoId"]: True for item in items}
+
+        if not isinstance(verdicts, dict):
+            verdicts = {}
+        return {
+            item["videoId"]: verdicts.get(item["videoId"]) is not False
+            for item in items
+        }
+
+    def _pack_batches(self, items: list) -> list:
+        """Greedily pack prepared videos into batches under the batch token budget."""
+        batches = []
+        current = []
+        current_tokens = 0
+        for item in items:
+            tokens = estimate_tokens(item["title"]) + estimate_tokens(item["description"]) + estimate_tokens(item["transcript"])
+            if current and (
+                current_tokens + tokens > self.batch_token_budget
+                or len(current) >= self.batch_max_videos
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(item)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def extract_jobs_for_videos(self, items: list) -> dict:
+        """
+        Extract openings for prepared (non-skipped) videos.
+
+        With GEMINI_TIERED_EXTRACTION enabled, GEMINI_CLASSIFY_MODEL first screens
+        all videos from title/description in one request; only positives get a
+        transcript download and the full GEMINI_EXTRACT_MODEL prompt.
+
+        With GEMINI_BATCH_EXTRACTION enabled, videos are packed into shared
+        requests under GEMINI_BATCH_TOKEN_BUDGET; a batch whose response fails
+        validation is retried one video at a time.
+
+        Returns {videoId: {"isJobVideo", "openings"}}. Videos Gemini could not
+        be reached for carry "failed": True and should not be marked processed.
+        Videos Gemini rejected for good (GeminiRequestError) carry "error" only:
+        they count as processed, since a retry would fail the same way.
+        """
+        results = {}
+
+        if self.tiered_extraction and items:
+            verdicts = self.classify_videos_with_gemini(items)
+            for item in items:
+                if not verdicts[item["videoId"]]:
+                    print(f"   🏷️  Classify tier rejected {item['videoId']}")
+                    results[item["videoId"]] = {"isJobVideo": False, "openings": [], "rejectedBy": "classify"}
+            items = [item for item in items if verdicts[item["videoId"]]]
+
+        for item in items:
+            with span(f"video:{item['videoId']}"):
+                self.load_transcript(item)
+
+        batches = self._pack_batches(items) if self.batch_extraction else [[item] for item in items]
+
+        for number, batch in enumerate(batches, 1):
+            with span(f"batch:{number}"):
+                if len(batch) > 1:
+                    try:
+                        batch_results = self.extract_jobs_batch_with_gemini(batch)
+                    except GeminiUnavailableError as e:
+                        print(f"❌ Gemini unavailable for batch {number}: {str(e)}")
+                        for item in batch:
+                            results[item["videoId"]] = {"isJobVideo": False, "openings": [], "failed": True, "error": str(e)}
+                        continue
+                    if batch_results is not None:
+                        results.update(batch_results)
+                        continue
+                    print(f"   ↩️  Falling back to single-video extraction for {len(batch)} videos")
+
+                for item in batch:
+                    try:
+                        with span(f"video:{item['videoId']}"):
+                            results[item["videoId"]] = self.extract_jobs_with_gemini(
+                                item["title"],
+                                item["description"],
+                                item["transcript"]
+                            )
+                    except GeminiUnavailableError as e:
+                        print(f"❌ Gemini unavailable for {item['videoId']}: {str(e)}")
+                        results[item["videoId"]] = {"isJobVideo": False, "openings": [], "failed": True, "error": str(e)}
+                    except GeminiRequestError as e:
+                        print(f"❌ Gemini rejected {item['videoId']}: {str(e)}")
+                        results[item["videoId"]] = {"isJobVideo": False, "openings": [], "error": str(e)}
+
+        return results
 
     def process_video_for_jobs(self, video_id: str) -> dict:
         """
@@ -149,19 +451,27 @@ Return STRICT JSON ONLY:
         
         Note: If transcript is not available (disabled captions, age-restricted, etc),
         we still try to extract jobs from title and description using Gemini.
+
+        The transcript is trimmed to TRANSCRIPT_TOKEN_BUDGET before prompting;
+        the savings are returned under "transcriptStats".
+
+        Videos scoring below JOB_CLASSIFIER_THRESHOLD on the local pre-classifier
+        skip transcript download and Gemini entirely. The decision is returned
+        under "classification".
         """
-        transcript = self.get_transcript(video_id)
-        
-        if not transcript:
-            print(f"   ⚠️  Transcript not available for {video_id}, trying with title/description only")
-            transcript = ""
+        item = self.prepare_video_for_extraction(video_id)
+        if item["skip"]:
+            return {"isJobVideo": False, "openings": [], "classification": item["classification"]}
 
-        meta = self.get_title_description(video_id)
-        return self.extract_jobs_with_gemini(
-            meta["title"],
-            meta["description"],
-            transcript
+        self.load_transcript(item)
+        result = self.extract_jobs_with_gemini(
+            item["title"],
+            item["description"],
+            item["transcript"]
         )
+        result["classification"] = item["classification"]
+        result["transcriptStats"] = item["transcriptStats"]
+        return result
 
     def process_channel(self, channel_id: str, max_results: int = 5) -> list:
         results = []
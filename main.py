@@ -1,6 +1,7 @@
-from fastapi import FastAPI, Request, Form, HTTPException, Header
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, Request, Form, HTTPException, Header, BackgroundTasks
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, HttpUrl
 from typing import Optional
 from pathlib import Path
@@ -8,6 +9,9 @@ from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
 import os
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 
 
 # ================== MODELS ==================
@@ -28,6 +32,12 @@ class PostJobRequest(BaseModel):
     openings: list[JobOpening]
 
 
+class SuppressionOverrideRequest(BaseModel):
+    email: str
+    action: str                  # "suppress" or "allow"
+    reason: Optional[str] = None
+
+
 class ContactSupportRequest(BaseModel):
     email: str
     name: Optional[str] = None
@@ -38,11 +48,26 @@ class ContactSupportRequest(BaseModel):
 load_dotenv()
 
 from Repository.Youtube import Youtube
+from Repository.GeminiClient import GeminiUnavailableError, GeminiRequestError
 from Repository.Firebase import Firebase
 from Repository.Gmail import GmailService
 from Repository.ErrorLogs import ErrorLogs
 from Repository.ContactSupport import ContactSupport
+from Repository.JobFingerprints import JobFingerprints
+from Repository.JobArchive import JobArchive
+from Repository.EmailOutbox import EmailOutbox
+from Repository.JobRuns import JobRuns
+from Repository.RunLease import RunLease, LeaseLostError
+from Repository.EmailQuota import EmailQuota, EmailQuotaExceededError
+from Repository.Suppressions import Suppressions
+from Repository.DigestQueue import DigestQueue
+from Repository.IdempotencyKeys import IdempotencyKeys
+from utils.matching import group_by_match, normalize_preferences
+from utils.timing import span, timed_run, Stages, in_current_span, format_timings
+from utils.metrics import REGISTRY, HTTP_REQUEST_SECONDS, HTTP_REQUESTS, CACHE_REQUESTS
 from utils.helpers import (
+    email_shard,
+    normalize_cadence,
     is_allowed_email,
     create_verification_token,
     verify_verification_token,
@@ -51,13 +76,34 @@ from utils.helpers import (
 )
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the /jobs index before serving, off the event loop; if it fails the
+    # first /jobs request loads it instead
+    try:
+        await run_in_threadpool(JobArchiveObj.load_index)
+    except Exception as e:
+        ErrorLogsObj.log_error(e, "list_jobs", {"step": "load_index"})
+        print(f"   ⚠️  Job index not loaded at startup: {str(e)}")
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 YoutubeObj = Youtube()
 FirebaseObj = Firebase()
 GmailObj = GmailService()
 ErrorLogsObj = ErrorLogs()
 ContactSupportObj = ContactSupport()
+JobFingerprintsObj = JobFingerprints()
+JobArchiveObj = JobArchive()
+EmailOutboxObj = EmailOutbox()
+JobRunsObj = JobRuns()
+CronLeaseObj = RunLease("cron_job_alert")
+SuppressionsObj = Suppressions()
+DigestQueueObj = DigestQueue()
+DigestLeaseObj = RunLease("digest")
+IdempotencyKeysObj = IdempotencyKeys()
 
 BASE_DIR = Path(__file__).resolve().parent
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
@@ -65,6 +111,427 @@ templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8001")
 
 
+# ================== METRICS ==================
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Observe latency and status of every request, labelled by route template (not raw path)."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or "unmatched"
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=path)
+        HTTP_REQUESTS.inc(method=request.method, route=path, status=status)
+
+
+@app.get("/metrics")
+async def metrics(authorization: Optional[str] = Header(None)):
+    """
+    In-process metrics in the Prometheus text exposition format.
+
+    Covers request latency per route, Firestore / SMTP / Gemini latency,
+    Gemini tokens, YouTube quota units, emails sent / failed and cache
+    hits / misses. Counters start at zero when the process starts and each
+    worker process reports its own values.
+
+    Security:
+    - If METRICS_TOKEN is set, requires header Authorization: Bearer <METRICS_TOKEN>
+    """
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        return JSONResponse({"error": "Unauthorized"}, status_code=403)
+
+    return Response(content=REGISTRY.render(), media_type=REGISTRY.CONTENT_TYPE)
+
+
+# ================== FAN-OUT ==================
+
+def send_job_alerts(active: list, openings: list, source: str, run_id: str | None = None, cadence: str = "instant") -> dict:
+    """
+    Deliver openings to active subscribers in batches of 50 through the email outbox.
+
+    Subscribers are matched against their optional preferences (skills, workModes,
+    employmentTypes, locations) in one vectorized pass; subscribers with identical
+    match sets share batches, so each batch carries exactly their openings.
+
+    Only subscribers with the given cadence are mailed. An instant fan-out
+    also queues the openings for the next daily/weekly digests (DigestQueue).
+
+    Addresses on the suppression list (hard bounces, refused recipients, manual
+    blocks, unexpired soft bounces) are dropped before batching.
+
+    Subscribers are also split into EMAIL_SHARD_COUNT deterministic shards by a
+    hash of their email. Every batch is persisted to the outbox before anything
+    is sent, then the shards are delivered by deliver_shards() — worker threads
+    here plus any instance calling /api/cron/deliver-shards — and rolled up into
+    one summary. Batches that fail or are cut off by a crash stay pending and
+    are picked up by /api/cron/resume-outbox.
+
+    Args:
+        active: Verified, subscribed subscriber documents
+        openings: Openings to deliver
+        source: "cron_job_alert", "job_alert_manual" or "digest_<cadence>" (used in error logs)
+        run_id: Job run ID, reused as the outbox run ID so progress lands on the run record
+        cadence: "instant" for alerts, "daily" / "weekly" for a digest run
+
+    Returns:
+        {"run_id", "emails_sent", "batches_sent", "batches_failed", "batches_pending",
+         "batches_deferred", "emails_deferred", "emails_refused", "emails_suppressed", "digest_queued",
+         "match_groups", "shards", "shards_done"}
+    """
+    batch_size = 50
+    shard_count = max(1, int(os.getenv("EMAIL_SHARD_COUNT", "4")))
+    batches = []
+    invalid_batches = 0
+
+    # ===== DAILY / WEEKLY SUBSCRIBERS GET THESE IN THEIR NEXT DIGEST =====
+    digest_queued = 0
+    if cadence == "instant":
+        try:
+            with span("queue_digest"):
+                digest_queued = DigestQueueObj.add(openings, source)
+            print(f"   📬 Queued {digest_queued} opening(s) for the next digests")
+        except Exception as e:
+            ErrorLogsObj.log_error(e, source, {"step": "queue_digest"})
+    active = [sub for sub in active if normalize_cadence(sub.get("cadence")) == cadence]
+
+    # ===== DROP SUPPRESSED ADDRESSES (bounced / refused / blocked) =====
+    with span("suppressions"):
+        try:
+            bounces_imported = SuppressionsObj.import_bounces()
+            if bounces_imported:
+                print(f"   📥 Imported {bounces_imported} bounce(s) from the bounce mailbox")
+        except Exception as e:
+            ErrorLogsObj.log_error(e, source, {"step": "import_bounces"})
+        SuppressionsObj.load()
+        active, suppressed = SuppressionsObj.filter_subscribers(active)
+    if suppressed:
+        print(f"   🚫 Skipping {len(suppressed)} suppressed address(es)")
+
+    with span("match"):
+        groups = group_by_match(active, openings)
+    print(f"   🎯 {len(groups)} preference group(s) for {len(active)} subscriber(s)")
+
+    for opening_indices, members in groups:
+        group_openings = [openings[i] for i in opening_indices]
+
+        shards = {}
+        for sub in members:
+            shards.setdefault(email_shard(sub.get("email"), shard_count), []).append(sub)
+
+        for shard, shard_members in sorted(shards.items()):
+            for batch_start in range(0, len(shard_members), batch_size):
+                batch = shard_members[batch_start:batch_start + batch_size]
+
+                # Extract valid recipients from batch
+                recipients = [
+                    (sub.get("email"), sub.get("unsubscribeToken")) for sub in batch
+                    if sub.get("email") and sub.get("unsubscribeToken")
+                ]
+                if not recipients:
+                    print(f"   ⚠️  Skipping batch with no valid emails")
+                    invalid_batches += 1
+                    continue
+
+                batches.append({"recipients": recipients, "openings": group_openings, "shard": shard})
+
+    run_id = run_id or EmailOutboxObj.new_run_id(source)
+    if batches:
+        with span("outbox_enqueue"):
+            EmailOutboxObj.enqueue(run_id, source, batches)
+        recipients_queued = sum(len(b["recipients"]) for b in batches)
+        budget = GmailObj.pool.remaining(EmailQuota.PRIORITY_ALERT)
+        print(f"   📊 Daily quota: {budget} alert recipient(s) left across {len(GmailObj.pool.accounts)} sender account(s) for {recipients_queued} queued")
+        if recipients_queued > budget:
+            print(f"   ⏸️  {recipients_queued - budget} recipient(s) will be deferred until the UTC day rolls over")
+    JobRunsObj.progress(run_id, "sending", batchesQueued=len(batches), matchGroups=len(groups))
+
+    if batches:
+        with span("deliver"):
+            delivery = deliver_shards(
+                run_id=run_id,
+                wait_seconds=float(os.getenv("EMAIL_SHARD_WAIT_SECONDS", "600"))
+            )
+    else:
+        delivery = empty_delivery()
+    delivery["batches_failed"] += invalid_batches
+    delivery["run_id"] = run_id
+    delivery["match_groups"] = len(groups)
+    delivery["emails_suppressed"] = len(suppressed)
+    delivery["digest_queued"] = digest_queued
+    return delivery
+
+
+def empty_delivery() -> dict:
+    """deliver_shards() counters for a fan-out that queued no batches."""
+    return {
+        "emails_sent": 0, "batches_sent": 0, "batches_failed": 0, "batches_pending": 0,
+        "batches_deferred": 0, "emails_deferred": 0, "emails_refused": 0, "shards": 0, "shards_done": 0
+    }
+
+
+def deliver_shards(run_id: str | None = None, wait_seconds: float = 0) -> dict:
+    """
+    Claim and deliver outbox shards with EMAIL_SHARD_WORKERS threads.
+
+    Each worker leases a shard, delivers its batches with deliver_outbox() and
+    records the shard's counters, until no shard is left to claim. With a
+    run_id, waits up to `wait_seconds` for shards held by other instances
+    (taking over any whose lease expires) and returns the run's roll-up.
+
+    Args:
+        run_id: Only deliver this run's shards (None = any run with undelivered shards)
+        wait_seconds: How long to wait for shards other workers are delivering
+
+    Returns:
+        {"shards_delivered"} plus, with a run_id, the shard_summary() roll-up
+    """
+    workers = max(1, int(os.getenv("EMAIL_SHARD_WORKERS", "2")))
+
+    def worker() -> int:
+        delivered = 0
+        while True:
+            shard = EmailOutboxObj.claim_shard(run_id)
+            if shard is None:
+                return delivered
+            print(f"   🧩 Delivering shard {shard['shard']} of run {shard['runId']} ({shard.get('batches', 0)} batch(es))")
+            with span(f"shard:{shard['shard']}"):
+                summary = deliver_outbox(run_id=shard["runId"], shard=shard["shard"], track_progress=True)
+            EmailOutboxObj.complete_shard(shard["runId"], shard["shard"], summary)
+            delivered += 1
+
+    # Worker threads report their shard timings under the caller's span
+    timed_worker = in_current_span(worker)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        shards_delivered = sum(pool.map(lambda _: timed_worker(), range(workers)))
+
+    if not run_id:
+        return {"shards_delivered": shards_delivered}
+
+    deadline = time.monotonic() + wait_seconds
+    summary = EmailOutboxObj.shard_summary(run_id)
+    while summary["shards_done"] < summary["shards"] and time.monotonic() < deadline:
+        time.sleep(5)
+        shards_delivered += worker()  # picks up shards whose lease expired
+        summary = EmailOutboxObj.shard_summary(run_id)
+
+    print(f"   🧩 Shards done: {summary['shards_done']}/{summary['shards']} ({shards_delivered} delivered by this instance)")
+    return {"shards_delivered": shards_delivered, **summary}
+
+
+def record_refusals(failures: list):
+    """Put refused recipients on the suppression list; never fails the batch."""
+    if not failures:
+        return
+    try:
+        SuppressionsObj.record_refusals(failures)
+    except Exception as e:
+        ErrorLogsObj.log_error(e, "send_emails", {"step": "record_suppressions", "recipients": len(failures)})
+
+
+def deliver_outbox(
+    run_id: str | None = None,
+    track_progress: bool = False,
+    shard: int | None = None,
+    statuses: list | None = None
+) -> dict:
+    """
+    Claim and send outbox tasks until none are left to claim.
+
+    Tasks are claimed one at a time and their lease is renewed right before
+    sending, so a task whose lease ran out is never sent twice. Each task is
+    attempted at most once per call; failed tasks go back to pending for the
+    next resume. Recipients beyond what the sender accounts'
+    Gmail quotas allow today (SenderPool) are deferred and released after the
+    UTC day rolls over.
+
+    Each distinct set of openings is minified and encoded (HTML + plain text)
+    once. With PERSONALIZED_UNSUBSCRIBE_LINKS enabled (default), every
+    recipient gets their own copy with a working unsubscribe link; otherwise
+    a batch goes out as a single BCC message.
+
+    Args:
+        run_id: Only deliver this run's tasks (None = every unsent task, used by resume)
+        track_progress: Write batch counters to the job run record after every batch
+        shard: Only deliver this shard's tasks (renewing the shard lease between batches)
+        statuses: Only claim tasks in these statuses (e.g. ["deferred"] for the daily carry-over)
+
+    Returns:
+        {"emails_sent", "batches_sent", "batches_failed", "batches_pending",
+         "batches_deferred", "emails_deferred", "emails_refused"}
+    """
+    personalized = os.getenv("PERSONALIZED_UNSUBSCRIBE_LINKS", "true").lower() == "true"
+    prepared_messages = {}
+    cursor = None
+    batches_sent = 0
+    batches_failed = 0
+    batches_pending = 0
+    batches_deferred = 0
+    emails_deferred = 0
+    emails_sent = 0
+    emails_refused = 0
+
+    while True:
+        # One task at a time, continuing after the last one claimed, so each
+        # candidate is read once per call and no lease waits behind others
+        task = EmailOutboxObj.claim(run_id=run_id, after=cursor, shard=shard, statuses=statuses)
+        if task is None:
+            break
+        cursor = task["id"]
+
+        label = f"{task['runId']}/{task['batchId']}"
+        recipients = [(r["email"], r["unsubscribeToken"]) for r in task["recipients"]]
+        openings = task["openings"]
+        # Digest batches (source digest_daily / digest_weekly) get the digest subject
+        source = task.get("source") or ""
+        cadence = source[len("digest_"):] if source.startswith("digest_") else None
+
+        try:
+            print(f"   [Batch {label}] {len(recipients)} recipient(s), {len(openings)} opening(s)...")
+
+            with span(f"batch:{task['batchId']}"):
+                # Minify and encode each distinct set of openings once per call
+                prepared_key = (task.get("source"), task["openingsHash"])
+                prepared = prepared_messages.get(prepared_key)
+                CACHE_REQUESTS.inc(cache="prepared_email", result="miss" if prepared is None else "hit")
+                if prepared is None:
+                    prepared = prepared_messages[prepared_key] = GmailObj.prepare_job_alert(openings, cadence)
+
+                # The lease may have run out while preparing; if another worker took
+                # the task over, sending now would deliver it twice
+                if not EmailOutboxObj.renew(task["id"]):
+                    print(f"   [Batch {label}] ⚠️  Lease lost before sending, skipping")
+                    continue
+
+                if personalized:
+                    # One message per recipient, spliced from the pre-encoded template
+                    outcome = GmailObj.send_job_alert_email_personalized(recipients, prepared)
+                else:
+                    # Send email to entire batch via BCC
+                    outcome = GmailObj.send_job_alert_email_batch(
+                        bcc_emails=[email for email, _ in recipients],
+                        openings=openings,
+                        cadence=cadence,
+                        prepared=prepared
+                    )
+            sent_count = outcome["sent"]
+            emails_sent += sent_count
+            emails_refused += len(outcome["failed"])
+            failures = [{"email": email, "error": outcome["errors"].get(email)} for email in outcome["failed"]]
+            refused_note = f", {len(failures)} refused" if failures else ""
+
+            # Recipients no sender account had quota for wait for the UTC day to roll over
+            unsent = set(outcome["unsent"])
+            deferred = [r for r in recipients if r[0] in unsent]
+            if deferred:
+                EmailOutboxObj.defer(task["id"], deferred, EmailQuota.next_reset_ms(), delivered=sent_count, failures=failures)
+                print(f"   [Batch {label}] ✅ Sent to {sent_count} recipients{refused_note}, ⏸️  daily quota reached, deferred {len(deferred)} to tomorrow")
+                batches_deferred += 1
+                emails_deferred += len(deferred)
+            else:
+                EmailOutboxObj.mark_sent(task["id"], sent_count, failures=failures)
+                print(f"   [Batch {label}] ✅ Sent to {sent_count} recipients{refused_note}")
+                batches_sent += 1
+            record_refusals(failures)
+
+        except Exception as e:
+            ErrorLogsObj.log_email_error(e, f"batch_{label}", task.get("source", "outbox"))
+            print(f"   [Batch {label}] ❌ Failed: {str(e)}")
+            # Keep only the recipients that didn't get the mail for the retry
+            partial = getattr(e, "partial_delivery", None)
+            if partial and (partial["sent"] or partial["failed"]):
+                done = set(partial["sent"] + partial["failed"])
+                failures = [{"email": email, "error": partial["errors"].get(email)} for email in partial["failed"]]
+                emails_sent += len(partial["sent"])
+                emails_refused += len(failures)
+                status = EmailOutboxObj.mark_failed(
+                    task["id"], str(e),
+                    recipients=[r for r in recipients if r[0] not in done],
+                    delivered=len(partial["sent"]),
+                    failures=failures
+                )
+                record_refusals(failures)
+            else:
+                status = EmailOutboxObj.mark_failed(task["id"], str(e))
+            if status is None:
+                print(f"   [Batch {label}] ⚠️  Lease lost, left to its new owner")
+            elif status == "pending":
+                batches_pending += 1
+            else:
+                batches_failed += 1
+
+        counters = {
+            "batchesSent": batches_sent,
+            "batchesFailed": batches_failed,
+            "batchesPending": batches_pending,
+            "batchesDeferred": batches_deferred,
+            "emailsSent": emails_sent
+        }
+        if shard is not None:
+            EmailOutboxObj.renew_shard(task["runId"], shard)
+            if track_progress:
+                # Per-shard key so parallel workers don't overwrite each other
+                JobRunsObj.progress(run_id, "sending", **{f"shard{shard}": counters})
+        elif track_progress:
+            JobRunsObj.progress(run_id, "sending", **counters)
+
+    return {
+        "emails_sent": emails_sent,
+        "batches_sent": batches_sent,
+        "batches_failed": batches_failed,
+        "batches_pending": batches_pending,
+        "batches_deferred": batches_deferred,
+        "emails_deferred": emails_deferred,
+        "emails_refused": emails_refused
+    }
+
+
+# ================== BACKGROUND RUNS ==================
+
+def execute_run(run_id: str, work, *args):
+    """
+    Run a queued job in the background and store its result (or error) on the run record.
+
+    The whole run is timed as a span tree (utils.timing): stages, per-video
+    and per-batch spans plus every Firestore / YouTube / Gemini / SMTP call
+    are stored as the run's `timings`.
+    """
+    root = None
+    try:
+        with timed_run() as root:
+            JobRunsObj.start(run_id)
+            result = work(*args)
+        timings = root.to_dict()
+        print(f"⏱️  Run {run_id} timings:")
+        for line in format_timings(timings):
+            print(f"   {line}")
+        JobRunsObj.complete(run_id, result, timings)
+    except Exception as e:
+        print(f"❌ Run {run_id} failed: {type(e).__name__}: {str(e)}")
+        try:
+            JobRunsObj.fail(run_id, f"{type(e).__name__}: {str(e)}", root.to_dict() if root else None)
+        except Exception as record_error:
+            print(f"   ⚠️  Failed to record failure of run {run_id}: {str(record_error)}")
+
+
+def run_accepted_response(run_id: str) -> JSONResponse:
+    status_url = f"/api/runs/{run_id}"
+    return JSONResponse(
+        {
+            "status": "accepted",
+            "run_id": run_id,
+            "status_url": status_url
+        },
+        status_code=202,
+        headers={"Location": status_url}
+    )
+
+
 @app.get("/", response_class=HTMLResponse)
 async def home_route(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -83,7 +550,19 @@ async def contact_support_route(request: Request):
 
 
 @app.post("/register")
-async def register_user(email: str = Form(...)):
+async def register_user(
+    email: str = Form(...),
+    skills: str = Form(""),
+    workModes: str = Form(""),
+    employmentTypes: str = Form(""),
+    locations: str = Form(""),
+    cadence: str = Form("instant")
+):
+    """
+    Register a new subscriber.
+    Preference fields are optional comma-separated lists; empty means "send everything".
+    cadence: "instant" (every run), "daily" or "weekly" digest.
+    """
     try:
         email = email.lower().strip()
 
@@ -104,6 +583,13 @@ async def register_user(email: str = Form(...)):
                 "isVerified": False,
                 "subscribed": False,
                 "unsubscribeToken": unsubscribe_token,
+                "preferences": normalize_preferences({
+                    "skills": skills,
+                    "workModes": workModes,
+                    "employmentTypes": employmentTypes,
+                    "locations": locations
+                }),
+                "cadence": normalize_cadence(cadence),
                 "createdAt": datetime.now(timezone.utc)
             }
         )
@@ -122,6 +608,12 @@ async def register_user(email: str = Form(...)):
     
     except HTTPException:
         raise
+    except EmailQuotaExceededError as e:
+        ErrorLogsObj.log_error(e, "user_registration", {"email": email})
+        return JSONResponse(
+            {"error": "Daily email limit reached. Please try again tomorrow."},
+            status_code=503
+        )
     except Exception as e:
         ErrorLogsObj.log_error(e, "user_registration", {"email": email})
         return JSONResponse(
@@ -225,6 +717,12 @@ async def resubscribe_user(email: str = Form(...)):
     
     except HTTPException:
         raise
+    except EmailQuotaExceededError as e:
+        ErrorLogsObj.log_error(e, "user_resubscribe", {"email": email})
+        return JSONResponse(
+            {"error": "Daily email limit reached. Please try again tomorrow."},
+            status_code=503
+        )
     except Exception as e:
         ErrorLogsObj.log_error(e, "user_resubscribe", {"email": email})
         return JSONResponse(
@@ -307,15 +805,86 @@ async def contact_support(body: ContactSupportRequest):
         )
 
 
+@app.get("/jobs")
+async def list_jobs(
+    request: Request,
+    employmentType: Optional[str] = None,
+    workMode: Optional[str] = None,
+    location: Optional[str] = None,
+    skill: Optional[str] = None,
+    match: str = "any",
+    cursor: Optional[str] = None,
+    limit: int = 20
+):
+    """
+    Public listing of archived job openings, newest first.
+
+    Query params: employmentType, workMode, location, skill (case-insensitive,
+    comma-separated values are ORed; different params are ANDed; location,
+    workMode and employmentType also match aliases such as bengaluru = bangalore),
+    match=all to require every listed skill, cursor (nextCursor from the
+    previous page), limit (max 100).
+
+    Served from the in-memory job index and a per-query response cache;
+    responses carry an ETag and a matching If-None-Match returns 304.
+    """
+    if match not in ("any", "all"):
+        raise HTTPException(status_code=400, detail="match must be: any or all")
+
+    def split(value):
+        return [v for v in (value or "").split(",") if v.strip()]
+
+    try:
+        body, etag = await run_in_threadpool(
+            JobArchiveObj.list_jobs,
+            {
+                "employmentType": split(employmentType),
+                "workMode": split(workMode),
+                "location": split(location),
+                "skill": split(skill)
+            },
+            skill_mode=match,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        ErrorLogsObj.log_error(e, "list_jobs", {"query": str(request.query_params)})
+        return JSONResponse({"error": "Failed to fetch jobs"}, status_code=500)
+
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(body, status_code=200, headers=headers)
+
+
 @app.post("/api/post-job")
-async def post_job_alert(body: PostJobRequest, x_api_secret: str = Header(None)):
+async def post_job_alert(
+    body: PostJobRequest,
+    background_tasks: BackgroundTasks,
+    x_api_secret: str = Header(None),
+    idempotency_key: Optional[str] = Header(None)
+):
     """
     Manually post job openings and send alert emails to all active subscribers.
 
+    The request is validated and queued as a background run; the endpoint
+    returns 202 with a run_id immediately. Poll GET /api/runs/{run_id} for
+    progress and the final result.
+
     Security:
     - Header: x-api-secret
     - Compared against CRON_SECRET environment variable
 
+    Idempotency:
+    - Optional header: Idempotency-Key (max 255 chars)
+    - A retry with the same key and body within IDEMPOTENCY_KEY_TTL_HOURS gets
+      the original response (with Idempotent-Replayed: true) and sends nothing
+    - The same key with a different body returns 422; a retry while the first
+      request is still being queued returns 409
+
     Body (JSON):
     {
       "openings": [
@@ -333,20 +902,106 @@ async def post_job_alert(body: PostJobRequest, x_api_secret: str = Header(None))
       ]
     }
     """
+    # ===== SECURITY =====
+    API_SECRET = os.getenv("CRON_SECRET")
+    if not API_SECRET:
+        return JSONResponse({"error": "CRON_SECRET not configured"}, status_code=500)
+    if not x_api_secret or x_api_secret != API_SECRET:
+        return JSONResponse({"error": "Unauthorized"}, status_code=403)
+
+    if not body.openings:
+        raise HTTPException(status_code=400, detail="No job openings provided")
+
+    openings = [job.model_dump() for job in body.openings]
+
+    # ===== IDEMPOTENCY =====
+    if idempotency_key is not None:
+        if not idempotency_key.strip() or len(idempotency_key) > 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key must be 1-255 characters")
+
+        request_hash = IdempotencyKeys.request_hash(openings)
+        try:
+            previous = IdempotencyKeysObj.claim("post_job", idempotency_key, request_hash)
+        except Exception as e:
+            ErrorLogsObj.log_error(e, "post_job", {"step": "claim_idempotency_key"})
+            return JSONResponse({"error": "Job posting failed"}, status_code=500)
+
+        if previous is not None:
+            replay = idempotent_replay_response(previous, request_hash)
+            print(f"🔁 [POST-JOB] Idempotency-Key reused, replying {replay.status_code} without sending")
+            return replay
+
     try:
-        # ===== SECURITY =====
-        API_SECRET = os.getenv("CRON_SECRET")
-        if not API_SECRET:
-            return JSONResponse({"error": "CRON_SECRET not configured"}, status_code=500)
-        if not x_api_secret or x_api_secret != API_SECRET:
-            return JSONResponse({"error": "Unauthorized"}, status_code=403)
+        run_id = JobRunsObj.create("job_alert_manual", {"jobsSubmitted": len(openings)})
+    except Exception as e:
+        ErrorLogsObj.log_error(e, "post_job", {"step": "create_run", "jobsCount": len(openings)})
+        if idempotency_key is not None:
+            try:
+                IdempotencyKeysObj.release("post_job", idempotency_key)
+            except Exception as release_error:
+                print(f"   ⚠️  Failed to release idempotency key: {str(release_error)}")
+        return JSONResponse({"error": "Job posting failed"}, status_code=500)
+
+    response = run_accepted_response(run_id)
+    if idempotency_key is not None:
+        try:
+            IdempotencyKeysObj.store("post_job", idempotency_key, json.loads(response.body), response.status_code)
+        except Exception as e:
+            # The key stays claimed, so a retry gets 409 instead of a second fan-out
+            ErrorLogsObj.log_error(e, "post_job", {"step": "store_idempotency_key", "run_id": run_id})
+
+    background_tasks.add_task(execute_run, run_id, run_post_job, run_id, openings)
+    return response
+
+
+def idempotent_replay_response(previous: dict, request_hash: str) -> JSONResponse:
+    """Answer a request whose Idempotency-Key is already in use (see IdempotencyKeys.claim)."""
+    if previous.get("requestHash") != request_hash:
+        return JSONResponse(
+            {"error": "Idempotency-Key was already used with a different request body"},
+            status_code=422
+        )
+
+    if previous.get("state") != IdempotencyKeys.STATE_COMPLETED:
+        return JSONResponse(
+            {"error": "A request with this Idempotency-Key is still being processed"},
+            status_code=409,
+            headers={"Retry-After": "1"}
+        )
+
+    headers = {"Idempotent-Replayed": "true"}
+    if previous["response"].get("status_url"):
+        headers["Location"] = previous["response"]["status_url"]
+    return JSONResponse(previous["response"], status_code=previous["statusCode"], headers=headers)
 
-        if not body.openings:
-            raise HTTPException(status_code=400, detail="No job openings provided")
 
-        openings = [job.model_dump() for job in body.openings]
+def run_post_job(run_id: str, openings: list) -> dict:
+    """Background body of /api/post-job. Returns the run result."""
+    try:
+        # ===== SKIP OPENINGS ALREADY SENT =====
+        JobRunsObj.progress(run_id, "deduplicating", jobsSubmitted=len(openings))
+        with span("deduplicate"):
+            JobFingerprintsObj.load()
+            openings, duplicate_openings, near_duplicate_merges = JobFingerprintsObj.filter_new(openings)
+
+        if not openings:
+            return {
+                "status": "success",
+                "message": "All openings were already sent",
+                "jobs_posted": 0,
+                "duplicates_skipped": len(duplicate_openings),
+                "near_duplicate_merges": near_duplicate_merges,
+                "emails_sent": 0
+            }
+
+        # ===== ARCHIVE FOR /jobs =====
+        try:
+            JobArchiveObj.save_jobs(openings, "post_job")
+        except Exception as e:
+            ErrorLogsObj.log_error(e, "post_job", {"step": "archive_jobs"})
 
         # ===== FETCH ACTIVE SUBSCRIBERS =====
+        JobRunsObj.progress(run_id, "fetching_subscribers", jobsPosted=len(openings))
         subscribers = FirebaseObj.get_all_documents("subscribers")
         active = [
             s for s in subscribers
@@ -354,77 +1009,54 @@ async def post_job_alert(body: PostJobRequest, x_api_secret: str = Header(None))
         ]
 
         if not active:
-            return JSONResponse(
-                {
-                    "status": "success",
-                    "message": "No active subscribers",
-                    "jobs_posted": len(openings),
-                    "emails_sent": 0
-                },
-                status_code=200
-            )
+            return {
+                "status": "success",
+                "message": "No active subscribers",
+                "jobs_posted": len(openings),
+                "emails_sent": 0
+            }
 
-        # ===== SEND EMAILS IN BATCHES OF 50 =====
-        batch_size = 50
-        batches_sent = 0
-        batches_failed = 0
-        emails_sent = 0  # Track total emails sent in this request
+        # ===== SEND EMAILS (BATCHES OF 50, GROUPED BY PREFERENCES) =====
+        with span("send"):
+            delivery = send_job_alerts(active, openings, "job_alert_manual", run_id=run_id)
+        emails_sent = delivery["emails_sent"]
+        batches_sent = delivery["batches_sent"]
+        batches_failed = delivery["batches_failed"]
 
-        for batch_start in range(0, len(active), batch_size):
-            batch_end = min(batch_start + batch_size, len(active))
-            batch = active[batch_start:batch_end]
-            
+        # Openings queued for digests count as delivered too
+        if batches_sent > 0 or delivery["digest_queued"]:
             try:
-                # Extract valid emails from batch
-                batch_emails = [
-                    sub.get("email") for sub in batch 
-                    if sub.get("email") and sub.get("unsubscribeToken")
-                ]
-                
-                if not batch_emails:
-                    batches_failed += 1
-                    continue
-                
-                # Send email to entire batch via BCC
-                GmailObj.send_job_alert_email_batch(
-                    bcc_emails=batch_emails,
-                    openings=openings
-                )
-                emails_sent += len(batch_emails)  # Add to total
-                batches_sent += 1
-                
+                JobFingerprintsObj.record(openings, "post_job")
             except Exception as e:
-                ErrorLogsObj.log_email_error(e, f"batch_{batch_start}-{batch_end}", "job_alert_manual")
-                print(f"Failed to send batch {batch_start}-{batch_end}: {str(e)}")
-                batches_failed += 1
-
-        return JSONResponse(
-            {
-                "status": "success",
-                "message": "Job alert sent",
-                "jobs_posted": len(openings),
-                "emails_sent": emails_sent,
-                "batches_sent": batches_sent,
-                "batches_failed": batches_failed
-            },
-            status_code=200
-        )
+                ErrorLogsObj.log_error(e, "post_job", {"step": "record_fingerprints"})
+
+        return {
+            "status": "success",
+            "message": "Job alert sent",
+            "jobs_posted": len(openings),
+            "duplicates_skipped": len(duplicate_openings),
+            "near_duplicate_merges": near_duplicate_merges,
+            "emails_sent": emails_sent,
+            "batches_sent": batches_sent,
+            "batches_failed": batches_failed,
+            "batches_pending": delivery["batches_pending"],
+            "emails_refused": delivery["emails_refused"],
+            "emails_suppressed": delivery["emails_suppressed"],
+            "match_groups": delivery["match_groups"],
+            "run_id": run_id
+        }
     
-    except HTTPException:
-        raise
     except Exception as e:
-        ErrorLogsObj.log_error(e, "post_job", {"jobsCount": len(body.openings) if body.openings else 0})
-        return JSONResponse(
-            {"error": "Job posting failed"},
-            status_code=500
-        )
+        ErrorLogsObj.log_error(e, "post_job", {"jobsCount": len(openings), "runId": run_id})
+        raise
 
 
 @app.get("/api/cron/job-alert")
-async def cron_job_alert(x_cron_secret: str = Header(None)):
+async def cron_job_alert(background_tasks: BackgroundTasks, x_cron_secret: str = Header(None)):
     """
     Protected cron endpoint for job alert scheduler.
-    Runs the job alert logic exactly once per request.
+    Queues the job alert logic exactly once per request and returns 202 with a
+    run_id; poll GET /api/runs/{run_id} for stage progress and the result.
     
     Called by GitHub Actions every 3 hours.
     
@@ -432,7 +1064,8 @@ async def cron_job_alert(x_cron_secret: str = Header(None)):
     - Header: x-cron-secret
     - Compare against environment variable: CRON_SECRET
     - Returns HTTP 403 if invalid
-    - Returns JSON with execution details
+    - Returns 202 with the run_id and status URL
+    - Returns 409 with the running run_id if another run holds the cron lease
     """
     
     # ===== SECURITY: Validate cron secret =====
@@ -450,11 +1083,81 @@ async def cron_job_alert(x_cron_secret: str = Header(None)):
             status_code=403
         )
     
+    # ===== EXCLUSION: only one cron run at a time, across instances =====
+    run_id = JobRunsObj.new_run_id("cron_job_alert")
+    try:
+        fencing_token, current_lease = CronLeaseObj.acquire(run_id)
+    except Exception as e:
+        ErrorLogsObj.log_error(e, "cron_job_alert", {"step": "acquire_lease"})
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    if fencing_token is None:
+        print(f"⏸️  [CRON] Run {current_lease.get('holder')} is still in progress, not starting another")
+        return JSONResponse(
+            {
+                "status": "in_progress",
+                "message": "A job alert run is already in progress",
+                "run_id": current_lease.get("holder"),
+                "status_url": f"/api/runs/{current_lease.get('holder')}",
+                "lease_expires_at": current_lease.get("expiresAt")
+            },
+            status_code=409
+        )
+
+    try:
+        JobRunsObj.create("cron_job_alert", {"fencingToken": fencing_token}, run_id=run_id)
+    except Exception as e:
+        CronLeaseObj.release(fencing_token)
+        ErrorLogsObj.log_error(e, "cron_job_alert", {"step": "create_run"})
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    background_tasks.add_task(execute_run, run_id, run_cron_job_alert_leased, run_id, fencing_token)
+    return run_accepted_response(run_id)
+
+
+def run_cron_job_alert_leased(run_id: str, fencing_token: int) -> dict:
+    """Run the cron job while holding (and heartbeating) the cron lease."""
+    with CronLeaseObj.hold(fencing_token):
+        return run_cron_job_alert(run_id, fencing_token)
+
+
+def watermark_after(videos_with_jobs: list, failed_videos: list) -> str | None:
+    """
+    publishedAt the mostRecentPublishedAt watermark can move to: the latest
+    video with job openings, but never past a video whose extraction failed,
+    otherwise its jobs would be lost for good. None = leave it unchanged.
+    """
+    candidates = videos_with_jobs
+    if failed_videos:
+        earliest_failed = min(v["publishedAt"] for v in failed_videos)
+        candidates = [v for v in videos_with_jobs if v["publishedAt"] < earliest_failed]
+    return max((v["publishedAt"] for v in candidates), default=None)
+
+
+def run_cron_job_alert(run_id: str, fencing_token: int) -> dict:
+    """
+    Background body of /api/cron/job-alert. Returns the run result.
+    Sending and the cron_stats write are fenced by the lease token, so a run
+    that lost its lease (e.g. stalled past the TTL) can't double-mail or move
+    the watermark.
+
+    Each step is timed as a stage of the run's span tree (see execute_run).
+    """
+    stages = Stages()
     try:
         print("\n" + "="*60)
-        print(f"🔔 [CRON] Starting job alert at {datetime.now(timezone.utc)}")
+        print(f"🔔 [CRON] Starting job alert run {run_id} at {datetime.now(timezone.utc)}")
         print("="*60)
         
+        YoutubeObj.start_run()
+        
+        # ===== STEP 0: Release alerts deferred by yesterday's quota =====
+        stages.start("carry_over")
+        CronLeaseObj.ensure_held(fencing_token)
+        carried_over = deliver_outbox(statuses=["deferred"])
+        if carried_over["emails_sent"] or carried_over["emails_deferred"]:
+            print(f"\n⏩ [CRON] Carry-over: sent {carried_over['emails_sent']} deferred email(s), {carried_over['emails_deferred']} still waiting for quota")
+        
         # ===== STEP 1: Configuration =====
         CHANNEL_ID = "UCbEd9lNwkBGLFGz8ZxsZdVA"
         MAX_VIDEOS = 3
@@ -465,6 +1168,8 @@ async def cron_job_alert(x_cron_secret: str = Header(None)):
         
         # ===== STEP 2: Fetch state and get videos =====
         print(f"\n📺 [CRON] Fetching videos...")
+        stages.start("fetch_videos")
+        JobRunsObj.progress(run_id, "fetching_videos")
         
         state = FirebaseObj.get_document("system_state", "cron_stats")
         most_recent_published_at = state.get("mostRecentPublishedAt") if state else None
@@ -480,21 +1185,29 @@ async def cron_job_alert(x_cron_secret: str = Header(None)):
         
         if not videos:
             print("   ⚠️  No new videos found")
-            return JSONResponse(
-                {"status": "success", "message": "No new videos", "videos_processed": 0},
-                status_code=200
-            )
+            return {
+                "status": "success",
+                "message": "No new videos",
+                "videos_processed": 0,
+                "carried_over_emails_sent": carried_over["emails_sent"]
+            }
         
         print(f"   ✅ Found {len(videos)} video(s)")
+        JobRunsObj.progress(run_id, "preparing_videos", videosFound=len(videos), videosProcessed=0)
         for v in videos:
             print(f"      📹 {v['title'][:50]}...")
         
         # ===== STEP 3: Extract jobs from videos =====
         print(f"\n🔍 [CRON] Extracting jobs from videos...")
+        stages.start("prepare_videos")
         
         all_openings = []
         videos_with_jobs = 0
         videos_with_jobs_data = []  # Track videos that had job openings for timestamp update
+        transcript_stats = []  # Per-video transcript token savings
+        classifier_decisions = []  # Pre-classifier decision trace for threshold tuning
+        
+        prepared = []  # (video, prepared item) pairs that passed the pre-classifier
         
         for i, video in enumerate(videos, 1):
             try:
@@ -505,33 +1218,27 @@ async def cron_job_alert(x_cron_secret: str = Header(None)):
                     print(f"      ⏭️  Skipping (already processed)")
                     continue
                 
-                result = YoutubeObj.process_video_for_jobs(video["videoId"])
+                with span(f"video:{video['videoId']}"):
+                    item = YoutubeObj.prepare_video_for_extraction(video["videoId"])
                 
-                # DEBUG: Print result structure
-                print(f"      Result type: {type(result)}, Result: {result}")
+                classifier_decisions.append({
+                    "videoId": video["videoId"],
+                    "title": video.get("title", ""),
+                    "publishedAt": video.get("publishedAt"),
+                    "score": item["classification"]["score"],
+                    "threshold": item["classification"]["threshold"],
+                    "skipped": item["skip"],
+                    "trace": item["classification"]["trace"],
+                    # Gemini's verdict (None when skipped) is the label for threshold tuning
+                    "geminiIsJobVideo": None,
+                    "timestamp": int(datetime.now(timezone.utc).timestamp() * 1000)
+                })
                 
-                if result and isinstance(result, dict):
-                    is_job_video = result.get("isJobVideo", False)
-                    openings = result.get("openings", [])
-                    
-                    print(f"      isJobVideo: {is_job_video}, Openings count: {len(openings) if openings else 0}")
-                    
-                    if is_job_video and openings and len(openings) > 0:
-                        job_count = len(openings)
-                        print(f"      ✅ Found {job_count} job opening(s)")
-                        all_openings.extend(openings)
-                        videos_with_jobs += 1
-                        videos_with_jobs_data.append(video)  # Store video data for timestamp tracking
-                    else:
-                        print(f"      ℹ️  No jobs in this video (isJobVideo={is_job_video}, openings={len(openings) if openings else 0})")
-                else:
-                    print(f"      ⚠️  Invalid result format: {result}")
+                if item["skip"]:
+                    continue
+                
+                prepared.append((video, item))
                     
-            except json.JSONDecodeError as e:
-                ErrorLogsObj.log_gemini_error(e, video['videoId'])
-                print(f"      ❌ JSON Parse Error: {str(e)}")
-                print(f"         This usually means Gemini returned invalid JSON")
-                continue
             except Exception as e:
                 ErrorLogsObj.log_video_processing_error(e, video['videoId'])
                 print(f"      ❌ Error processing video: {type(e).__name__}: {str(e)}")
@@ -539,42 +1246,128 @@ async def cron_job_alert(x_cron_secret: str = Header(None)):
                 traceback.print_exc()
                 continue
         
-        # Deduplicate openings by (company, role, applyLink) to avoid sending same job multiple times
-        seen = set()
-        unique_openings = []
-        for job in all_openings:
-            key = (
-                (job.get("company") or "").lower().strip(),
-                (job.get("role") or "").lower().strip(),
-                (job.get("applyLink") or "").lower().strip()
-            )
-            if key not in seen:
-                seen.add(key)
-                unique_openings.append(job)
+        stages.start("extract")
+        JobRunsObj.progress(run_id, "extracting", videosProcessed=len(videos), videosToExtract=len(prepared))
+        
+        # Extract all prepared videos (batched into shared Gemini requests when enabled)
+        try:
+            results = YoutubeObj.extract_jobs_for_videos([item for _, item in prepared])
+        except Exception as e:
+            ErrorLogsObj.log_error(e, "gemini_extraction", {"videoIds": [v["videoId"] for v, _ in prepared]})
+            print(f"   ❌ Extraction failed: {type(e).__name__}: {str(e)}")
+            results = {}
+        
+        decisions_by_video = {d["videoId"]: d for d in classifier_decisions}
+        
+        failed_videos = []  # Videos Gemini couldn't be reached for; retried next run
+        
+        for video, item in prepared:
+            result = results.get(video["videoId"])
+            
+            # Transcript is only loaded for videos that passed the classify tier
+            if item["transcriptStats"]:
+                transcript_stats.append({"videoId": video["videoId"], **item["transcriptStats"]})
+            
+            if result and isinstance(result, dict) and result.get("failed"):
+                ErrorLogsObj.log_gemini_error(GeminiUnavailableError(result.get("error")), video["videoId"])
+                print(f"      ❌ Gemini unavailable, video will be retried next run")
+                failed_videos.append(video)
+            elif result and isinstance(result, dict):
+                if result.get("error"):
+                    # Rejected for good (invalid request / blocked response): processed, but logged
+                    ErrorLogsObj.log_gemini_error(GeminiRequestError(result["error"]), video["videoId"])
+                is_job_video = result.get("isJobVideo", False)
+                openings = result.get("openings", [])
+                decisions_by_video[video["videoId"]]["geminiIsJobVideo"] = is_job_video
+                decisions_by_video[video["videoId"]]["rejectedByClassifyTier"] = result.get("rejectedBy") == "classify"
+                
+                print(f"      isJobVideo: {is_job_video}, Openings count: {len(openings) if openings else 0}")
+                
+                if is_job_video and openings and len(openings) > 0:
+                    job_count = len(openings)
+                    print(f"      ✅ Found {job_count} job opening(s)")
+                    all_openings.extend(openings)
+                    videos_with_jobs += 1
+                    videos_with_jobs_data.append(video)  # Store video data for timestamp tracking
+                else:
+                    print(f"      ℹ️  No jobs in this video (isJobVideo={is_job_video}, openings={len(openings) if openings else 0})")
             else:
-                print(f"   🔄 Duplicate skipped: {job.get('role')} at {job.get('company')}")
+                print(f"      ⚠️  Invalid result format: {result}")
+        
+        # Deduplicate openings against this run and every previous run / manual post,
+        # keyed by (company, role, canonical applyLink) fingerprints
+        stages.start("deduplicate")
+        JobRunsObj.progress(run_id, "deduplicating", videosWithJobs=videos_with_jobs, videosFailed=len(failed_videos))
+        fingerprint_index_size = JobFingerprintsObj.load()
+        all_openings, duplicate_openings, near_duplicate_merges = JobFingerprintsObj.filter_new(all_openings)
+        for job in duplicate_openings:
+            print(f"   🔄 Duplicate skipped: {job.get('role')} at {job.get('company')}")
+        for merge in near_duplicate_merges:
+            print(f"   🧩 Near-duplicate merged: {merge['role']} at {merge['company']} ≈ {merge['mergedIntoRole']} at {merge['mergedIntoCompany']} ({merge['similarity']})")
+        
+        print(f"   After dedup: {len(all_openings)} unique opening(s) (index size: {fingerprint_index_size})")
+        
+        gemini_metrics = YoutubeObj.gemini_metrics()
+        for tier, tier_metrics in gemini_metrics.items():
+            print(f"   🤖 Gemini {tier} ({tier_metrics['model']}): {tier_metrics['requests']} request(s), {tier_metrics['retries']} retries, {tier_metrics['failures']} failure(s), p95 {tier_metrics['latencyP95Seconds']}s, ~${tier_metrics['estimatedCostUsd']}")
         
-        all_openings = unique_openings
-        print(f"   After dedup: {len(all_openings)} unique opening(s)")
+        transcript_tokens_saved = sum(t["tokensSaved"] for t in transcript_stats)
+        print(f"   ✂️  Transcript tokens saved this run: {transcript_tokens_saved}")
+        
+        videos_skipped_by_classifier = sum(1 for d in classifier_decisions if d["skipped"])
+        print(f"   🚫 Videos skipped by pre-classifier: {videos_skipped_by_classifier}")
+        stages.start("record_classifier_decisions")
+        for decision in classifier_decisions:
+            try:
+                FirebaseObj.add_document("classifier_decisions", decision)
+            except Exception as e:
+                print(f"   ⚠️  Failed to store classifier decision for {decision['videoId']}: {str(e)}")
         
         if not all_openings:
             print(f"\n📭 [CRON] No job openings found in any video")
             
-            return JSONResponse(
-                {
-                    "status": "success",
-                    "message": "No jobs found",
-                    "videos_processed": len(videos),
-                    "videos_with_jobs": videos_with_jobs,
-                    "jobs_extracted": 0
-                },
-                status_code=200
-            )
+            # Every opening may have been a duplicate: still move the watermark past
+            # these videos so they aren't fetched and extracted again next run
+            latest_published_at = watermark_after(videos_with_jobs_data, failed_videos)
+            if latest_published_at:
+                stages.start("update_state")
+                existing_cron_state = FirebaseObj.get_document("system_state", "cron_stats") or {}
+                existing_cron_state.pop("id", None)
+                CronLeaseObj.fenced_set_document(fencing_token, "system_state", "cron_stats", {
+                    **existing_cron_state,
+                    "lastRunTime": datetime.now(timezone.utc).isoformat(),
+                    "lastRunId": run_id,
+                    "mostRecentPublishedAt": latest_published_at
+                })
+                print(f"   ✅ Watermark moved to {latest_published_at}")
+            
+            return {
+                "status": "success",
+                "message": "No jobs found",
+                "videos_processed": len(videos),
+                "videos_with_jobs": videos_with_jobs,
+                "jobs_extracted": 0,
+                "transcript_tokens_saved": transcript_tokens_saved,
+                "transcript_stats": transcript_stats,
+                "videos_skipped_by_classifier": videos_skipped_by_classifier,
+                "videos_failed": len(failed_videos),
+                "gemini_metrics": gemini_metrics,
+                "duplicates_skipped": len(duplicate_openings),
+                "near_duplicate_merges": near_duplicate_merges
+            }
         
         print(f"\n🎯 [CRON] Total jobs extracted: {len(all_openings)}")
         
+        stages.start("archive")
+        try:
+            JobArchiveObj.save_jobs(all_openings, "cron_job_alert")
+        except Exception as e:
+            ErrorLogsObj.log_error(e, "cron_job_alert", {"step": "archive_jobs"})
+        
         # ===== STEP 4: Get active subscribers =====
         print(f"\n👥 [CRON] Fetching subscribers...")
+        stages.start("fetch_subscribers")
+        JobRunsObj.progress(run_id, "fetching_subscribers", jobsExtracted=len(all_openings))
         
         subscribers = FirebaseObj.get_all_documents("subscribers")
         active = [
@@ -585,64 +1378,44 @@ async def cron_job_alert(x_cron_secret: str = Header(None)):
         if not active:
             print("   📭 No active subscribers")
             
-            return JSONResponse(
-                {
-                    "status": "success",
-                    "message": "No active subscribers",
-                    "videos_processed": len(videos),
-                    "videos_with_jobs": videos_with_jobs,
-                    "jobs_extracted": len(all_openings),
-                    "emails_sent": 0
-                },
-                status_code=200
-            )
+            return {
+                "status": "success",
+                "message": "No active subscribers",
+                "videos_processed": len(videos),
+                "videos_with_jobs": videos_with_jobs,
+                "jobs_extracted": len(all_openings),
+                "emails_sent": 0
+            }
         
         print(f"   Total subscribers: {len(subscribers)}")
         print(f"   Active subscribers: {len(active)}")
         print(f"   Emails to send: {[s.get('email') for s in active]}")
         
-        # ===== STEP 5: Send job alerts in batches of 50 =====
+        # ===== STEP 5: Send job alerts in batches of 50, grouped by preferences =====
         print(f"\n📧 [CRON] Sending job alerts...")
+        stages.start("send")
+        CronLeaseObj.ensure_held(fencing_token)
         
-        batch_size = 50
-        batches_sent = 0
-        batches_failed = 0
-        emails_sent_this_run = 0  # Track actual number of emails sent
-
-        for batch_start in range(0, len(active), batch_size):
-            batch_end = min(batch_start + batch_size, len(active))
-            batch = active[batch_start:batch_end]
-            
+        delivery = send_job_alerts(active, all_openings, "cron_job_alert", run_id=run_id)
+        batches_sent = delivery["batches_sent"]
+        batches_failed = delivery["batches_failed"]
+        emails_sent_this_run = delivery["emails_sent"]  # Track actual number of emails sent
+        
+        # Remember delivered openings so later videos / manual posts don't re-send them
+        fingerprints_recorded = 0
+        stages.start("record_fingerprints")
+        # Openings queued for digests count as delivered too
+        if batches_sent > 0 or delivery["digest_queued"]:
             try:
-                print(f"   [Batch {batch_start//batch_size + 1}] Processing emails {batch_start+1} to {batch_end}...")
-                
-                # Extract valid emails from batch
-                batch_emails = [
-                    sub.get("email") for sub in batch 
-                    if sub.get("email") and sub.get("unsubscribeToken")
-                ]
-                
-                if not batch_emails:
-                    print(f"   [Batch {batch_start//batch_size + 1}] ⚠️  No valid emails in batch")
-                    batches_failed += 1
-                    continue
-                
-                # Send email to entire batch via BCC
-                GmailObj.send_job_alert_email_batch(
-                    bcc_emails=batch_emails,
-                    openings=all_openings
-                )
-                emails_sent_this_run += len(batch_emails)  # Add to total emails sent
-                print(f"   [Batch {batch_start//batch_size + 1}] ✅ Sent to {len(batch_emails)} recipients")
-                batches_sent += 1
-                
+                fingerprints_recorded = JobFingerprintsObj.record(all_openings, "cron_job_alert")
+                print(f"\n🧬 [CRON] Recorded {fingerprints_recorded} new job fingerprint(s)")
             except Exception as e:
-                ErrorLogsObj.log_email_error(e, f"batch_{batch_start}-{batch_end}", "cron_job_alert")
-                print(f"   [Batch {batch_start//batch_size + 1}] ❌ Failed: {str(e)}")
-                batches_failed += 1
+                ErrorLogsObj.log_error(e, "cron_job_alert", {"step": "record_fingerprints"})
         
         # ===== STEP 6: Update state =====
         print(f"\n💾 [CRON] Updating state...")
+        stages.start("update_state")
+        JobRunsObj.progress(run_id, "updating_state")
         
         # Get existing cron stats to maintain all counters
         existing_cron_state = FirebaseObj.get_document("system_state", "cron_stats") or {}
@@ -702,18 +1475,36 @@ async def cron_job_alert(x_cron_secret: str = Header(None)):
             "jobPostingsCount": len(all_openings),
             "dailyJobsSent": daily_jobs_sent,
             "videosProcessed": len(videos),
-            "videosWithJobs": videos_with_jobs
+            "videosWithJobs": videos_with_jobs,
+            # Transcript preprocessing stats (this run)
+            "transcriptTokensSaved": transcript_tokens_saved,
+            "transcriptStats": transcript_stats,
+            "videosSkippedByClassifier": videos_skipped_by_classifier,
+            "videosFailed": len(failed_videos),
+            "geminiMetrics": gemini_metrics,
+            "duplicatesSkipped": len(duplicate_openings),
+            "nearDuplicateMerges": near_duplicate_merges,
+            "matchGroups": delivery["match_groups"],
+            "deliveryShards": delivery["shards"],
+            "emailsDeferred": delivery["emails_deferred"],
+            "emailsRefused": delivery["emails_refused"],
+            "emailsSuppressed": delivery["emails_suppressed"],
+            "carriedOverEmailsSent": carried_over["emails_sent"],
+            "lastRunId": run_id,
+            "batchesPending": delivery["batches_pending"],
+            "fingerprintsRecorded": fingerprints_recorded
         }
         
-        # Add YouTube tracking if we have new jobs
-        if videos_with_jobs_data:
-            latest_published_at = max(v["publishedAt"] for v in videos_with_jobs_data)
+        # Add YouTube tracking if we have new jobs (never past a failed video)
+        latest_published_at = watermark_after(videos_with_jobs_data, failed_videos)
+        if latest_published_at:
             cron_stats_update["mostRecentPublishedAt"] = latest_published_at
         elif existing_cron_state.get("mostRecentPublishedAt"):
             # Preserve existing value if no new jobs
             cron_stats_update["mostRecentPublishedAt"] = existing_cron_state.get("mostRecentPublishedAt")
         
-        FirebaseObj.set_document(
+        CronLeaseObj.fenced_set_document(
+            fencing_token,
             "system_state",
             "cron_stats",
             cron_stats_update
@@ -722,7 +1513,9 @@ async def cron_job_alert(x_cron_secret: str = Header(None)):
         print(f"   ✅ Cron stats updated in system_state/cron_stats")
         print(f"   📊 Daily totals - Individual: {daily_individual_emails}, Batch recipients: {daily_batch_recipients}, Failed: {daily_batches_failed}, Jobs: {daily_jobs_sent}")
         print(f"   ❌ Daily failures - Individual failed: {daily_individual_failed}, Batch failed: {daily_batch_failed_recipients}")
-        print(f"   📧 Daily email quota (500/day): {daily_individual_emails + daily_batch_recipients} emails used")
+        print(f"   📧 Daily email quota ({GmailObj.pool.daily_limit}/day): {GmailObj.pool.daily_limit - GmailObj.pool.remaining(EmailQuota.PRIORITY_TRANSACTIONAL)} recipients used")
+        for sender in GmailObj.pool.status():
+            print(f"      - {sender['address']} (weight {sender['weight']}): {'healthy' if sender['healthy'] else 'cooling down'}{', quota used up' if sender['exhausted_today'] else ''}")
         
         # ===== COMPLETION =====
         print(f"\n🎉 [CRON] Job completed successfully!")
@@ -737,33 +1530,443 @@ async def cron_job_alert(x_cron_secret: str = Header(None)):
         print(f"   - Email recipients via batch all-time: {total_batch_recipients}")
         print("="*60 + "\n")
         
+        return {
+            "status": "success",
+            "message": "Job alert completed",
+            "videos_processed": len(videos),
+            "videos_with_jobs": videos_with_jobs,
+            "jobs_extracted": len(all_openings),
+            "batches_sent": batches_sent,
+            "batches_failed": batches_failed,
+            "emails_sent_this_run": emails_sent_this_run,
+            "individual_emails_all_time": total_individual_emails,
+            "individual_emails_failed_all_time": total_individual_failed,
+            "batch_operations_all_time": total_batch_operations,
+            "batch_operations_failed_all_time": total_batch_operations_failed,
+            "batch_recipients_all_time": total_batch_recipients,
+            "batch_recipients_failed_all_time": total_batch_failed_recipients,
+            "transcript_tokens_saved": transcript_tokens_saved,
+            "transcript_stats": transcript_stats,
+            "videos_skipped_by_classifier": videos_skipped_by_classifier,
+            "videos_failed": len(failed_videos),
+            "gemini_metrics": gemini_metrics,
+            "duplicates_skipped": len(duplicate_openings),
+            "near_duplicate_merges": near_duplicate_merges,
+            "fingerprints_recorded": fingerprints_recorded,
+            "match_groups": delivery["match_groups"],
+            "delivery_shards": delivery["shards"],
+            "emails_deferred": delivery["emails_deferred"],
+            "emails_refused": delivery["emails_refused"],
+            "emails_suppressed": delivery["emails_suppressed"],
+            "carried_over_emails_sent": carried_over["emails_sent"],
+            "batches_pending": delivery["batches_pending"],
+            "run_id": run_id
+        }
+    
+    except Exception as e:
+        ErrorLogsObj.log_error(e, "cron_job_alert", {"step": "general", "runId": run_id})
+        print(f"\n❌ [CRON] FATAL ERROR: {str(e)}")
+        print("="*60 + "\n")
+        import traceback
+        traceback.print_exc()
+        raise
+    finally:
+        stages.stop()
+
+
+@app.get("/api/cron/digest")
+async def cron_digest(
+    background_tasks: BackgroundTasks,
+    cadence: str = "daily",
+    force: bool = False,
+    x_cron_secret: str = Header(None)
+):
+    """
+    Send the daily or weekly digest of openings queued since the last one.
+
+    Queues a background run and returns 202 with its run_id; the run skips
+    itself if the cadence window hasn't passed yet (unless force=true).
+
+    Security:
+    - Header: x-cron-secret
+    - Compare against environment variable: CRON_SECRET
+    - Returns 409 with the running run_id if another digest run holds the lease
+    """
+    CRON_SECRET = os.getenv("CRON_SECRET")
+
+    if not CRON_SECRET:
+        return JSONResponse(
+            {"error": "CRON_SECRET not configured"},
+            status_code=500
+        )
+
+    if not x_cron_secret or x_cron_secret != CRON_SECRET:
+        return JSONResponse(
+            {"error": "Unauthorized"},
+            status_code=403
+        )
+
+    if cadence not in DigestQueue.WINDOWS_MS:
+        raise HTTPException(status_code=400, detail="Cadence must be: daily or weekly")
+
+    run_id = JobRunsObj.new_run_id(f"digest_{cadence}")
+    try:
+        fencing_token, current_lease = DigestLeaseObj.acquire(run_id)
+    except Exception as e:
+        ErrorLogsObj.log_error(e, "cron_digest", {"step": "acquire_lease", "cadence": cadence})
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    if fencing_token is None:
         return JSONResponse(
             {
+                "status": "in_progress",
+                "message": "A digest run is already in progress",
+                "run_id": current_lease.get("holder"),
+                "status_url": f"/api/runs/{current_lease.get('holder')}",
+                "lease_expires_at": current_lease.get("expiresAt")
+            },
+            status_code=409
+        )
+
+    try:
+        JobRunsObj.create(f"digest_{cadence}", {"cadence": cadence, "force": force, "fencingToken": fencing_token}, run_id=run_id)
+    except Exception as e:
+        DigestLeaseObj.release(fencing_token)
+        ErrorLogsObj.log_error(e, "cron_digest", {"step": "create_run", "cadence": cadence})
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    background_tasks.add_task(execute_run, run_id, run_digest, run_id, cadence, force, fencing_token)
+    return run_accepted_response(run_id)
+
+
+def run_digest(run_id: str, cadence: str, force: bool, fencing_token: int) -> dict:
+    """Background body of /api/cron/digest, run while holding the digest lease."""
+    with DigestLeaseObj.hold(fencing_token):
+        try:
+            print("\n" + "="*60)
+            print(f"📬 [DIGEST] Starting {cadence} digest {run_id} at {datetime.now(timezone.utc)}")
+            print("="*60)
+
+            if not force and not DigestQueueObj.is_due(cadence):
+                next_due_at = DigestQueueObj.next_due_at(cadence)
+                print(f"   ⏸️  Not due until {datetime.fromtimestamp(next_due_at / 1000, timezone.utc)}")
+                return {
+                    "status": "skipped",
+                    "message": f"The {cadence} digest is not due yet",
+                    "next_due_at": next_due_at,
+                    "run_id": run_id
+                }
+
+            JobRunsObj.progress(run_id, "collecting")
+            openings, cutoff = DigestQueueObj.pending(cadence)
+            print(f"   📦 {len(openings)} opening(s) queued since the last {cadence} digest")
+
+            subscribers = FirebaseObj.get_all_documents("subscribers")
+            active = [
+                s for s in subscribers
+                if s.get("subscribed") and s.get("isVerified")
+            ]
+
+            delivery = None
+            if openings and active:
+                DigestLeaseObj.ensure_held(fencing_token)
+                with span("send"):
+                    delivery = send_job_alerts(active, openings, f"digest_{cadence}", run_id=run_id, cadence=cadence)
+
+            # Openings added after the cutoff go in the next digest
+            DigestLeaseObj.ensure_held(fencing_token)
+            DigestQueueObj.mark_sent(cadence, cutoff, run_id, len(openings))
+
+            print(f"\n🎉 [DIGEST] {cadence} digest done: {delivery['emails_sent'] if delivery else 0} email(s) sent")
+            print("="*60 + "\n")
+            return {
                 "status": "success",
-                "message": "Job alert completed",
-                "videos_processed": len(videos),
-                "videos_with_jobs": videos_with_jobs,
-                "jobs_extracted": len(all_openings),
-                "batches_sent": batches_sent,
-                "batches_failed": batches_failed,
-                "emails_sent_this_run": emails_sent_this_run,
-                "individual_emails_all_time": total_individual_emails,
-                "individual_emails_failed_all_time": total_individual_failed,
-                "batch_operations_all_time": total_batch_operations,
-                "batch_operations_failed_all_time": total_batch_operations_failed,
-                "batch_recipients_all_time": total_batch_recipients,
-                "batch_recipients_failed_all_time": total_batch_failed_recipients
+                "message": f"{cadence.capitalize()} digest sent" if delivery else "Nothing to send",
+                "cadence": cadence,
+                "openings": len(openings),
+                "emails_sent": delivery["emails_sent"] if delivery else 0,
+                "batches_sent": delivery["batches_sent"] if delivery else 0,
+                "batches_failed": delivery["batches_failed"] if delivery else 0,
+                "batches_pending": delivery["batches_pending"] if delivery else 0,
+                "emails_deferred": delivery["emails_deferred"] if delivery else 0,
+                "run_id": run_id
+            }
+
+        except Exception as e:
+            ErrorLogsObj.log_error(e, "cron_digest", {"cadence": cadence, "runId": run_id})
+            print(f"\n❌ [DIGEST] FATAL ERROR: {str(e)}")
+            raise
+
+
+@app.get("/api/runs/{run_id}")
+async def get_run_status(run_id: str, x_cron_secret: str = Header(None)):
+    """
+    Status of a background run started by /api/cron/job-alert or /api/post-job.
+
+    Security:
+    - Header: x-cron-secret
+    - Compare against environment variable: CRON_SECRET
+
+    Returns:
+    - status: queued | running | succeeded | failed
+    - stage: current step (e.g. extracting, sending)
+    - progress: counters such as videosProcessed, batchesSent, batchesFailed
+    - result: the endpoint's former JSON response, once succeeded
+    - timings: span tree of the finished run ({"name", "ms", "count", "maxMs", "children"}),
+      with stages, per-video / per-batch spans and Firestore, YouTube, Gemini and SMTP calls
+    """
+    CRON_SECRET = os.getenv("CRON_SECRET")
+
+    if not CRON_SECRET:
+        return JSONResponse(
+            {"error": "CRON_SECRET not configured"},
+            status_code=500
+        )
+
+    if not x_cron_secret or x_cron_secret != CRON_SECRET:
+        return JSONResponse(
+            {"error": "Unauthorized"},
+            status_code=403
+        )
+
+    try:
+        run = JobRunsObj.get(run_id)
+    except Exception as e:
+        ErrorLogsObj.log_error(e, "get_run_status", {"run_id": run_id})
+        return JSONResponse({"error": "Failed to fetch run"}, status_code=500)
+
+    if not run:
+        return JSONResponse({"error": "Run not found"}, status_code=404)
+
+    return JSONResponse(
+        {
+            "run_id": run_id,
+            "kind": run.get("kind"),
+            "status": run.get("status"),
+            "stage": run.get("stage"),
+            "progress": run.get("progress", {}),
+            "result": run.get("result"),
+            "error": run.get("error"),
+            "timings": run.get("timings"),
+            "created_at": run.get("createdAt"),
+            "started_at": run.get("startedAt"),
+            "finished_at": run.get("finishedAt")
+        },
+        status_code=200
+    )
+
+
+@app.get("/api/admin/suppressions")
+async def list_suppressions(x_cron_secret: str = Header(None)):
+    """
+    List the suppressed addresses that job alerts skip (hard / soft bounces,
+    refused recipients, manual blocks).
+
+    Security:
+    - Header: x-cron-secret
+    - Compare against environment variable: CRON_SECRET
+    """
+    CRON_SECRET = os.getenv("CRON_SECRET")
+
+    if not CRON_SECRET:
+        return JSONResponse(
+            {"error": "CRON_SECRET not configured"},
+            status_code=500
+        )
+
+    if not x_cron_secret or x_cron_secret != CRON_SECRET:
+        return JSONResponse(
+            {"error": "Unauthorized"},
+            status_code=403
+        )
+
+    try:
+        entries = await run_in_threadpool(SuppressionsObj.list_all)
+    except Exception as e:
+        ErrorLogsObj.log_error(e, "admin_suppressions", {"step": "list"})
+        return JSONResponse({"error": "Failed to fetch suppressions"}, status_code=500)
+
+    return JSONResponse(
+        {
+            "count": len(entries),
+            "suppressions": [
+                {
+                    "email": entry.get("email"),
+                    "kind": entry.get("kind"),
+                    "reason": entry.get("reason"),
+                    "source": entry.get("source"),
+                    "count": entry.get("count", 0),
+                    "first_seen_at": entry.get("firstSeenAt"),
+                    "last_seen_at": entry.get("lastSeenAt"),
+                    "expires_at": entry.get("expiresAt")
+                }
+                for entry in sorted(entries, key=lambda e: e.get("lastSeenAt") or 0, reverse=True)
+            ]
+        },
+        status_code=200
+    )
+
+
+@app.post("/api/admin/suppressions")
+async def override_suppression(body: SuppressionOverrideRequest, x_cron_secret: str = Header(None)):
+    """
+    Admin override of the suppression list.
+
+    Body (JSON):
+    - email: address to change
+    - action: "allow" lifts a suppression, "suppress" blocks the address manually
+    - reason: optional note kept with a manual block
+
+    Security:
+    - Header: x-cron-secret
+    - Compare against environment variable: CRON_SECRET
+    """
+    CRON_SECRET = os.getenv("CRON_SECRET")
+
+    if not CRON_SECRET:
+        return JSONResponse(
+            {"error": "CRON_SECRET not configured"},
+            status_code=500
+        )
+
+    if not x_cron_secret or x_cron_secret != CRON_SECRET:
+        return JSONResponse(
+            {"error": "Unauthorized"},
+            status_code=403
+        )
+
+    email = body.email.strip().lower()
+    if not email or "@" not in email:
+        raise HTTPException(status_code=400, detail="A valid email is required")
+    if body.action not in ("allow", "suppress"):
+        raise HTTPException(status_code=400, detail="action must be: allow or suppress")
+
+    try:
+        if body.action == "allow":
+            lifted = await run_in_threadpool(SuppressionsObj.lift, email)
+            if not lifted:
+                return JSONResponse({"error": "Address is not suppressed"}, status_code=404)
+            print(f"✅ [ADMIN] Suppression lifted for {email}")
+        else:
+            await run_in_threadpool(
+                SuppressionsObj.record, email, Suppressions.KIND_MANUAL, body.reason or "manual block", "admin"
+            )
+            print(f"🚫 [ADMIN] {email} suppressed manually")
+    except Exception as e:
+        ErrorLogsObj.log_error(e, "admin_suppressions", {"email": email, "action": body.action})
+        return JSONResponse({"error": "Failed to update suppression"}, status_code=500)
+
+    return JSONResponse(
+        {"status": "success", "email": email, "action": body.action},
+        status_code=200
+    )
+
+
+@app.get("/api/cron/resume-outbox")
+async def resume_outbox(run_id: Optional[str] = None, x_cron_secret: str = Header(None)):
+    """
+    Deliver outbox batches left unsent by a crashed or failed run.
+
+    Only tasks that are pending (or whose lease expired) are claimed, so batches
+    that already went out are never re-sent.
+
+    Security:
+    - Header: x-cron-secret
+    - Compare against environment variable: CRON_SECRET
+    - Returns HTTP 403 if invalid
+
+    Query params:
+    - run_id: Only resume this run (default: every run)
+    """
+    try:
+        CRON_SECRET = os.getenv("CRON_SECRET")
+
+        if not CRON_SECRET:
+            return JSONResponse(
+                {"error": "CRON_SECRET not configured"},
+                status_code=500
+            )
+
+        if not x_cron_secret or x_cron_secret != CRON_SECRET:
+            return JSONResponse(
+                {"error": "Unauthorized"},
+                status_code=403
+            )
+
+        print("\n" + "="*60)
+        print(f"📮 [OUTBOX] Resuming unsent batches{f' for run {run_id}' if run_id else ''} at {datetime.now(timezone.utc)}")
+        print("="*60)
+
+        delivery = await run_in_threadpool(deliver_outbox, run_id=run_id)
+
+        print(f"\n🎉 [OUTBOX] Resume completed: {delivery['batches_sent']} batch(es), {delivery['emails_sent']} email(s) sent")
+        print("="*60 + "\n")
+
+        return JSONResponse(
+            {
+                "status": "success",
+                "run_id": run_id,
+                **delivery,
+                "timestamp": datetime.now(timezone.utc).isoformat()
             },
             status_code=200
         )
-        
+
     except Exception as e:
-        ErrorLogsObj.log_error(e, "cron_job_alert", {"step": "general"})
-        print(f"\n❌ [CRON] FATAL ERROR: {str(e)}")
-        print("="*60 + "\n")
-        import traceback
-        traceback.print_exc()
-        
+        ErrorLogsObj.log_error(e, "cron_resume_outbox", {"run_id": run_id})
+        print(f"\n❌ [OUTBOX] FATAL ERROR: {str(e)}")
+        return JSONResponse(
+            {"error": str(e)},
+            status_code=500
+        )
+
+
+@app.get("/api/cron/deliver-shards")
+async def deliver_outbox_shards(run_id: Optional[str] = None, x_cron_secret: str = Header(None)):
+    """
+    Join an in-progress fan-out as an extra delivery worker.
+
+    Claims undelivered outbox shards (of `run_id`, or of any run) and delivers
+    them; the run that queued them rolls the results up into its summary.
+    Call it on additional instances to scale delivery horizontally.
+
+    Security:
+    - Header: x-cron-secret
+    - Compare against environment variable: CRON_SECRET
+    - Returns HTTP 403 if invalid
+    """
+    try:
+        CRON_SECRET = os.getenv("CRON_SECRET")
+
+        if not CRON_SECRET:
+            return JSONResponse(
+                {"error": "CRON_SECRET not configured"},
+                status_code=500
+            )
+
+        if not x_cron_secret or x_cron_secret != CRON_SECRET:
+            return JSONResponse(
+                {"error": "Unauthorized"},
+                status_code=403
+            )
+
+        print(f"\n🧩 [SHARDS] Delivering shards{f' for run {run_id}' if run_id else ''} at {datetime.now(timezone.utc)}")
+        result = await run_in_threadpool(deliver_shards, run_id)
+        print(f"🧩 [SHARDS] Delivered {result['shards_delivered']} shard(s)")
+
+        return JSONResponse(
+            {
+                "status": "success",
+                "run_id": run_id,
+                **result,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            },
+            status_code=200
+        )
+
+    except Exception as e:
+        ErrorLogsObj.log_error(e, "cron_deliver_shards", {"run_id": run_id})
+        print(f"\n❌ [SHARDS] FATAL ERROR: {str(e)}")
         return JSONResponse(
             {"error": str(e)},
             status_code=500
@@ -812,6 +2015,15 @@ async def cleanup_error_logs(x_cron_secret: str = Header(None)):
         deleted_count = ErrorLogsObj.clear_old_errors(days=7)
         
         print(f"   ✅ Successfully deleted {deleted_count} old error logs")
+
+        outbox_deleted = EmailOutboxObj.clear_old_tasks(days=7)
+        print(f"   ✅ Deleted {outbox_deleted} finished outbox task(s)")
+
+        digest_deleted = DigestQueueObj.clear_old(days=8)
+        print(f"   ✅ Deleted {digest_deleted} opening(s) past every digest window")
+
+        idempotency_deleted = IdempotencyKeysObj.clear_expired()
+        print(f"   ✅ Deleted {idempotency_deleted} expired idempotency key(s)")
         
         # ===== COMPLETION =====
         print(f"\n🎉 [CLEANUP] Cleanup completed successfully!")
@@ -823,6 +2035,9 @@ async def cleanup_error_logs(x_cron_secret: str = Header(None)):
                 "status": "success",
                 "message": "Cleanup completed",
                 "error_logs_deleted": deleted_count,
+                "outbox_tasks_deleted": outbox_deleted,
+                "digest_openings_deleted": digest_deleted,
+                "idempotency_keys_deleted": idempotency_deleted,
                 "timestamp": datetime.now(timezone.utc).isoformat()
             },
             status_code=200
@@ -850,15 +2065,25 @@ APPLICATION FLOW:
 1. Subscribe -> User enters email, stored in Firestore with isVerified=False
 2. Verification -> User receives verification email with JWT token
 3. Verify endpoint -> Validates token, sets isVerified=True and subscribed=True
-4. Cron job -> /api/cron/job-alert endpoint (called by GitHub Actions every 3 hours)
+4. Cron job -> /api/cron/job-alert endpoint (called by GitHub Actions every 3 hours);
+   returns 202 with a run_id, progress and result are read from /api/runs/{run_id}
 5. Unsubscribe -> User clicks unsubscribe link with JWT token to stop receiving emails
 
 CRON EXECUTION (GitHub Actions):
 - GitHub Actions calls GET /api/cron/job-alert with x-cron-secret header every 3 hours
 - Endpoint authenticates using CRON_SECRET environment variable
+- Queues a background run (job_runs collection) and returns 202 immediately, so a run
+  is not bounded by HTTP or proxy timeouts; the workflow polls GET /api/runs/{run_id}
 - Processes YouTube videos, extracts jobs, and sends emails to subscribers
-- Stateless HTTP endpoint: safe to call multiple times
+- Stateless HTTP endpoint: safe to call multiple times; a Firestore lease
+  (system_state/cron_job_alert_lease) with heartbeat and fencing token lets only one
+  run proceed at a time, overlapping triggers get 409 "run in progress"
 - State tracked in Firestore (mostRecentPublishedAt stores timestamp from last video with job openings)
 - Only updates timestamp when videos with actual job openings are processed
-- Job openings are deduplicated by (company, role, applyLink) before sending
+- Job openings are deduplicated by (company, role, canonical applyLink) fingerprints,
+  persisted in job_fingerprints so an opening is only ever mailed once across runs
+- Email batches are queued in the email_outbox collection before sending; unsent
+  batches of a crashed run are delivered by GET /api/cron/resume-outbox
+- Batches are split into shards by hash of email; extra instances can help deliver
+  a run via GET /api/cron/deliver-shards
 """
\ No newline at end of file
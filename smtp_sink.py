@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Local SMTP sink for offline delivery runs and benchmarks.
+
+Accepts every message on EMAIL_SINK_HOST:EMAIL_SINK_PORT (default 127.0.0.1:8025)
+and stores it like the sink transport (EMAIL_SINK_DIR as .eml files, or counted
+in memory). Point the app at it with:
+
+    EMAIL_TRANSPORT=smtp EMAIL_SMTP_HOST=127.0.0.1 EMAIL_SMTP_PORT=8025 EMAIL_SMTP_STARTTLS=false
+
+The server offers neither STARTTLS nor AUTH; EMAIL_SMTP_STARTTLS=false (allowed
+for local hosts only) makes the SMTP transport skip both.
+Requires aiosmtpd (pip install aiosmtpd).
+"""
+
+import os
+import time
+from dotenv import load_dotenv
+
+from Repository.EmailTransport import SinkTransport
+
+load_dotenv()
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    raise SystemExit("aiosmtpd is not installed: pip install aiosmtpd")
+
+
+class SinkHandler:
+    def __init__(self, sink: SinkTransport):
+        self.sink = sink
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sink.store(envelope.mail_from, list(envelope.rcpt_tos), envelope.original_content or envelope.content)
+        return "250 Message accepted for delivery"
+
+
+if __name__ == "__main__":
+    sink = SinkTransport()
+    host = os.getenv("EMAIL_SINK_HOST", "127.0.0.1")
+    port = int(os.getenv("EMAIL_SINK_PORT", "8025"))
+
+    controller = Controller(SinkHandler(sink), hostname=host, port=port)
+    controller.start()
+    print(f"📭 SMTP sink listening on {host}:{port} ({sink.directory or 'in memory'})")
+
+    try:
+        while True:
+            time.sleep(10)
+            print(f"   📨 {sink.message_count} message(s), {sink.recipient_count} recipient(s) received")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.stop()
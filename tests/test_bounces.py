@@ -0,0 +1,75 @@
+import mailbox
+from email import message_from_string
+
+from utils.bounces import bounce_kind, parse_bounce, read_bounce_mailbox
+
+DSN = """From: MAILER-DAEMON@mx.example.com
+To: alerts@example.com
+Subject: Undelivered Mail Returned to Sender
+MIME-Version: 1.0
+Content-Type: multipart/report; report-type=delivery-status; boundary="b1"
+
+--b1
+Content-Type: text/plain
+
+Delivery failed for some recipients.
+
+--b1
+Content-Type: message/delivery-status
+
+Reporting-MTA: dns; mx.example.com
+
+Final-Recipient: rfc822; <Gone@Example.com>
+Action: failed
+Status: 5.1.1
+Diagnostic-Code: smtp; 550 5.1.1 User unknown
+
+Final-Recipient: rfc822; full@example.com
+Action: delayed
+Status: 4.2.2
+Diagnostic-Code: smtp; 452 4.2.2 Mailbox full
+
+Final-Recipient: rfc822; ok@example.com
+Action: delivered
+Status: 2.0.0
+
+--b1--
+"""
+
+
+def test_bounce_kind_from_smtp_replies_and_status_codes():
+    assert bounce_kind("550 5.1.1 User unknown") == "hard"
+    assert bounce_kind("421 4.7.0 Try again later") == "soft"
+    assert bounce_kind("5.2.2") == "hard"
+    assert bounce_kind("Status: 4.4.1 (no answer)") == "soft"
+
+
+def test_bounce_kind_ignores_success_and_noise():
+    assert bounce_kind("250 2.0.0 OK") is None
+    assert bounce_kind("") is None
+    assert bounce_kind(None) is None
+    assert bounce_kind("mailbox unavailable") is None
+
+
+def test_parse_bounce_reads_failed_and_delayed_recipients():
+    bounces = parse_bounce(message_from_string(DSN))
+    assert bounces == [
+        {"email": "gone@example.com", "kind": "hard", "status": "5.1.1", "diagnostic": "550 5.1.1 User unknown"},
+        {"email": "full@example.com", "kind": "soft", "status": "4.2.2", "diagnostic": "452 4.2.2 Mailbox full"},
+    ]
+
+
+def test_parse_bounce_ignores_ordinary_mail():
+    message = message_from_string("From: a@example.com\nSubject: Hi\n\n550 5.1.1 looks like a bounce\n")
+    assert parse_bounce(message) == []
+
+
+def test_read_bounce_mailbox_consumes_an_mbox(tmp_path):
+    path = tmp_path / "bounces.mbox"
+    box = mailbox.mbox(str(path))
+    box.add(message_from_string(DSN))
+    box.close()
+
+    assert [b["email"] for b in read_bounce_mailbox(str(path))] == ["gone@example.com", "full@example.com"]
+    assert read_bounce_mailbox(str(path)) == []
+    assert read_bounce_mailbox(str(tmp_path / "missing")) == []
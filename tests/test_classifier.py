@@ -0,0 +1,25 @@
+from utils.classifier import classify_job_video, DEFAULT_THRESHOLD
+
+
+def test_hiring_video_passes_with_trace():
+    result = classify_job_video(
+        "Amazon Hiring Freshers 2025 | Apply Now",
+        "Apply here: https://amazon.jobs/en/jobs/123 Eligibility: 2025 batch"
+    )
+    assert result["isLikelyJob"]
+    assert result["score"] == 1.0
+    assert result["threshold"] == DEFAULT_THRESHOLD
+    assert {f["feature"] for f in result["trace"]} >= {"title_hiring", "title_apply", "description_apply_domain"}
+
+
+def test_tutorial_video_is_skipped():
+    result = classify_job_video("DSA Roadmap for Freshers", "Follow this course to crack interviews")
+    assert not result["isLikelyJob"]
+    assert any(f["feature"] == "title_non_job" and f["weight"] < 0 for f in result["trace"])
+
+
+def test_score_is_clamped_and_threshold_configurable():
+    result = classify_job_video("Vlog", "", threshold=0.0)
+    assert result["score"] == 0.0
+    assert result["isLikelyJob"]
+    assert classify_job_video(None, None)["trace"] == []
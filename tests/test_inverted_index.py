@@ -0,0 +1,56 @@
+from utils.inverted_index import InvertedIndex
+
+
+def job(sort_key: str, **fields) -> dict:
+    return {"sortKey": sort_key, **fields}
+
+
+def build() -> InvertedIndex:
+    index = InvertedIndex()
+    index.add("a", job("001", location="Bengaluru, India", workMode="WFH", employmentType="Intern", requiredSkills=["Python", "SQL"]))
+    index.add("b", job("002", location="Mumbai", workMode="Onsite", employmentType="Full Time", requiredSkills=["Java"]))
+    index.add("c", job("003", location="Remote", workMode="Remote", requiredSkills=["python", "Go"]))
+    return index
+
+
+def test_location_parts_and_aliases_match():
+    index = build()
+    assert index.match({"location": ["bangalore"]}) == {"a"}
+    assert index.match({"location": ["India"]}) == {"a"}
+    assert index.match({"location": ["Bombay"]}) == {"b"}
+    assert index.match({"location": ["work from home"]}) == {"c"}
+
+
+def test_work_mode_and_employment_aliases_match():
+    index = build()
+    assert index.match({"workMode": ["remote"]}) == {"a", "c"}
+    assert index.match({"workMode": ["on-site"]}) == {"b"}
+    assert index.match({"employmentType": ["internship"]}) == {"a"}
+    assert index.match({"employmentType": ["full-time"]}) == {"b"}
+
+
+def test_values_are_ored_and_fields_anded():
+    index = build()
+    assert index.match({"skill": ["python", "java"]}) == {"a", "b", "c"}
+    assert index.match({"skill": ["python"], "location": ["remote"]}) == {"c"}
+    assert index.match({"skill": ["python", "go"]}, skill_mode="all") == {"c"}
+    assert index.match({}) is None
+
+
+def test_query_is_newest_first_with_cursor():
+    index = build()
+    assert [j["sortKey"] for j in index.query({}, limit=2)] == ["003", "002"]
+    assert [j["sortKey"] for j in index.query({}, before="002")] == ["001"]
+    assert [j["sortKey"] for j in index.query({"skill": ["python"]})] == ["003", "001"]
+
+
+def test_reindex_and_remove_drop_old_terms():
+    index = build()
+    index.add("a", job("004", location="Pune", requiredSkills=["Rust"]))
+    assert index.match({"location": ["bangalore"]}) == set()
+    assert [j["sortKey"] for j in index.query({}, limit=1)] == ["004"]
+
+    index.remove("a")
+    assert len(index) == 2
+    assert ("skill", "rust") not in index.postings
+    assert index.sort_keys == ["002", "003"]
@@ -0,0 +1,57 @@
+from utils.mail_content import minify_html, html_to_text
+
+EMAIL = """<html><head><title>Alerts</title><style>
+  .card { color : red ; }  /* brand */
+</style></head>
+<body>
+  <!-- tracking note -->
+  <!--[if mso]><table><![endif]-->
+  <h1>New   openings &amp; more</h1>
+  <div class="card">
+    <p>Backend <b>Engineer</b><br>Acme</p>
+    <a href="https://acme.com/apply">Apply now</a>
+  </div>
+  <ul><li>Python</li><li>Go</li></ul>
+  <a href="#">Nowhere</a>
+  <script>track();</script>
+</body></html>"""
+
+
+def test_minify_drops_comments_but_keeps_conditional_ones():
+    html = minify_html(EMAIL)
+    assert "tracking note" not in html
+    assert "<!--[if mso]>" in html
+
+
+def test_minify_compacts_css_and_whitespace():
+    html = minify_html(EMAIL)
+    assert "<style>.card{color:red}</style>" in html
+    assert "<h1>New openings &amp; more</h1><div" in html
+    assert "\n" not in html
+
+
+def test_minify_keeps_space_between_inline_elements():
+    assert minify_html("<p><b>Backend</b>   <i>Engineer</i></p>") == "<p><b>Backend</b> <i>Engineer</i></p>"
+
+
+def test_text_has_a_line_per_block_and_skips_head_and_scripts():
+    text = html_to_text(EMAIL)
+    assert text.splitlines()[0] == "New openings & more"
+    assert "Alerts" not in text and "track()" not in text and "color" not in text
+    assert "Backend Engineer\nAcme\n" in text
+    assert "Python\nGo\n" in text
+
+
+def test_text_keeps_link_targets_except_placeholders():
+    text = html_to_text(EMAIL)
+    assert "Apply now (https://acme.com/apply)" in text
+    assert "Nowhere\n" in text and "(#)" not in text
+
+
+def test_text_separates_cards_with_a_blank_line():
+    text = html_to_text("<div><p>One</p></div><div><p>Two</p></div>")
+    assert text == "One\n\nTwo\n"
+
+
+def test_text_of_minified_html_matches():
+    assert html_to_text(minify_html(EMAIL)) == html_to_text(EMAIL)
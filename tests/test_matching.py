@@ -0,0 +1,67 @@
+from utils.matching import normalize_preferences, normalize_values, match_matrix, group_by_match
+
+
+def subscriber(email: str, **preferences) -> dict:
+    return {"email": email, "preferences": normalize_preferences(preferences)}
+
+
+OPENINGS = [
+    {"role": "Backend Intern", "location": "Bengaluru", "requiredSkills": ["Python", "Go"], "employmentType": "Internship", "workMode": "On Site"},
+    {"role": "Java Developer", "location": "Mumbai", "requiredSkills": ["Java"], "employmentType": "Full Time", "workMode": "Office"},
+    {"role": "Data Analyst", "location": "WFH", "requiredSkills": ["python"]},
+]
+
+
+def test_preferences_are_split_lowercased_and_aliased():
+    preferences = normalize_preferences({
+        "locations": "Bengaluru, Work From Home",
+        "employmentTypes": ["Intern", "fulltime"],
+        "skills": "Python / Machine  Learning",
+    })
+    assert preferences == {
+        "skills": ["machine learning", "python"],
+        "workModes": [],
+        "employmentTypes": ["full-time", "internship"],
+        "locations": ["bangalore", "remote"],
+    }
+
+
+def test_work_mode_aliases():
+    assert normalize_values("workModes", "Onsite | WFH") == {"on-site", "remote"}
+
+
+def test_dimensions_are_anded_and_values_ored():
+    subscribers = [
+        subscriber("a@x.com", locations="Bangalore, Remote", skills="python"),
+        subscriber("b@x.com", employmentTypes="full time", workModes="on-site"),
+    ]
+    matrix = match_matrix(subscribers, OPENINGS)
+    assert matrix.tolist() == [
+        [True, False, True],
+        # Opening 2 has no employmentType / workMode, so it never excludes anyone
+        [False, True, True],
+    ]
+
+
+def test_subscriber_without_preferences_gets_everything():
+    matrix = match_matrix([subscriber("c@x.com")], OPENINGS)
+    assert matrix.all()
+
+
+def test_identical_match_sets_share_a_group_largest_first():
+    subscribers = [
+        subscriber("a@x.com", locations="bangalore, remote"),
+        subscriber("b@x.com"),
+        subscriber("c@x.com", skills="python"),
+        subscriber("d@x.com", skills="rust"),
+    ]
+    groups = group_by_match(subscribers, OPENINGS)
+    assert [(openings, [s["email"] for s in members]) for openings, members in groups] == [
+        ([0, 2], ["a@x.com", "c@x.com"]),
+        ([0, 1, 2], ["b@x.com"]),
+    ]
+
+
+def test_no_subscribers_or_openings():
+    assert group_by_match([], OPENINGS) == []
+    assert group_by_match([subscriber("a@x.com")], []) == []
@@ -0,0 +1,84 @@
+from utils.minhash import (
+    job_shingles, jaccard, similarity as shingle_similarity, minhash_signature, LSHIndex,
+    DEFAULT_SIMILARITY_THRESHOLD, NUM_PERM
+)
+
+ACME = {"company": "Acme Technologies Pvt Ltd", "applyLink": "https://www.acme.com/careers/123?utm_source=yt"}
+
+
+def similarity(a: dict, b: dict) -> float:
+    return shingle_similarity(job_shingles({**ACME, **a}), job_shingles({**ACME, **b}))
+
+
+def test_abbreviated_role_is_a_near_duplicate():
+    assert similarity({"role": "SDE Intern"}, {"role": "Software Development Engineer Intern"}) == 1.0
+
+
+def test_reworded_role_without_a_link_still_merges():
+    score = similarity(
+        {"role": "SDE Intern", "employmentType": "Internship"},
+        {"role": "Software Development Engineer Intern", "employmentType": "Internship", "applyLink": ""}
+    )
+    assert score >= DEFAULT_SIMILARITY_THRESHOLD
+
+
+def test_intern_and_full_time_roles_stay_apart():
+    assert similarity({"role": "Software Engineer Intern"}, {"role": "Software Engineer"}) < DEFAULT_SIMILARITY_THRESHOLD
+
+
+def test_senior_and_regular_roles_stay_apart():
+    assert similarity({"role": "Senior Software Engineer"}, {"role": "Software Engineer"}) < DEFAULT_SIMILARITY_THRESHOLD
+
+
+def test_same_role_on_different_postings_stays_apart():
+    score = similarity(
+        {"role": "Software Engineer", "employmentType": "Full-time"},
+        {"role": "Software Engineer", "employmentType": "Full-time", "applyLink": "https://acme.com/careers/9"}
+    )
+    assert score < DEFAULT_SIMILARITY_THRESHOLD
+
+
+def test_reworded_role_on_a_different_posting_stays_apart():
+    score = similarity(
+        {"role": "SDE Intern", "employmentType": "Internship", "applyLink": "https://acme.com/jobs/123"},
+        {"role": "Software Development Engineer Intern", "employmentType": "Internship", "applyLink": "https://acme.com/jobs/999"}
+    )
+    assert score < DEFAULT_SIMILARITY_THRESHOLD
+    # They still read alike: only the differing posting page keeps them apart
+    assert jaccard(
+        job_shingles({**ACME, "role": "SDE Intern", "applyLink": "https://acme.com/jobs/123"}),
+        job_shingles({**ACME, "role": "SDE Intern", "applyLink": "https://acme.com/jobs/999"})
+    ) >= DEFAULT_SIMILARITY_THRESHOLD
+
+
+def test_employment_type_is_a_shingle():
+    assert "e:intern" in job_shingles({"role": "Developer", "employmentType": "Internship"})
+    assert "e:full-time" in job_shingles({"role": "Developer", "employmentType": "Full-time"})
+
+
+def test_company_stopwords_and_link_parts():
+    shingles = job_shingles({**ACME, "role": "Backend Dev"})
+    assert {"c:acme", "h:acme.com", "p:/careers/123", "r:backend", "r:developer", "l:none"} == shingles
+
+
+def test_empty_job_has_no_shingles():
+    assert job_shingles({}) == set()
+    assert jaccard(set(), {"r:x"}) == 0.0
+
+
+def test_signature_is_stable_and_sized():
+    shingles = job_shingles({**ACME, "role": "SWE"})
+    assert minhash_signature(shingles) == minhash_signature(set(shingles))
+    assert len(minhash_signature(shingles)) == NUM_PERM
+
+
+def test_lsh_finds_identical_signatures_only_once_added():
+    index = LSHIndex()
+    shingles = job_shingles({**ACME, "role": "SDE Intern"})
+    signature = minhash_signature(shingles)
+    assert index.candidates(signature) == []
+
+    index.add("a", shingles, signature, {"role": "SDE Intern"})
+    index.add("a", shingles, signature)
+    assert len(index) == 1
+    assert [(key, meta) for key, _, meta in index.candidates(signature)] == [("a", {"role": "SDE Intern"})]
@@ -0,0 +1,56 @@
+import email
+from email import policy
+
+from utils.mail_content import PreEncodedMessage, UNSUBSCRIBE_PLACEHOLDER
+
+CARDS = "".join(f"<div><p>Role {i} at Company {i} – Bengaluru</p></div>" for i in range(20))
+HTML = f"""<html><body>
+<h1>Job alerts</h1>{CARDS}
+<p><a href="{UNSUBSCRIBE_PLACEHOLDER}">Unsubscribe</a></p>
+</body></html>"""
+
+
+def parse(raw: bytes):
+    return email.message_from_bytes(raw, policy=policy.default)
+
+
+def bodies(message) -> dict:
+    return {part.get_content_type(): part.get_content() for part in message.iter_parts()}
+
+
+def test_render_splices_personal_headers_and_link():
+    prepared = PreEncodedMessage("Job Alerts", "support@example.com", "5 new jobs ✨", HTML)
+    message = parse(prepared.render("alerts@example.com", "user@example.com", "https://x.test/u?t=abc"))
+
+    assert message["From"] == "Job Alerts <alerts@example.com>"
+    assert message["To"] == "user@example.com"
+    assert message["List-Unsubscribe"] == "<https://x.test/u?t=abc>"
+    assert message["Subject"] == "5 new jobs ✨"
+    assert message.get_content_type() == "multipart/alternative"
+
+    parts = bodies(message)
+    assert list(parts) == ["text/plain", "text/html"]
+    assert 'href="https://x.test/u?t=abc"' in parts["text/html"]
+    assert "Unsubscribe (https://x.test/u?t=abc)" in parts["text/plain"]
+    assert "Role 19 at Company 19 – Bengaluru" in parts["text/plain"]
+    assert UNSUBSCRIBE_PLACEHOLDER not in parts["text/plain"] + parts["text/html"]
+
+
+def test_render_decodes_to_the_full_body_for_every_recipient():
+    prepared = PreEncodedMessage("Job Alerts", "support@example.com", "Alerts", HTML)
+    first = bodies(parse(prepared.render("a@example.com", "one@example.com", "https://x.test/1")))
+    second = bodies(parse(prepared.render("a@example.com", "two@example.com", "https://x.test/22")))
+
+    assert first["text/html"].replace("https://x.test/1", "LINK") == second["text/html"].replace("https://x.test/22", "LINK")
+    assert first["text/html"].count("<div>") == 20
+
+
+def test_render_for_bcc_has_no_to_or_unsubscribe_link():
+    prepared = PreEncodedMessage("Job Alerts", "support@example.com", "Alerts", HTML)
+    message = parse(prepared.render("a@example.com"))
+
+    assert message["To"] is None
+    assert message["List-Unsubscribe"] is None
+    parts = bodies(message)
+    assert 'href="#"' in parts["text/html"]
+    assert "Unsubscribe\n" in parts["text/plain"]
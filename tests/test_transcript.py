@@ -0,0 +1,37 @@
+from utils.transcript import estimate_tokens, company_hints_from_title, preprocess_transcript
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_company_hints_skip_hiring_words():
+    assert company_hints_from_title("RockED Hiring Interns 2025 | Apply Now") == {"rocked", "now"}
+
+
+def test_cleanup_drops_noise_fillers_and_repeated_segments():
+    result = preprocess_transcript(["[Music]", "um so we are hiring", "um so we are hiring", "uh  apply today"], token_budget=0)
+    assert result["text"] == "so we are hiring apply today"
+    assert result["tokens"] <= result["originalTokens"]
+
+
+def test_within_budget_is_left_alone():
+    segments = ["Acme is hiring interns.", "Apply at acme.com/careers."]
+    result = preprocess_transcript(segments, token_budget=1000)
+    assert result["text"] == "Acme is hiring interns. Apply at acme.com/careers."
+    assert result["tokensSaved"] == 0
+
+
+def test_over_budget_keeps_hiring_sentences_in_playback_order():
+    chatter = [f"Today we talk about my weekend number {i}." for i in range(40)]
+    segments = chatter[:20] + ["Acme is hiring interns, apply at acme.com/careers."] + chatter[20:] + ["Stipend is 50k."]
+    result = preprocess_transcript(segments, token_budget=40, title="Acme Hiring Interns")
+
+    assert result["tokens"] <= 40
+    assert result["tokensSaved"] > 0
+    assert "Acme is hiring interns, apply at acme.com/careers." in result["text"]
+    assert result["text"].index("Acme") < result["text"].index("Stipend")
+    # Leftover budget goes to the earliest remaining sentences
+    assert result["text"].count("weekend") < 3
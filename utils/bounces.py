@@ -0,0 +1,99 @@
+import re
+import mailbox
+from email.message import Message
+from pathlib import Path
+
+# ================== CONFIG ==================
+
+# "5.1.1" in a Status field / "550 5.1.1" in a diagnostic
+STATUS_RE = re.compile(r"\b([245])\.(\d{1,3})\.(\d{1,3})\b")
+SMTP_CODE_RE = re.compile(r"^\s*([245]\d\d)\b")
+
+# ================== SMTP REPLIES ==================
+
+def bounce_kind(detail: str) -> str | None:
+    """
+    Classify an SMTP reply or DSN status: "hard" (permanent, 5.x.x / 5xx),
+    "soft" (temporary, 4.x.x / 4xx) or None if it isn't a failure.
+    """
+    if not detail:
+        return None
+    match = SMTP_CODE_RE.match(detail) or STATUS_RE.search(detail)
+    if not match:
+        return None
+    return {"5": "hard", "4": "soft"}.get(match.group(1)[0])
+
+# ================== DELIVERY STATUS NOTIFICATIONS ==================
+
+def _delivery_status_fields(part: Message) -> list:
+    """Per-recipient field blocks of a message/delivery-status part."""
+    payload = part.get_payload()
+    if isinstance(payload, list):
+        # The email package parses each block of the report into its own Message
+        return [dict((k.lower(), v) for k, v in block.items()) for block in payload[1:]]
+
+    blocks = []
+    for block in str(payload).replace("\r\n", "\n").split("\n\n")[1:]:
+        fields = {}
+        for line in block.splitlines():
+            if ":" in line and not line.startswith((" ", "\t")):
+                key, value = line.split(":", 1)
+                fields[key.strip().lower()] = value.strip()
+        if fields:
+            blocks.append(fields)
+    return blocks
+
+
+def parse_bounce(message: Message) -> list:
+    """
+    Extract failed recipients from an RFC 3464 delivery status notification.
+
+    Returns:
+        [{"email", "kind": "hard" | "soft", "status", "diagnostic"}]; empty if
+        the message isn't a bounce
+    """
+    bounces = []
+    for part in message.walk():
+        if part.get_content_type() != "message/delivery-status":
+            continue
+        for fields in _delivery_status_fields(part):
+            if fields.get("action", "failed").lower() not in ("failed", "delayed"):
+                continue
+            recipient = fields.get("final-recipient") or fields.get("original-recipient") or ""
+            email = recipient.split(";", 1)[-1].strip().strip("<>").lower()
+            status = fields.get("status", "")
+            diagnostic = fields.get("diagnostic-code", "").split(";", 1)[-1].strip()
+            kind = bounce_kind(status) or bounce_kind(diagnostic)
+            if email and kind:
+                bounces.append({"email": email, "kind": kind, "status": status, "diagnostic": diagnostic})
+    return bounces
+
+
+def read_bounce_mailbox(path: str, remove: bool = True) -> list:
+    """
+    Parse every bounce in a local mailbox (Maildir directory or mbox file).
+
+    Args:
+        path: Mailbox location
+        remove: Delete the messages that were read, so the next import only sees new bounces
+
+    Returns:
+        parse_bounce() results for all messages
+    """
+    location = Path(path)
+    if not location.exists():
+        return []
+    box = mailbox.Maildir(str(location), create=False) if location.is_dir() else mailbox.mbox(str(location))
+
+    bounces = []
+    box.lock()
+    try:
+        for key in list(box.keys()):
+            bounces.extend(parse_bounce(box[key]))
+            if remove:
+                box.remove(key)
+        box.flush()
+    finally:
+        box.unlock()
+        box.close()
+    return bounces
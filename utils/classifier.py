@@ -0,0 +1,60 @@
+import re
+
+# ================== CONFIG ==================
+
+# (feature name, field, pattern, weight)
+# Weights are additive; the final score is clamped to [0, 1].
+FEATURES = [
+    ("title_hiring", "title", re.compile(r"\bhiring\b|\bwe'?re hiring\b|\brecruit", re.IGNORECASE), 0.45),
+    ("title_apply", "title", re.compile(r"\bapply\s*(now|here|link|today)?\b|\bopen to all\b", re.IGNORECASE), 0.2),
+    ("title_role", "title", re.compile(
+        r"\b(interns?|internship|freshers?|graduates?|sde|engineers?|developers?|analysts?|"
+        r"off\s*campus|openings?|vacanc(y|ies)|opportunit(y|ies)|jobs?)\b",
+        re.IGNORECASE
+    ), 0.2),
+    ("title_batch_year", "title", re.compile(r"\b20\d\d\b"), 0.1),
+    ("description_apply_domain", "description", re.compile(
+        r"(lever\.co|greenhouse\.io|myworkdayjobs\.com|workday|smartrecruiters\.com|ashbyhq\.com|"
+        r"naukri\.com|linkedin\.com/jobs|unstop\.com|internshala\.com|wellfound\.com|"
+        r"forms\.gle|docs\.google\.com/forms|careers?\.|jobs\.|/careers?\b|/jobs?\b)",
+        re.IGNORECASE
+    ), 0.25),
+    ("description_hiring", "description", re.compile(
+        r"\b(hiring|apply|eligibility|stipend|ctc|lpa|batch|job description)\b", re.IGNORECASE
+    ), 0.1),
+    ("title_non_job", "title", re.compile(
+        r"\b(roadmap|tutorial|how to|tips|interview experience|podcast|vlog|course|"
+        r"mock interview|q&a|live session|motivation|review)\b",
+        re.IGNORECASE
+    ), -0.4),
+]
+
+DEFAULT_THRESHOLD = 0.3
+
+# ================== CLASSIFIER ==================
+
+def classify_job_video(title: str, description: str, threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """
+    Cheap keyword/regex pre-classifier run before transcript download and Gemini.
+
+    Returns:
+        {"score", "threshold", "isLikelyJob", "trace"} where trace lists the
+        matched features and their weights, so thresholds can be tuned later.
+    """
+    fields = {"title": title or "", "description": description or ""}
+    trace = []
+    score = 0.0
+
+    for name, field, pattern, weight in FEATURES:
+        match = pattern.search(fields[field])
+        if match:
+            score += weight
+            trace.append({"feature": name, "match": match.group(0), "weight": weight})
+
+    score = round(max(0.0, min(1.0, score)), 3)
+    return {
+        "score": score,
+        "threshold": threshold,
+        "isLikelyJob": score >= threshold,
+        "trace": trace,
+    }
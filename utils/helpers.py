@@ -87,6 +87,70 @@ def verify_unsubscribe_token(token: str) -> str | None:
     except InvalidTokenError:
         return None
 
+# ================== JOB FINGERPRINTS ==================
+
+TRACKING_PARAMS = {
+    "gclid", "fbclid", "msclkid", "dclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "referrer", "source", "src", "si", "trk", "trackingid",
+    "lipi", "refid", "_hsenc", "_hsmi", "yclid",
+}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize an apply link so the same opening always maps to the same string.
+    Lowercases scheme/host, drops "www.", fragments, tracking params (utm_*, gclid, ref, ...),
+    sorts the remaining query params and strips trailing slashes.
+    """
+    from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+    url = (url or "").strip()
+    if not url:
+        return ""
+    if "://" not in url:
+        url = f"https://{url}"
+
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    host = host.removesuffix(":443").removesuffix(":80")
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/")
+
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def job_fingerprint(job: dict) -> str:
+    """Stable SHA-1 over normalized (company, role, canonical applyLink)."""
+    import hashlib
+
+    def norm(value):
+        return " ".join((value or "").lower().split())
+
+    key = "|".join([
+        norm(job.get("company")),
+        norm(job.get("role")),
+        canonicalize_url(job.get("applyLink") or "")
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+# ================== DELIVERY SHARDS ==================
+
+def email_shard(email: str, shard_count: int) -> int:
+    """Deterministic shard (0..shard_count-1) for a subscriber, stable across processes."""
+    import hashlib
+
+    if shard_count <= 1:
+        return 0
+    digest = hashlib.sha1((email or "").lower().strip().encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
 def format_date_ist(date_str):
     from datetime import datetime, timezone, timedelta
 
@@ -101,6 +165,17 @@ def format_date_ist(date_str):
     return dt_ist.strftime("%b %d, %Y - %I:%M %p")
 
 
+# ================== SUBSCRIBER CADENCE ==================
+
+CADENCES = ("instant", "daily", "weekly")
+
+
+def normalize_cadence(value: str | None) -> str:
+    """Alert cadence of a subscriber; anything unknown (or missing) means instant."""
+    value = (value or "").strip().lower()
+    return value if value in CADENCES else "instant"
+
+
 # ================== TEST ==================
 
 if __name__ == "__main__":
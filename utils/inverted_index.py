@@ -0,0 +1,148 @@
+import bisect
+
+from utils.matching import normalize_token, normalize_values
+
+# ================== INVERTED INDEX ==================
+
+INDEXED_FIELDS = ("skill", "location", "workMode", "employmentType")
+
+# Fields whose values are split into parts and aliased like subscriber
+# preferences (utils.matching), e.g. "Bengaluru / Remote" -> {"bangalore", "remote"}
+ALIASED_FIELDS = {
+    "location": "locations",
+    "workMode": "workModes",
+    "employmentType": "employmentTypes",
+}
+
+
+def field_terms(field: str, value) -> set:
+    """Normalized index terms for one field value."""
+    if field in ALIASED_FIELDS:
+        return normalize_values(ALIASED_FIELDS[field], value)
+    token = normalize_token(value)
+    return {token} if token else set()
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index over archived jobs.
+
+    Every job is tokenized into (field, normalized value) terms, e.g.
+    ("skill", "python") or ("workMode", "remote"), and each term maps to a
+    posting set of job IDs. Queries OR values within a field and AND across
+    fields (or across skills with skill_mode="all"), using set intersection,
+    then return IDs newest first by sortKey.
+
+    Location, workMode and employmentType are split on separators and aliased
+    the way utils.matching normalizes preferences, so "Bengaluru, India"
+    matches a location=bangalore query.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.docs = {}
+        self.sort_keys = []  # ascending, parallel to self.sorted_ids
+        self.sorted_ids = []
+
+    def __len__(self):
+        return len(self.docs)
+
+    @staticmethod
+    def terms_for(job: dict) -> set:
+        terms = set()
+        for field in ALIASED_FIELDS:
+            terms.update((field, value) for value in field_terms(field, job.get(field)))
+        for skill in job.get("requiredSkills") or []:
+            terms.update(("skill", value) for value in field_terms("skill", skill))
+        return terms
+
+    def add(self, job_id: str, job: dict):
+        """Index (or re-index) a job. `job` must carry a sortKey."""
+        if job_id in self.docs:
+            self.remove(job_id)
+
+        self.docs[job_id] = job
+        for term in self.terms_for(job):
+            self.postings.setdefault(term, set()).add(job_id)
+
+        position = bisect.bisect_left(self.sort_keys, job["sortKey"])
+        self.sort_keys.insert(position, job["sortKey"])
+        self.sorted_ids.insert(position, job_id)
+
+    def remove(self, job_id: str):
+        job = self.docs.pop(job_id, None)
+        if job is None:
+            return
+        for term in self.terms_for(job):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.discard(job_id)
+                if not posting:
+                    del self.postings[term]
+
+        position = bisect.bisect_left(self.sort_keys, job["sortKey"])
+        del self.sort_keys[position]
+        del self.sorted_ids[position]
+
+    def match(self, filters: dict, skill_mode: str = "any") -> set | None:
+        """
+        IDs matching all filters, or None when no filter is given (match everything).
+
+        Args:
+            filters: {field: [values]} for fields in INDEXED_FIELDS
+            skill_mode: "any" ORs skills, "all" requires every skill
+        """
+        clauses = []
+        for field in INDEXED_FIELDS:
+            values = set()
+            for value in filters.get(field) or []:
+                values |= field_terms(field, value)
+            if not values:
+                continue
+            postings = [self.postings.get((field, value), set()) for value in values]
+            if field == "skill" and skill_mode == "all":
+                clauses.extend(postings)
+            else:
+                clauses.append(set().union(*postings))
+
+        if not clauses:
+            return None
+
+        # Intersect smallest first so each step touches as few IDs as possible
+        clauses.sort(key=len)
+        result = set(clauses[0])
+        for clause in clauses[1:]:
+            if not result:
+                break
+            result &= clause
+        return result
+
+    def query(self, filters: dict, skill_mode: str = "any", before: str | None = None, limit: int = 20) -> list:
+        """
+        Matching jobs newest first.
+
+        Args:
+            before: Only return jobs with sortKey < before (pagination cursor)
+            limit: Maximum jobs returned
+        """
+        matches = self.match(filters, skill_mode)
+        end = bisect.bisect_left(self.sort_keys, before) if before else len(self.sort_keys)
+
+        results = []
+        if matches is not None and len(matches) < end:
+            # Few matches: sort just the matches instead of scanning the ordered list
+            candidates = sorted(
+                (self.docs[i]["sortKey"], i) for i in matches
+                if before is None or self.docs[i]["sortKey"] < before
+            )
+            for _, job_id in reversed(candidates[-limit:]):
+                results.append(self.docs[job_id])
+            return results
+
+        for position in range(end - 1, -1, -1):
+            job_id = self.sorted_ids[position]
+            if matches is None or job_id in matches:
+                results.append(self.docs[job_id])
+                if len(results) >= limit:
+                    break
+        return results
@@ -0,0 +1,212 @@
+import re
+import uuid
+import base64
+from html import unescape
+from html.parser import HTMLParser
+from email.header import Header
+
+# ================== CONFIG ==================
+
+# Whitespace next to these tags never renders, so it can be dropped entirely
+BLOCK_TAGS = {
+    "html", "head", "body", "meta", "title", "style", "link", "div", "p", "br", "hr",
+    "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "table", "thead", "tbody",
+    "tr", "td", "th", "header", "footer", "section", "!doctype",
+}
+# Content of these tags is not part of the plain-text version
+SKIP_TAGS = {"head", "style", "script", "title"}
+
+_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.S)
+_STYLE_RE = re.compile(r"(<style[^>]*>)(.*?)(</style>)", re.S | re.I)
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_CSS_PUNCT_RE = re.compile(r"\s*([{};:,>])\s*")
+_WS_RE = re.compile(r"\s+")
+_GAP_RE = re.compile(r"(<[^<>]*>)\s+(?=<([!/]?[a-zA-Z0-9]+))")
+_TAG_NAME_RE = re.compile(r"<\s*/?\s*([!a-zA-Z0-9]+)")
+
+# ================== HTML MINIFICATION ==================
+
+def _minify_css(css: str) -> str:
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = _WS_RE.sub(" ", css)
+    css = _CSS_PUNCT_RE.sub(r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def _tag_name(tag: str) -> str:
+    match = _TAG_NAME_RE.match(tag)
+    return match.group(1).lower() if match else ""
+
+
+def minify_html(html: str) -> str:
+    """
+    Shrink an email body without changing how it renders: drop comments
+    (except conditional ones), minify <style> blocks, collapse whitespace
+    runs, and remove whitespace between tags when either side is a block
+    element (inline neighbours keep a single space). Assumes no <pre>/<textarea>.
+    """
+    html = _COMMENT_RE.sub("", html)
+    html = _STYLE_RE.sub(lambda m: m.group(1) + _minify_css(m.group(2)) + m.group(3), html)
+    html = _WS_RE.sub(" ", html)
+
+    def gap(match):
+        before, after = _tag_name(match.group(1)), match.group(2).lstrip("/").lower()
+        return match.group(1) if before in BLOCK_TAGS or after in BLOCK_TAGS else match.group(1) + " "
+
+    return _GAP_RE.sub(gap, html).strip()
+
+# ================== PLAIN TEXT ALTERNATIVE ==================
+
+class _TextExtractor(HTMLParser):
+    """
+    Collects text with one line per block element. A block that contains
+    other blocks (a card, a section) is followed by a blank line.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+        self.links = []
+        # One flag per open block element: does it contain other blocks?
+        self.blocks = []
+
+    def _break(self, lines: int):
+        trailing = 0
+        for part in reversed(self.parts):
+            stripped = part.rstrip(" ")
+            trailing += len(stripped) - len(stripped.rstrip("\n"))
+            if stripped.strip():
+                break
+        if self.parts and trailing < lines:
+            self.parts.append("\n" * (lines - trailing))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skipping += 1
+        elif tag in BLOCK_TAGS:
+            if self.blocks:
+                self.blocks[-1] = True
+            if tag != "br":
+                self.blocks.append(False)
+            self._break(1)
+        if tag == "a":
+            self.links.append(dict(attrs).get("href"))
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in BLOCK_TAGS and tag != "br":
+            has_blocks = self.blocks.pop() if self.blocks else False
+            self._break(2 if has_blocks or tag == "p" or tag.startswith("h") else 1)
+        if tag == "a" and self.links:
+            href = self.links.pop()
+            if href and href != "#" and not self.skipping:
+                if self.parts:
+                    self.parts[-1] = self.parts[-1].rstrip()
+                self.parts.append(f" ({href})")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(_WS_RE.sub(" ", data))
+
+
+def html_to_text(html: str) -> str:
+    """Plain-text version of an email body: block elements become lines, links keep their URL in brackets."""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    lines = [line.strip() for line in unescape("".join(parser.parts)).split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip() + "\n"
+
+# ================== PRE-ENCODED MESSAGES ==================
+
+UNSUBSCRIBE_PLACEHOLDER = "{{ unsubscribeLink }}"
+
+# base64 turns every 57 input bytes into one 76-char line
+_B64_LINE_BYTES = 57
+
+
+def _b64_lines(data: bytes) -> bytes:
+    return base64.encodebytes(data).replace(b"\n", b"\r\n")
+
+
+class _EncodedPart:
+    """
+    One body part split at the unsubscribe link: the shared bytes up to the
+    last whole base64 line are encoded once, the rest (a partial line plus
+    the footer) is encoded per message.
+    """
+
+    def __init__(self, content_type: str, body: str, split_at: int):
+        shared = body[:split_at].encode("utf-8")
+        aligned = len(shared) - len(shared) % _B64_LINE_BYTES
+        self.headers = (
+            f'Content-Type: {content_type}; charset="utf-8"\r\n'
+            "Content-Transfer-Encoding: base64\r\n"
+            "\r\n"
+        ).encode("ascii")
+        self.encoded = _b64_lines(shared[:aligned])
+        self.tail = shared[aligned:]
+        self.footer = body[split_at:]
+
+    def render(self, footer: str) -> bytes:
+        return self.headers + self.encoded + _b64_lines(self.tail + footer.encode("utf-8"))
+
+
+class PreEncodedMessage:
+    """
+    A multipart/alternative job alert encoded once and reused for every message.
+
+    The HTML is minified and a matching text/plain part is generated from it
+    (minify_html, html_to_text). Both parts are split at the unsubscribe link; the
+    shared part (headers + job cards) is base64-encoded once, so each message
+    only needs its From / To / List-Unsubscribe headers and the short footer
+    encoded before the bytes are concatenated. From is per message because
+    each sender account of the pool must send as itself.
+    """
+
+    def __init__(self, from_name: str, reply_to: str, subject: str, html: str, text: str | None = None):
+        html = minify_html(html)
+        text = text if text is not None else html_to_text(html)
+        self.from_name = from_name
+        self.boundary = f"==job-alerts-{uuid.uuid4().hex}"
+
+        html_split = html.rfind("<", 0, html.index(UNSUBSCRIBE_PLACEHOLDER))
+        text_split = text.rfind("\n", 0, text.index(UNSUBSCRIBE_PLACEHOLDER)) + 1
+        self.parts = (_EncodedPart("text/plain", text, text_split), _EncodedPart("text/html", html, html_split))
+
+        self.headers = (
+            f"Reply-To: {reply_to}\r\n"
+            f"Subject: {Header(subject, 'utf-8').encode()}\r\n"
+            "MIME-Version: 1.0\r\n"
+            f'Content-Type: multipart/alternative; boundary="{self.boundary}"\r\n'
+        ).encode("ascii")
+
+    def render(self, from_address: str, to_email: str | None = None, unsubscribe_link: str | None = None) -> bytes:
+        """
+        Stamp the per-message headers and footer onto the pre-encoded parts.
+
+        Without a To address the message is meant for BCC delivery; without an
+        unsubscribe link the footer link points nowhere and List-Unsubscribe is left out.
+        """
+        personal_headers = f"From: {self.from_name} <{from_address}>\r\n"
+        if to_email:
+            personal_headers += f"To: {to_email}\r\n"
+        if unsubscribe_link:
+            personal_headers += f"List-Unsubscribe: <{unsubscribe_link}>\r\n"
+
+        text_part, html_part = self.parts
+        text_footer = (
+            text_part.footer.replace(UNSUBSCRIBE_PLACEHOLDER, unsubscribe_link) if unsubscribe_link
+            else text_part.footer.replace(f" ({UNSUBSCRIBE_PLACEHOLDER})", "")
+        )
+        html_footer = html_part.footer.replace(UNSUBSCRIBE_PLACEHOLDER, unsubscribe_link or "#")
+
+        delimiter = f"--{self.boundary}\r\n".encode("ascii")
+        return b"".join((
+            self.headers, personal_headers.encode("ascii"), b"\r\n",
+            delimiter, text_part.render(text_footer),
+            delimiter, html_part.render(html_footer),
+            f"--{self.boundary}--\r\n".encode("ascii"),
+        ))
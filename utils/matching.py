@@ -0,0 +1,145 @@
+import re
+import numpy as np
+
+# ================== CONFIG ==================
+
+# Preference dimension -> opening field it is matched against
+PREFERENCE_FIELDS = {
+    "skills": "requiredSkills",
+    "workModes": "workMode",
+    "employmentTypes": "employmentType",
+    "locations": "location",
+}
+
+LOCATION_ALIASES = {
+    "wfh": "remote",
+    "work from home": "remote",
+    "anywhere": "remote",
+    "bengaluru": "bangalore",
+    "gurugram": "gurgaon",
+    "bombay": "mumbai",
+}
+
+EMPLOYMENT_ALIASES = {
+    "intern": "internship",
+    "full time": "full-time",
+    "fulltime": "full-time",
+}
+
+WORK_MODE_ALIASES = {
+    "onsite": "on-site",
+    "on site": "on-site",
+    "office": "on-site",
+    "wfh": "remote",
+}
+
+# ================== NORMALIZATION ==================
+
+def normalize_token(value) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+def _split(value) -> list:
+    if isinstance(value, (list, tuple, set)):
+        items = value
+    else:
+        items = re.split(r"[,/|;]", value or "")
+    return [normalize_token(v) for v in items if normalize_token(v)]
+
+
+def normalize_values(dimension: str, value) -> set:
+    """Normalize a preference or opening value into comparable tokens."""
+    values = _split(value)
+    if dimension == "locations":
+        return {LOCATION_ALIASES.get(v, v) for v in values}
+    if dimension == "employmentTypes":
+        return {EMPLOYMENT_ALIASES.get(v, v) for v in values}
+    if dimension == "workModes":
+        return {WORK_MODE_ALIASES.get(v, v) for v in values}
+    return set(values)
+
+
+def normalize_preferences(raw: dict) -> dict:
+    """Clean preference input (comma strings or lists) for storage on the subscriber doc."""
+    return {dimension: sorted(normalize_values(dimension, raw.get(dimension))) for dimension in PREFERENCE_FIELDS}
+
+# ================== MATCHING ==================
+
+def _dimension_matrix(subscriber_sets: list, opening_sets: list) -> np.ndarray:
+    """
+    Boolean (subscribers x openings) match matrix for one dimension.
+
+    A subscriber with no preference in this dimension, or an opening with no
+    value for it, never excludes the pair.
+    """
+    vocab = {}
+    for values in opening_sets:
+        for v in values:
+            vocab.setdefault(v, len(vocab))
+
+    n_subs, n_open = len(subscriber_sets), len(opening_sets)
+    if not vocab:
+        return np.ones((n_subs, n_open), dtype=bool)
+
+    # Scatter all (subscriber, term) pairs in a single fancy-index assignment
+    pairs = [(row, vocab[v]) for row, values in enumerate(subscriber_sets) for v in values if v in vocab]
+    subs = np.zeros((n_subs, len(vocab)), dtype=np.float32)
+    if pairs:
+        rows, cols = zip(*pairs)
+        subs[list(rows), list(cols)] = 1.0
+
+    opens = np.zeros((n_open, len(vocab)), dtype=np.float32)
+    for row, values in enumerate(opening_sets):
+        opens[row, [vocab[v] for v in values]] = 1.0
+
+    overlap = (subs @ opens.T) > 0
+    wildcard_subs = np.array([not values for values in subscriber_sets], dtype=bool)[:, None]
+    unknown_openings = np.array([not values for values in opening_sets], dtype=bool)[None, :]
+    return overlap | wildcard_subs | unknown_openings
+
+
+def match_matrix(subscribers: list, openings: list) -> np.ndarray:
+    """(subscribers x openings) boolean matrix: AND of every preference dimension."""
+    result = np.ones((len(subscribers), len(openings)), dtype=bool)
+    for dimension, field in PREFERENCE_FIELDS.items():
+        # Preferences are stored normalized (normalize_preferences), so no re-normalizing here
+        subscriber_sets = [(s.get("preferences") or {}).get(dimension) or () for s in subscribers]
+        if not any(subscriber_sets):
+            continue
+        opening_sets = [normalize_values(dimension, job.get(field)) for job in openings]
+        result &= _dimension_matrix(subscriber_sets, opening_sets)
+    return result
+
+
+def group_by_match(subscribers: list, openings: list) -> list:
+    """
+    Group subscribers that should receive exactly the same openings.
+
+    Returns:
+        [(opening_indices, subscribers)] for every non-empty match set, so each
+        group can share BCC batches.
+    """
+    if not subscribers or not openings:
+        return []
+
+    matrix = match_matrix(subscribers, openings)
+    # Pack each row into bytes so identical match sets collapse in one np.unique pass
+    packed = np.packbits(matrix, axis=1)
+    unique_rows, inverse = np.unique(packed, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    # Bucket subscriber indices by group in one sort instead of one scan per group
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(inverse, minlength=len(unique_rows)))))
+
+    groups = []
+    for group_id, row in enumerate(unique_rows):
+        opening_indices = np.flatnonzero(np.unpackbits(row)[:len(openings)]).tolist()
+        if not opening_indices:
+            continue
+        members = [subscribers[i] for i in order[bounds[group_id]:bounds[group_id + 1]]]
+        groups.append((opening_indices, members))
+
+    # Largest audiences first
+    groups.sort(key=lambda g: -len(g[1]))
+    return groups
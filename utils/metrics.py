@@ -0,0 +1,186 @@
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+# ================== CONFIG ==================
+
+# Upper bounds in seconds; +Inf is always added
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_CALL_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+# ================== METRIC TYPES ==================
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    TYPE = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _samples(self) -> list:
+        raise NotImplementedError
+
+    def render(self) -> list:
+        # HELP text escapes only backslashes and newlines
+        help_text = self.help.replace("\\", "\\\\").replace("\n", "\\n")
+        lines = [f"# HELP {self.name} {help_text}", f"# TYPE {self.name} {self.TYPE}"]
+        with self.lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic total per label set."""
+
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def _samples(self) -> list:
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}"
+            for key, value in sorted(self.values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set."""
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a block in seconds (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> list:
+        lines = []
+        for key, state in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["buckets"]):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+# ================== REGISTRY ==================
+
+class Registry:
+    """In-process metrics, rendered in the Prometheus text exposition format (0.0.4)."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ================== METRICS ==================
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route")
+))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status code",
+    ("method", "route", "status")
+))
+FIRESTORE_CALL_SECONDS = REGISTRY.register(Histogram(
+    "firestore_call_duration_seconds", "Firestore call latency by Firebase method",
+    ("method",)
+))
+SMTP_SEND_SECONDS = REGISTRY.register(Histogram(
+    "smtp_send_duration_seconds", "Latency of one message handed to the email transport",
+    ("transport",), buckets=SLOW_CALL_BUCKETS
+))
+GEMINI_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "gemini_request_duration_seconds", "Gemini request latency (each attempt, excluding rate-limit waits)",
+    ("model", "outcome"), buckets=SLOW_CALL_BUCKETS
+))
+GEMINI_TOKENS = REGISTRY.register(Histogram(
+    "gemini_tokens", "Tokens per successful Gemini request",
+    ("model", "kind"), buckets=TOKEN_BUCKETS
+))
+YOUTUBE_QUOTA_UNITS = REGISTRY.register(Counter(
+    "youtube_quota_units_total", "YouTube Data API quota units spent",
+    ("method",)
+))
+EMAILS_SENT = REGISTRY.register(Counter(
+    "emails_sent_total", "Recipients an email was delivered to",
+    ("type",)
+))
+EMAILS_FAILED = REGISTRY.register(Counter(
+    "emails_failed_total", "Recipients an email could not be delivered to",
+    ("type",)
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss)",
+    ("cache", "result")
+))
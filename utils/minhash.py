@@ -0,0 +1,185 @@
+import re
+import random
+import zlib
+from urllib.parse import urlsplit
+
+# ================== CONFIG ==================
+
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS  # 4 rows/band -> candidate pairs start around Jaccard ~0.5
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.75
+# Near-duplicates are only looked for among fingerprints recorded this recently
+DEFAULT_SIMILARITY_WINDOW_DAYS = 30
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)  # fixed seed: signatures must be stable across runs
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+ROLE_ABBREVIATIONS = {
+    "sde": "software development engineer",
+    "swe": "software engineer",
+    "sre": "site reliability engineer",
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "qa": "quality assurance",
+    "ui": "user interface",
+    "ux": "user experience",
+    "fe": "frontend",
+    "be": "backend",
+    "sr": "senior",
+    "jr": "junior",
+    "dev": "developer",
+    "eng": "engineer",
+    "engg": "engineer",
+    "mgr": "manager",
+    "interns": "intern",
+    "internship": "intern",
+    "trainee": "intern",
+    "front-end": "frontend",
+    "back-end": "backend",
+    "fullstack": "full stack",
+    "full-stack": "full stack",
+}
+
+COMPANY_STOPWORDS = {
+    "pvt", "private", "ltd", "limited", "inc", "llc", "llp", "corp",
+    "corporation", "co", "company", "technologies", "technology", "tech",
+    "solutions", "labs", "india", "the",
+}
+
+ROLE_STOPWORDS = {"and", "of", "for", "the", "a", "an", "-", "/", "&"}
+
+# Seniority words (after abbreviation expansion); openings at different levels
+# of the same role are different openings, not rewordings of one
+LEVEL_WORDS = {
+    "intern", "junior", "senior", "lead", "staff", "principal", "head",
+    "manager", "director", "associate", "ii", "iii", "iv",
+}
+
+# ================== SHINGLING ==================
+
+def _tokens(text: str) -> list:
+    return re.findall(r"[a-z0-9+#.-]+", (text or "").lower())
+
+
+def _words(text: str) -> list:
+    words = []
+    for token in _tokens(text):
+        words.extend(ROLE_ABBREVIATIONS.get(token, token).split())
+    return [word for word in words if word not in ROLE_STOPWORDS]
+
+
+def job_shingles(job: dict) -> set:
+    """
+    Token-set shingles over role, seniority level, employment type, company
+    and apply-link host and path.
+    Role abbreviations are expanded so "SDE Intern" and
+    "Software Development Engineer Intern" share the same tokens.
+
+    The level is one shingle ("l:none" when the role has none), so
+    "Software Engineer" vs "Senior Software Engineer" or "... Intern" differ
+    by three shingles instead of one and stay below the threshold.
+    """
+    shingles = set()
+
+    role_words = _words(job.get("role"))
+    for word in role_words:
+        shingles.add(f"r:{word}")
+
+    if role_words:
+        levels = sorted(set(role_words) & LEVEL_WORDS)
+        shingles.add(f"l:{'+'.join(levels) or 'none'}")
+
+    employment = "-".join(_words(job.get("employmentType")))
+    if employment:
+        shingles.add(f"e:{employment}")
+
+    for token in _tokens(job.get("company")):
+        token = token.strip(".")
+        if token and token not in COMPANY_STOPWORDS:
+            shingles.add(f"c:{token}")
+
+    link = (job.get("applyLink") or "").strip()
+    if link:
+        parts = urlsplit(link if "://" in link else f"https://{link}")
+        host = parts.netloc.lower().removeprefix("www.")
+        if host:
+            shingles.add(f"h:{host}")
+        path = parts.path.lower().rstrip("/")
+        if path:
+            shingles.add(f"p:{path}")
+
+    return shingles
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _posting_link(shingles: set) -> set:
+    return {s for s in shingles if s.startswith(("h:", "p:"))}
+
+
+def similarity(a: set, b: set) -> float:
+    """
+    Near-duplicate score of two openings' shingles: their Jaccard, except
+    that openings linking to different posting pages (both have a path and
+    the host/path differ) are different openings however alike they read,
+    e.g. a company's two "Software Engineer" postings, and score 0.
+    """
+    link_a, link_b = _posting_link(a), _posting_link(b)
+    has_path = any(s.startswith("p:") for s in link_a) and any(s.startswith("p:") for s in link_b)
+    if has_path and link_a != link_b:
+        return 0.0
+    return jaccard(a, b)
+
+# ================== MINHASH / LSH ==================
+
+def minhash_signature(shingles: set) -> list:
+    """NUM_PERM-value MinHash signature (stable across processes, safe to persist)."""
+    if not shingles:
+        return [_MERSENNE_PRIME] * NUM_PERM
+    hashed = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+    return [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashed)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+class LSHIndex:
+    """
+    Banded LSH over MinHash signatures. Lookups only touch items that share
+    at least one band, so dedup cost stays roughly constant as the archive grows.
+    """
+
+    def __init__(self):
+        self.buckets = [{} for _ in range(LSH_BANDS)]
+        self.items = {}
+
+    def _bands(self, signature: list):
+        for band in range(LSH_BANDS):
+            yield band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+
+    def add(self, key: str, shingles: set, signature: list, meta: dict | None = None):
+        if not shingles or key in self.items:
+            return
+        self.items[key] = (shingles, meta or {})
+        for band, bucket_key in self._bands(signature):
+            self.buckets[band].setdefault(bucket_key, []).append(key)
+
+    def candidates(self, signature: list) -> list:
+        """[(key, shingles, meta)] for every item sharing at least one band."""
+        keys = set()
+        for band, bucket_key in self._bands(signature):
+            keys.update(self.buckets[band].get(bucket_key, ()))
+        return [(key, *self.items[key]) for key in keys]
+
+    def __len__(self):
+        return len(self.items)
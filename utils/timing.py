@@ -0,0 +1,168 @@
+import time
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+
+# ================== CONFIG ==================
+
+# Children kept per span; further distinct names are folded into "other"
+# so a run with many batches can't grow the run record without bound
+MAX_CHILDREN = 50
+OTHER = "other"
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# ================== SPANS ==================
+
+class Span:
+    """
+    Aggregated timer node: every entry with the same name under the same
+    parent adds to one node (total time, count, max), so a stage that makes
+    200 Firestore calls shows up once with count=200.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.total = 0.0
+        self.max = 0.0
+        self.count = 0
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def child(self, name: str) -> "Span":
+        with self.lock:
+            node = self.children.get(name)
+            if node is None:
+                if len(self.children) >= MAX_CHILDREN and name != OTHER:
+                    node = self.children.get(OTHER)
+                    if node is None:
+                        node = self.children[OTHER] = Span(OTHER)
+                else:
+                    node = self.children[name] = Span(name)
+            return node
+
+    def add(self, seconds: float):
+        with self.lock:
+            self.total += seconds
+            self.count += 1
+            self.max = max(self.max, seconds)
+
+    def to_dict(self) -> dict:
+        """{"name", "ms", "count", "maxMs", "children"}, children in first-seen order."""
+        with self.lock:
+            children = list(self.children.values())
+            result = {
+                "name": self.name,
+                "ms": round(self.total * 1000, 1),
+                "count": self.count,
+                "maxMs": round(self.max * 1000, 1),
+            }
+        if children:
+            result["children"] = [c.to_dict() for c in children]
+        return result
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a block as a child of the current span.
+
+    Outside a timed run (no current span) this does nothing, so library code
+    can be instrumented unconditionally.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    node = parent.child(name)
+    token = _current_span.set(node)
+    started = time.perf_counter()
+    try:
+        yield node
+    finally:
+        node.add(time.perf_counter() - started)
+        _current_span.reset(token)
+
+
+def timed(name: str):
+    """Decorator form of span()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def timed_run(name: str = "run"):
+    """Start a new span tree (ignoring any current one) and yield its root."""
+    root = Span(name)
+    token = _current_span.set(root)
+    started = time.perf_counter()
+    try:
+        yield root
+    finally:
+        root.add(time.perf_counter() - started)
+        _current_span.reset(token)
+
+
+class Stages:
+    """
+    Sequential child spans of the current span, for long linear functions
+    where wrapping every step in a `with` block would not read well: each
+    start() ends the previous stage. Call stop() (in a finally) when done.
+    """
+
+    def __init__(self):
+        self.parent = _current_span.get()
+        self.node = None
+        self.token = None
+        self.started = 0.0
+
+    def start(self, name: str):
+        self.stop()
+        if self.parent is None:
+            return
+        self.node = self.parent.child(name)
+        self.token = _current_span.set(self.node)
+        self.started = time.perf_counter()
+
+    def stop(self):
+        if self.node is None:
+            return
+        self.node.add(time.perf_counter() - self.started)
+        _current_span.reset(self.token)
+        self.node = self.token = None
+
+
+def in_current_span(fn):
+    """
+    Bind `fn` to the caller's span so work handed to another thread
+    (ThreadPoolExecutor) is timed under it.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # A context can only be entered by one thread at a time: run each call in its own copy
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+
+def format_timings(timings: dict, depth: int = 2) -> list:
+    """Indented "- name: 12.5 ms x3" lines for the top `depth` levels, for run logs."""
+    lines = []
+
+    def walk(node, level):
+        count = f" x{node['count']}" if node["count"] > 1 else ""
+        lines.append(f"{'   ' * level}- {node['name']}: {node['ms']} ms{count}")
+        if level < depth:
+            for child in node.get("children", []):
+                walk(child, level + 1)
+
+    walk(timings, 0)
+    return lines
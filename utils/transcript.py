@@ -0,0 +1,134 @@
+import re
+import math
+
+# ================== CONFIG ==================
+
+# Rough chars-per-token ratio for Gemini models on English text
+CHARS_PER_TOKEN = 4
+
+# Auto-generated captions rarely carry punctuation, so long runs are
+# split into windows of this many words before scoring
+SENTENCE_WINDOW_WORDS = 30
+
+HIRING_KEYWORDS = (
+    "hiring", "apply", "application", "intern", "internship", "job",
+    "opening", "vacancy", "role", "position", "fresher", "graduate",
+    "batch", "salary", "stipend", "ctc", "lpa", "remote", "hybrid",
+    "onsite", "on-site", "location", "eligibility", "deadline",
+    "full-time", "full time", "part-time", "experience", "skills",
+)
+
+FILLER_WORDS = {"um", "uh", "umm", "uhh", "hmm", "erm"}
+
+URL_PATTERN = re.compile(r"(https?://\S+|www\.\S+|\b[\w-]+\.(?:com|in|io|co|org|net|ai|dev)\b\S*)", re.IGNORECASE)
+NOISE_TAG_PATTERN = re.compile(r"\[(?:music|applause|laughter|silence|__)\]", re.IGNORECASE)
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+# ================== HELPERS ==================
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate, avoids a count_tokens round trip."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def normalize_whitespace(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def company_hints_from_title(title: str) -> set:
+    """Capitalised title words that are not hiring keywords, e.g. "RockED" in "RockED Hiring Interns"."""
+    hints = set()
+    for word in re.findall(r"[A-Za-z][A-Za-z0-9&.-]+", title or ""):
+        lowered = word.lower()
+        if word[0].isupper() and len(word) > 2 and not any(k in lowered for k in HIRING_KEYWORDS):
+            hints.add(lowered)
+    return hints
+
+
+def _clean_segments(segments: list) -> list:
+    """Normalize whitespace, drop noise tags/fillers and consecutive duplicate segments."""
+    cleaned = []
+    previous = None
+    for segment in segments:
+        text = NOISE_TAG_PATTERN.sub(" ", segment or "")
+        words = [w for w in text.split() if w.lower() not in FILLER_WORDS]
+        text = " ".join(words)
+        if not text:
+            continue
+        key = text.lower()
+        if key == previous:
+            continue
+        previous = key
+        cleaned.append(text)
+    return cleaned
+
+
+def _split_sentences(text: str) -> list:
+    sentences = []
+    for sentence in SENTENCE_SPLIT_PATTERN.split(text):
+        words = sentence.split()
+        for i in range(0, len(words), SENTENCE_WINDOW_WORDS):
+            chunk = " ".join(words[i:i + SENTENCE_WINDOW_WORDS])
+            if chunk:
+                sentences.append(chunk)
+    return sentences
+
+
+def _score_sentence(sentence: str, company_hints: set) -> int:
+    lowered = sentence.lower()
+    score = 0
+    if URL_PATTERN.search(sentence):
+        score += 3
+    if any(hint in lowered for hint in company_hints):
+        score += 2
+    score += min(2, sum(1 for k in HIRING_KEYWORDS if k in lowered))
+    return score
+
+# ================== PREPROCESSING ==================
+
+def preprocess_transcript(segments: list, token_budget: int, title: str = "") -> dict:
+    """
+    Shrink a caption transcript to fit a token budget before it goes into the Gemini prompt.
+
+    Args:
+        segments: Raw caption segment texts in playback order
+        token_budget: Maximum estimated tokens to keep (<= 0 disables trimming)
+        title: Video title, used to derive company-name hints for prioritisation
+
+    Returns:
+        {"text", "originalTokens", "tokens", "tokensSaved"}
+    """
+    original_text = normalize_whitespace(" ".join(segments))
+    original_tokens = estimate_tokens(original_text)
+
+    text = " ".join(_clean_segments(segments))
+
+    if token_budget > 0 and estimate_tokens(text) > token_budget:
+        sentences = _split_sentences(text)
+        hints = company_hints_from_title(title)
+        ranked = sorted(
+            range(len(sentences)),
+            key=lambda i: (-_score_sentence(sentences[i], hints), i)
+        )
+
+        keep = set()
+        used = 0
+        for i in ranked:
+            cost = estimate_tokens(sentences[i]) + 1
+            if used + cost > token_budget:
+                continue
+            keep.add(i)
+            used += cost
+
+        # Preserve playback order so the model still reads a coherent transcript
+        text = " ".join(sentences[i] for i in sorted(keep))
+
+    tokens = estimate_tokens(text)
+    return {
+        "text": text,
+        "originalTokens": original_tokens,
+        "tokens": tokens,
+        "tokensSaved": max(0, original_tokens - tokens),
+    }